@@ -1,6 +1,9 @@
 import os
+import sys
 import logging
 import asyncio
+import signal
+from telegram import Update
 from telegram.ext import (
     ApplicationBuilder,
     CommandHandler,
@@ -8,57 +11,124 @@ from telegram.ext import (
     CallbackQueryHandler,
     filters,
 )
-from services.config_service import Config, load_config
+from services.config_service import Config
 from services.yandexgpt_service import YandexGPTService
 from handlers.start_handler import StartHandler
 from handlers.text_handler import TextHandler
 from handlers.document_handler import DocumentHandler
 from handlers.audio_handler import AudioHandler
 from handlers.topic_handler import TopicHandler
+from handlers.history_handler import HistoryHandler
 from handlers.callback_handler import CallbackHandler
 from handlers.calendars_handler import CalendarsHandler
 from services.dialog_service import DialogService
-from storage.file_storage import FileDialogStorage, DIALOGS_DIR
-from yandex_ai_studio_sdk import AIStudio
-from services.yandex_index_service import YandexIndexService
-from services.api_server import ApiServer
+from storage.factory import get_locks, get_storage
+from storage.file_storage import FileDialogStorage
+from storage.migrate import DialogCompactor, DialogMigrator
+from storage.serializers import get_serializer
+from services.sender_bridge import DEFAULT_SOCKET, SenderBridgeServer
+from services.rate_limiter import PriorityRateLimiter
+from services.update_processor import PerUserUpdateProcessor
+from services.supervisor import HashRing, WorkerSupervisor, serve_worker
+from services.calendar_store import CalendarEventStore
+from clients.icsclient import ICSClient
+from services.skills import skills
+from services.metrics import metrics
+from services.tracing import install_log_context, tracer
+from services.loop_monitor import LoopLagMonitor
+from services.profiler import profiler
 
-# Set up logging
+# Set up logging; records inside a traced update carry its trace id
+install_log_context()
 logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+    format="%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s",
+    level=logging.INFO,
 )
 
 logger = logging.getLogger(__name__)
 
 CONFIG_PATH = os.environ.get("CONFIG_PATH", "./config/config.yml")
-DIALOGS_PATH = os.environ.get("DIALOGS_PATH", DIALOGS_DIR)
-config = Config(load_config(CONFIG_PATH))
+config = Config.load(CONFIG_PATH)
+# Latency histograms for /metrics; instrumentation is a no-op when off
+metrics.enabled = bool(config.get("api", "metrics", False))
+# Per-update spans exported to a JSONL file or an OTLP collector
+tracer.configure(config)
+# Sampled and slow-request profiles (toggled at runtime via /profiling)
+profiler.configure(config)
 
-# Build and run the bot
-if __name__ == "__main__":
-    app = ApplicationBuilder().token(config.getBotToken()).build()
+# Updates arrive by long polling (default) or through the API server's
+# /telegram/webhook route, which lets several replicas share the load
+webhook = config.getBot("webhook", {}) or {}
+use_webhook = config.getBot("mode", "polling") == "webhook"
+if use_webhook and not (webhook.get("url") and webhook.get("secret_token")):
+    logger.warning("Webhook url or secret_token not configured — using polling")
+    use_webhook = False
+
+# With more than one worker this process only receives updates and
+# routes them to worker processes by user id
+workers = int(config.getBot("workers", 1) or 1)
+ics_settings = config.get("data", "ics", {}) or {}
 
-    # Create dialog service instance
-    dialog_service = DialogService(FileDialogStorage(DIALOGS_PATH))
 
-    # Create Yandex Index Service instance
-    yandex_sdk = AIStudio(auth=config.getCloudKey(), folder_id=config.getCloudFolder())
-    index_service = YandexIndexService(
-        yandex_sdk, config.getCloudFolder(), dialog_service
+def build_rate_limiter(share: float = 1.0) -> PriorityRateLimiter:
+    """Outbound limiter; processes sending in parallel split the overall rate."""
+    settings = dict(config.getBot("rate_limit", {}) or {})
+    settings["overall_rate"] = settings.get("overall_rate", 30) * share
+    return PriorityRateLimiter(**settings)
+
+
+def application_builder(rate_share: float = 1.0) -> ApplicationBuilder:
+    """Builder with the token, outbound limiter and Bot API server."""
+    builder = (
+        ApplicationBuilder()
+        .token(config.getBotToken())
+        .rate_limiter(build_rate_limiter(rate_share))
     )
+    # A local Bot API server (or the load test stub) instead of api.telegram.org
+    api_url = config.getBot("api_url")
+    if api_url:
+        api_url = api_url.rstrip("/")
+        builder = builder.base_url(f"{api_url}/bot").base_file_url(
+            f"{api_url}/file/bot"
+        )
+    return builder
+
+
+def build_application(with_updater: bool = True, rate_share: float = 1.0):
+    """Bot application with all handlers registered, and its calendar store."""
+    builder = application_builder(rate_share)
+    if not with_updater:
+        builder = builder.updater(None)
+    # Different users are served in parallel, each user's updates in order
+    concurrent_updates = config.getBot("concurrent_updates", 16) or 1
+    if concurrent_updates > 1:
+        builder = builder.concurrent_updates(
+            PerUserUpdateProcessor(concurrent_updates)
+        )
+    app = builder.build()
+
+    # Create dialog service instance
+    dialog_service = DialogService(get_storage(config), get_locks(config))
+
+    # Local copy of user calendars for schedule queries
+    event_store = CalendarEventStore(ICSClient(config))
 
     # Create handler instances
     start_handler = StartHandler(config)
-    text_handler = TextHandler(config, YandexGPTService(config), dialog_service)
+    text_handler = TextHandler(
+        config, YandexGPTService(config, event_store), dialog_service
+    )
     document_handler = DocumentHandler(config)
-    audio_handler = AudioHandler(config, YandexGPTService(config))
+    audio_handler = AudioHandler(config, YandexGPTService(config, event_store))
     topic_handler = TopicHandler(config, dialog_service)
+    history_handler = HistoryHandler(config, dialog_service)
     callback_handler = CallbackHandler(config, dialog_service)
     calendars_handler = CalendarsHandler(config)
 
     # Register handlers
     app.add_handler(CommandHandler("start", start_handler.handle_unauthorized))
     app.add_handler(CommandHandler("topic", topic_handler.handle))
+    app.add_handler(CommandHandler(["export", "search"], history_handler.handle))
     app.add_handler(CommandHandler("calendars", calendars_handler.handle))
     app.add_handler(CallbackQueryHandler(callback_handler.handle))
     app.add_handler(
@@ -66,26 +136,252 @@ if __name__ == "__main__":
     )
     app.add_handler(MessageHandler(filters.Document.ALL, document_handler.handle))
     app.add_handler(MessageHandler(filters.AUDIO | filters.VOICE, audio_handler.handle))
+    return app, event_store
+
 
+def start_event_sync(event_store):
+    # Keep tracked users' calendars in sync with the ICS service
+    pulling_interval = ics_settings.get("pulling_interval")
+    if pulling_interval:
+        asyncio.create_task(event_store.run(float(pulling_interval)))
+        logger.info("Calendar event store syncing every %s seconds", pulling_interval)
+
+
+def start_dialog_maintenance(migrate=True, compact=True, owns=None):
+    """Background upkeep of dialog files.
+
+    Compaction must run where the dialogs are saved (their dialog locks may
+    be local to the process), so with workers each worker compacts the
+    users it ``owns`` and the supervisor only migrates.
+    """
+    storage = get_storage(config)
+    if not isinstance(storage, FileDialogStorage):
+        return
+    # Move dialog files left in the other layout (storage.layout) in batches
+    if migrate:
+        migrator = DialogMigrator(
+            storage,
+            int(config.get("storage", "migrate_batch", 500)),
+            float(config.get("storage", "migrate_interval", 1.0)),
+        )
+        asyncio.create_task(migrator.run())
+    # Rewrite dialogs idle for cold_after seconds in the compact cold format
+    cold_after = config.get("storage", "cold_after", 0)
+    if compact and cold_after:
+        compactor = DialogCompactor(
+            storage,
+            get_serializer(config.get("storage", "cold_format", "msgpack+zstd")),
+            float(cold_after),
+            get_locks(config),
+            owns=owns,
+        )
+        asyncio.create_task(compactor.run())
+
+
+def start_loop_monitor():
+    # Log the stack of whatever blocks the event loop (sync I/O in handlers)
+    threshold_ms = config.getBot("loop_block_threshold_ms", 0)
+    if threshold_ms:
+        LoopLagMonitor(threshold_ms / 1000).start()
+        logger.info("Event loop monitor started (threshold %s ms)", threshold_ms)
+
+
+def start_api_server(
+    bot,
+    update_queue=None,
+    worker_stats=None,
+    worker_metrics=None,
+    worker_profiling=None,
+):
+    """Start the API server task; update_queue receives webhook updates."""
+    api_key = config.get("api", "api_key", "")
+    api_port = config.get("api", "port", 5200)
+    if api_key or use_webhook:
+        # FastAPI and uvicorn are only imported when the API is served
+        from services.api_server import ApiServer
+
+        api_server = ApiServer(
+            api_key=api_key,
+            bot=bot,
+            port=api_port,
+            config=config,
+            logger=logger.getChild("api"),
+            update_queue=update_queue,
+            webhook_secret=webhook.get("secret_token", ""),
+            worker_stats=worker_stats,
+            worker_metrics=worker_metrics,
+            worker_profiling=worker_profiling,
+        )
+        if config.get("api", "process", False):
+            return asyncio.create_task(serve_api_process(api_server))
+        logger.info("API server started on port %s", api_port)
+        return asyncio.create_task(api_server.getTask())
+    logger.warning("API key not configured — API server not started")
+
+
+async def serve_api_process(core):
+    """Run the HTTP API in its own process(es) and send Telegram traffic for it.
+
+    The API process reaches this process over the sender bridge socket;
+    queued calendar notifications and batches are delivered from here.
+    """
+    bridge = SenderBridgeServer(
+        core, config.get("api", "bridge_socket", DEFAULT_SOCKET)
+    )
+    await bridge.start()
+    deliveries = asyncio.create_task(core.run_deliveries())
+    api_workers = config.get("api", "workers", 1)
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "services.api_server:create_app",
+        "--factory",
+        "--host",
+        core.host,
+        "--port",
+        str(core.port),
+        "--workers",
+        str(api_workers),
+        env={**os.environ, "CONFIG_PATH": CONFIG_PATH},
+    )
+    logger.info(
+        "API process started on port %s with %s worker(s)", core.port, api_workers
+    )
+    try:
+        await process.wait()
+        logger.warning("API process exited with code %s", process.returncode)
+    finally:
+        deliveries.cancel()
+        if process.returncode is None:
+            process.terminate()
+            await process.wait()
+        await bridge.stop()
+
+
+async def set_webhook(bot):
+    await bot.set_webhook(
+        url=webhook["url"],
+        secret_token=webhook["secret_token"],
+        allowed_updates=Update.ALL_TYPES,
+        drop_pending_updates=bool(webhook.get("drop_pending_updates")),
+    )
+    logger.info("Receiving updates via webhook %s", webhook["url"])
+
+
+async def run_webhook(application, event_store):
+    """Serve updates from the API server until it stops (SIGINT/SIGTERM)."""
+    async with application:
+        start_loop_monitor()
+        start_event_sync(event_store)
+        start_dialog_maintenance()
+        api_task = start_api_server(application.bot, application.update_queue)
+        await set_webhook(application.bot)
+        await application.start()
+        try:
+            await api_task
+        finally:
+            await application.stop()
+
+
+def run_polling(application, event_store):
     # Initialize and start background services
     async def start_background_services(application):
-        # Start API server
-        api_key = config.get("api", "api_key", "")
-        api_port = config.get("api", "port", 5200)
-        if api_key:
-            api_server = ApiServer(
-                api_key=api_key,
-                bot=application.bot,
-                port=api_port,
-                config=config,
-                logger=logger.getChild("api"),
-            )
-            asyncio.create_task(api_server.getTask())
-            logger.info("API server started on port %s", api_port)
+        start_loop_monitor()
+        start_event_sync(event_store)
+        start_dialog_maintenance()
+        start_api_server(application.bot)
+
+    application.post_init = start_background_services
+    application.run_polling()
+
+
+def run_worker(index, updates, reports):
+    """Worker process in supervisor mode: handlers for its share of users."""
+    app, event_store = build_application(
+        with_updater=False, rate_share=1 / (workers + 1)
+    )
+    processor = app.update_processor
+
+    def report():
+        load = {}
+        if isinstance(processor, PerUserUpdateProcessor):
+            stats = processor.stats()
+            load.update(running=stats["running"], waiting=stats["waiting"])
+        if metrics.enabled:
+            load["metrics"] = metrics.collect()
+        return load
+
+    # The supervisor routes users with the same ring
+    ring = HashRing(range(workers))
+
+    async def main():
+        start_loop_monitor()
+        start_event_sync(event_store)
+        start_dialog_maintenance(
+            migrate=False, owns=lambda user_id: ring.node_for(user_id) == index
+        )
+        await serve_worker(app, index, updates, reports, report)
+
+    asyncio.run(main())
+
+
+async def run_supervisor():
+    """Receive updates here and route them to worker processes by user id."""
+    supervisor = WorkerSupervisor(workers, run_worker)
+    supervisor.start()
+    # No handlers: this application only receives updates and sends API traffic
+    builder = application_builder(1 / (workers + 1))
+    if use_webhook:
+        builder = builder.updater(None)
+    receiver = builder.build()
+    async with receiver:
+        start_loop_monitor()
+        start_dialog_maintenance(compact=False)
+        update_queue = receiver.update_queue
+        api_task = start_api_server(
+            receiver.bot,
+            update_queue if use_webhook else None,
+            supervisor.stats,
+            supervisor.metrics,
+            supervisor.set_profiling,
+        )
+        if use_webhook:
+            await set_webhook(receiver.bot)
         else:
-            logger.warning("API key not configured — API server not started")
+            await receiver.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+        router = asyncio.create_task(supervisor.run(update_queue))
+        logger.info("Routing updates to %s workers", workers)
+        try:
+            if api_task:
+                await api_task
+            else:
+                await asyncio.Event().wait()
+        finally:
+            router.cancel()
+            if not use_webhook:
+                await receiver.updater.stop()
+            supervisor.stop()
+
+
+def request_reload(*_):
+    """Re-read skills/ and the config file on next access."""
+    skills.request_reload()
+    config.request_reload()
+
+
+# Build and run the bot
+if __name__ == "__main__":
+    # kill -HUP reloads skills/ and the config file without a restart
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, request_reload)
 
     print("Бот запущен...")
-    # Start background services
-    app.post_init = start_background_services
-    app.run_polling()
+    if workers > 1:
+        asyncio.run(run_supervisor())
+    else:
+        app, event_store = build_application(with_updater=not use_webhook)
+        if use_webhook:
+            asyncio.run(run_webhook(app, event_store))
+        else:
+            run_polling(app, event_store)
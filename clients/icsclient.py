@@ -1,6 +1,9 @@
 import requests
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from services.config_service import Config
+from services.metrics import ICS_ERRORS, ICS_REQUEST_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +15,31 @@ class ICSClient:
         self.config = config
         self.api_key = config.get("ics", "api_key")
         self.base_url = config.get("ics", "url")
+        self.batch_concurrency = int(config.get("ics", "batch_concurrency", 4))
+        # Seconds to wait for the ICS service before giving up on a request
+        self.timeout = float(config.get("ics", "timeout", 5))
+        self._local = threading.local()
+
+    @property
+    def unavailable(self) -> bool:
+        """Whether the last request of this thread failed on the service
+        side (timeout, connection error or 5xx), not because of the request
+        itself (4xx such as an unknown calendar)."""
+        return getattr(self._local, "unavailable", False)
+
+    def _request(self, http, method: str, operation: str, url: str, **kwargs):
+        """HTTP call to the ICS service, timed and counted per operation."""
+        self._local.unavailable = True
+        with ICS_REQUEST_SECONDS.time(operation=operation):
+            try:
+                response = getattr(http, method)(url, timeout=self.timeout, **kwargs)
+            except Exception:
+                ICS_ERRORS.inc(operation=operation)
+                raise
+        if response.status_code >= 400:
+            ICS_ERRORS.inc(operation=operation)
+        self._local.unavailable = response.status_code >= 500
+        return response
 
     def register_calendar(
         self, chat_id: str, chat_type: str, client_type: str, url: str, name: str = ""
@@ -29,7 +57,14 @@ class ICSClient:
                 payload["name"] = name
             headers = {"X-Auth-Token": self.api_key, "Content-Type": "application/json"}
             logger.info(f"Registering calendar for chat {chat_id} at {endpoint}")
-            response = requests.post(endpoint, json=payload, headers=headers)
+            response = self._request(
+                requests,
+                "post",
+                "register_calendar",
+                endpoint,
+                json=payload,
+                headers=headers,
+            )
             if response.status_code in (200, 201):
                 label = f" ({name})" if name else ""
                 logger.info(
@@ -49,7 +84,13 @@ class ICSClient:
         """List calendars for a user"""
         try:
             params = {"api_key": self.api_key, "user_id": user_id}
-            response = requests.get(f"{self.base_url}/calendars", params=params)
+            response = self._request(
+                requests,
+                "get",
+                "get_calendars",
+                f"{self.base_url}/calendars",
+                params=params,
+            )
             if response.status_code == 200:
                 data = response.json()
                 return data.get("calendars", [])
@@ -62,12 +103,44 @@ class ICSClient:
             logger.error(f"Error getting calendars: {str(e)}")
             return None
 
+    def get_events(self, calendar_id: str, user_id: str, since: str = None):
+        """List events of a calendar, optionally only those changed since a cursor.
+
+        Returns the decoded response (``{"events": [...], "synced_at": ...}``)
+        or None on error.
+        """
+        try:
+            params = {"api_key": self.api_key, "user_id": user_id}
+            if since:
+                params["updated_since"] = since
+            response = self._request(
+                requests,
+                "get",
+                "get_events",
+                f"{self.base_url}/calendars/{calendar_id}/events",
+                params=params,
+            )
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.error(
+                    f"Failed to get events of calendar {calendar_id}: {response.status_code} {response.text}"
+                )
+                return None
+        except Exception as e:
+            logger.error(f"Error getting events of calendar {calendar_id}: {str(e)}")
+            return None
+
     def delete_calendar(self, calendar_id: str, user_id: str) -> bool:
         """Delete a calendar by id"""
         try:
             params = {"api_key": self.api_key, "user_id": user_id}
-            response = requests.delete(
-                f"{self.base_url}/calendars/{calendar_id}", params=params
+            response = self._request(
+                requests,
+                "delete",
+                "delete_calendar",
+                f"{self.base_url}/calendars/{calendar_id}",
+                params=params,
             )
             if response.status_code in (200, 204):
                 logger.info(f"Calendar {calendar_id} deleted successfully")
@@ -85,7 +158,10 @@ class ICSClient:
         """Update calendar fields (name, url, client_type, timezone)"""
         try:
             params = {"api_key": self.api_key, "user_id": user_id}
-            response = requests.put(
+            response = self._request(
+                requests,
+                "put",
+                "update_calendar",
                 f"{self.base_url}/calendars/{calendar_id}",
                 params=params,
                 json=fields,
@@ -104,9 +180,63 @@ class ICSClient:
 
     def create_event(self, calendar_id: str, user_id: str, **fields) -> bool:
         """Create an event in a calendar"""
+        return self._post_event(requests, calendar_id, user_id, fields) is None
+
+    def create_events(self, calendar_id: str, user_id: str, events: list) -> list:
+        """Create several events in a calendar with bounded concurrency.
+
+        Returns one result per event, in input order:
+        ``{"index": i, "status": "ok"}`` or
+        ``{"index": i, "status": "error", "error": "..."}``, the latter with
+        ``"unavailable": True`` when the service itself failed.
+        """
+        if not events:
+            return []
+
+        workers = max(1, min(self.batch_concurrency, len(events)))
+        logger.info(
+            f"Creating {len(events)} events in calendar {calendar_id} "
+            f"({workers} parallel requests)"
+        )
+        # requests.Session is not thread-safe: one per worker thread
+        local = threading.local()
+        sessions = []
+
+        def post(fields):
+            session = getattr(local, "session", None)
+            if session is None:
+                session = local.session = requests.Session()
+                sessions.append(session)
+            # The unavailable flag is read in the worker that posted
+            error = self._post_event(session, calendar_id, user_id, fields)
+            return error, self.unavailable
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                outcomes = list(executor.map(post, events))
+        finally:
+            for session in sessions:
+                session.close()
+
+        results = []
+        for index, (error, unavailable) in enumerate(outcomes):
+            if error is None:
+                results.append({"index": index, "status": "ok"})
+            else:
+                result = {"index": index, "status": "error", "error": error}
+                if unavailable:
+                    result["unavailable"] = True
+                results.append(result)
+        return results
+
+    def _post_event(self, http, calendar_id: str, user_id: str, fields: dict):
+        """POST a single event; return None on success or an error description"""
         try:
             params = {"api_key": self.api_key, "user_id": user_id}
-            response = requests.post(
+            response = self._request(
+                http,
+                "post",
+                "create_event",
                 f"{self.base_url}/calendars/{calendar_id}/events",
                 params=params,
                 json=fields,
@@ -115,12 +245,12 @@ class ICSClient:
                 logger.info(
                     f"Event created in calendar {calendar_id}: {fields.get('summary', '')}"
                 )
-                return True
+                return None
             else:
                 logger.error(
                     f"Failed to create event in calendar {calendar_id}: {response.status_code} {response.text}"
                 )
-                return False
+                return f"{response.status_code} {response.text}"
         except Exception as e:
             logger.error(f"Error creating event in calendar {calendar_id}: {str(e)}")
-            return False
+            return str(e)
@@ -0,0 +1,86 @@
+import logging
+from typing import TYPE_CHECKING, List, Optional
+from services.metrics import S3_ERRORS, S3_REQUEST_SECONDS
+
+if TYPE_CHECKING:
+    from botocore.client import BaseClient
+
+logger = logging.getLogger(__name__)
+
+# Yandex Object Storage; any S3-compatible endpoint works
+DEFAULT_ENDPOINT = "https://storage.yandexcloud.net"
+DEFAULT_REGION = "ru-central1"
+
+
+class S3Client:
+    """Client for S3-compatible object storage: whole objects by key.
+
+    Keys are relative to ``prefix`` inside ``bucket``. boto3 is imported
+    only when no ``client`` is passed in.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: str = DEFAULT_ENDPOINT,
+        region: str = DEFAULT_REGION,
+        access_key: Optional[str] = None,
+        secret_key: Optional[str] = None,
+        client: Optional["BaseClient"] = None,
+    ):
+        if client is None:
+            import boto3
+
+            # Without keys boto3 falls back to the environment (AWS_* variables)
+            client = boto3.client(
+                "s3",
+                endpoint_url=endpoint_url,
+                region_name=region,
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key,
+            )
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _request(self, operation: str, method: str, **kwargs):
+        """boto3 call, timed and counted per operation."""
+        with S3_REQUEST_SECONDS.time(operation=operation):
+            try:
+                return getattr(self.client, method)(Bucket=self.bucket, **kwargs)
+            except Exception:
+                S3_ERRORS.inc(operation=operation)
+                raise
+
+    def put(self, key: str, data: bytes) -> None:
+        self._request("put", "put_object", Key=self._key(key), Body=data)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Object contents; None when there is no such key."""
+        try:
+            response = self._request("get", "get_object", Key=self._key(key))
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return response["Body"].read()
+
+    def list(self, prefix: str = "") -> List[str]:
+        """Keys under ``prefix``, sorted."""
+        keys = []
+        full_prefix = self._key(prefix)
+        token = None
+        while True:
+            kwargs = {"Prefix": full_prefix}
+            if token:
+                kwargs["ContinuationToken"] = token
+            response = self._request("list", "list_objects_v2", **kwargs)
+            for item in response.get("Contents", []):
+                key = item["Key"]
+                keys.append(key[len(self.prefix) + 1 :] if self.prefix else key)
+            if not response.get("IsTruncated"):
+                break
+            token = response["NextContinuationToken"]
+        return sorted(keys)
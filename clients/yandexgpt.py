@@ -1,11 +1,25 @@
+from functools import lru_cache
+from typing import TYPE_CHECKING
 from services.config_service import Config
-import openai
-from openai.types.responses import Response
-from pathlib import Path
+from services.skills import skills
+from services.metrics import GPT_REQUEST_SECONDS
 
-SYSTEM_PROMPT_FILE = (
-    Path(__file__).resolve().parent.parent / "skills" / "system_prompt.md"
-)
+SYSTEM_PROMPT = "system_prompt"
+# OpenAI-compatible endpoint of Yandex Cloud (yandex.base_url overrides it)
+DEFAULT_BASE_URL = "https://ai.api.cloud.yandex.net/v1"
+
+if TYPE_CHECKING:
+    import openai
+    from openai.types.responses import Response
+
+
+@lru_cache(maxsize=None)
+def _openai_client(api_key: str, base_url: str, project: str) -> "openai.OpenAI":
+    # openai is slow to import; only on the first request. One client (and
+    # connection pool) serves every service using the same credentials.
+    import openai
+
+    return openai.OpenAI(api_key=api_key, base_url=base_url, project=project)
 
 
 class YandexGPTError(Exception):
@@ -24,28 +38,36 @@ class YandexGPTIncompleteError(YandexGPTError):
 
 class YandexGPClient:
     def __init__(self, config: Config):
-        # Initialize OpenAI client for Yandex Cloud
         self.config = config
-        self.client = openai.OpenAI(
-            api_key=config.getYandex("key"),
-            base_url="https://ai.api.cloud.yandex.net/v1",
-            project=config.getCloudFolder(),
-        )
+        self._client = None
+
+    @property
+    def client(self) -> "openai.OpenAI":
+        """OpenAI client for Yandex Cloud, built on first use."""
+        if self._client is None:
+            self._client = _openai_client(
+                self.config.getYandex("key"),
+                self.config.getYandex("base_url") or DEFAULT_BASE_URL,
+                self.config.getCloudFolder(),
+            )
+        return self._client
 
     def request(self, prompt, tools=None):
         # Initial request to YandexGPT
-        instructions = SYSTEM_PROMPT_FILE.read_text(encoding="utf-8").strip()
-        response = self.client.responses.create(
-            model=f"gpt://{self.config.getCloudFolder()}/{self.config.getYandex('model')}",
-            instructions=instructions,
-            tools=tools if tools else None,
-            input=prompt,
-        )
+        instructions = skills.text(SYSTEM_PROMPT).strip()
+        snapshot = self.config.snapshot
+        with GPT_REQUEST_SECONDS.time(model=snapshot.model):
+            response = self.client.responses.create(
+                model=snapshot.model_uri,
+                instructions=instructions,
+                tools=tools if tools else None,
+                input=prompt,
+            )
         self._validate_response(response)
 
         return response
 
-    def _validate_response(self, response: Response) -> None:
+    def _validate_response(self, response: "Response") -> None:
         # 1. Успешный кейс: есть текст или function_call
         if response.status == "completed":
             if not response.output_text:
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from telegram import Update
 from telegram.ext import ContextTypes
@@ -30,7 +31,9 @@ class AudioHandler(BaseHandler):
             user_id = update.effective_user.id
 
             # Send transcript to YandexGPT with user ID
-            reply = self.GPTService.ask_yandexgpt(transcript, user_id)
+            reply = await asyncio.to_thread(
+                self.GPTService.ask_yandexgpt, transcript, user_id
+            )
             await update.message.reply_text(
                 md2tgmd.escape(reply), parse_mode="MarkdownV2"
             )
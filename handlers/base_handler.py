@@ -3,6 +3,11 @@ from telegram import Update
 from telegram.ext import ContextTypes
 from services.auth import AuthService
 from services.config_service import Config
+from services.metrics import HANDLER_SECONDS
+from services.tracing import tracer
+from services.loop_monitor import handler_context
+from services.profiler import profiler
+from storage.locks import DialogLockTimeout
 
 
 class BaseHandler:
@@ -14,13 +19,27 @@ class BaseHandler:
     
     async def handle(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Base handler method"""
-        # Check authorization first
-        if not await self.auth_service.is_authorized(update):
-            await self.auth_service.send_unauthorized_message(update)
-            return
-            
-        # Call the actual handler implementation
-        await self.handle_authorized(update, context)
+        handler = self.__class__.__name__
+        user = update.effective_user
+        with HANDLER_SECONDS.time(handler=handler), tracer.span(
+            "handle", handler=handler, update_id=update.update_id
+        ), handler_context(
+            handler=handler, user_id=user.id if user else None
+        ), profiler.profile("handler", handler):
+            # Check authorization first
+            if not await self.auth_service.is_authorized(update):
+                await self.auth_service.send_unauthorized_message(update)
+                return
+
+            # Call the actual handler implementation
+            try:
+                await self.handle_authorized(update, context)
+            except DialogLockTimeout as e:
+                self.logger.warning(f"{handler}: {e}")
+                if update.effective_message:
+                    await update.effective_message.reply_text(
+                        "Предыдущее сообщение ещё обрабатывается, попробуйте ещё раз."
+                    )
     
     async def handle_unauthorized(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         await self.handle_unauthorized(update, context)
@@ -1,18 +1,18 @@
+import asyncio
 import logging
 import os
 from datetime import datetime, timezone
-from pathlib import Path
 from telegram import Update
 from telegram.ext import ContextTypes
+from telegram.helpers import escape_markdown
 from handlers.base_handler import BaseHandler
 from services.config_service import Config
 from clients.icsclient import ICSClient
-import md2tgmd
-
+from services.skills import skills
 
 EDITABLE_FIELDS = {"name", "url", "client_type", "timezone"}
-SKILL_FILE = Path(__file__).resolve().parent.parent / "skills" / "calendar.md"
-INFO_FILE = Path(__file__).resolve().parent.parent / "skills" / "calendar_info.md"
+HELP_SKILL = "calendar"
+INFO_SKILL = "calendar_info"
 
 
 class CalendarsHandler(BaseHandler):
@@ -41,6 +41,8 @@ class CalendarsHandler(BaseHandler):
             await self._edit_calendar(update, args[1], args[2], "", chat_id)
         elif sub == "event" and len(args) >= 3:
             await self._create_event(update, args[1], " ".join(args[2:]), chat_id)
+        elif sub == "events" and len(args) >= 2:
+            await self._create_events(update, args[1], chat_id)
         elif sub == "add":
             await self._add_calendar(update, args[1:], chat_id)
         elif sub == "info":
@@ -52,9 +54,8 @@ class CalendarsHandler(BaseHandler):
 
     async def _send_help(self, update: Update):
         try:
-            text = SKILL_FILE.read_text(encoding="utf-8")
             await update.message.reply_text(
-                md2tgmd.escape(text), parse_mode="MarkdownV2"
+                skills.escaped(HELP_SKILL), parse_mode="MarkdownV2"
             )
         except Exception as e:
             self.logger.error(f"Failed to read skill file: {e}")
@@ -67,14 +68,14 @@ class CalendarsHandler(BaseHandler):
                 "/calendars edit <id> <field> <value> — изменить поле (name, url, client_type, timezone)\n"
                 "/calendars event <id> <summary> — создать событие на сегодня\n"
                 "/calendars event <id> <summary> | <start> — с указанием начала (ISO)\n"
-                "/calendars event <id> <summary> | <start> | <end> — с началом и концом",
+                "/calendars event <id> <summary> | <start> | <end> — с началом и концом\n"
+                "/calendars events <id> — несколько событий, по одному на строку",
             )
 
     async def _send_info(self, update: Update):
         try:
-            text = INFO_FILE.read_text(encoding="utf-8")
             await update.message.reply_text(
-                md2tgmd.escape(text), parse_mode="MarkdownV2"
+                skills.escaped(INFO_SKILL), parse_mode="MarkdownV2"
             )
         except Exception as e:
             self.logger.error(f"Failed to read info file: {e}")
@@ -174,6 +175,64 @@ class CalendarsHandler(BaseHandler):
             )
 
     async def _create_event(self, update: Update, cal_id: str, rest: str, chat_id: str):
+        payload, error = self._parse_event(rest)
+        if error:
+            await update.message.reply_text(error)
+            return
+        summary = escape_markdown(payload["summary"], version=1)
+
+        success = self.ics_client.create_event(cal_id, chat_id, **payload)
+        if success:
+            await update.message.reply_text(
+                f"Событие «{summary}» создано в календаре `{cal_id}`.",
+                parse_mode="Markdown",
+            )
+        else:
+            await update.message.reply_text(
+                f"Не удалось создать событие в календаре `{cal_id}`.",
+                parse_mode="Markdown",
+            )
+
+    async def _create_events(self, update: Update, cal_id: str, chat_id: str):
+        # Events follow the command, one per line: <summary> [| start [| end]]
+        lines = (update.message.text or "").splitlines()[1:]
+        lines = [line.strip() for line in lines if line.strip()]
+        if not lines:
+            await update.message.reply_text(
+                "Использование: /calendars events <id>\n"
+                "<summary> | <start> | <end>\n"
+                "<summary> | <start> | <end>\n"
+                "... — по одному событию на строку"
+            )
+            return
+
+        payloads = []
+        for number, line in enumerate(lines, start=1):
+            payload, error = self._parse_event(line)
+            if error:
+                await update.message.reply_text(f"Строка {number}: {error}")
+                return
+            payloads.append(payload)
+
+        results = await asyncio.to_thread(
+            self.ics_client.create_events, cal_id, chat_id, payloads
+        )
+        failed = [r["index"] for r in results if r["status"] != "ok"]
+        created = len(results) - len(failed)
+        msg = f"Создано событий в календаре `{cal_id}`: {created} из {len(results)}."
+        if failed:
+            msg += "\nНе удалось создать: " + ", ".join(
+                f"«{escape_markdown(payloads[i]['summary'], version=1)}»"
+                for i in failed
+            )
+        await update.message.reply_text(msg, parse_mode="Markdown")
+
+    @staticmethod
+    def _parse_event(rest: str):
+        """Parse '<summary> [| start [| end]]' into an ICS payload.
+
+        Returns (payload, None) on success or (None, error message).
+        """
         parts = [p.strip() for p in rest.split("|")]
         summary = parts[0]
         start_str = parts[1] if len(parts) > 1 else ""
@@ -184,10 +243,9 @@ class CalendarsHandler(BaseHandler):
             try:
                 start = datetime.fromisoformat(start_str)
             except ValueError:
-                await update.message.reply_text(
+                return None, (
                     "Неверный формат даты. Используйте ISO: 2026-07-28T12:00:00+03:00"
                 )
-                return
         else:
             start = now.replace(hour=0, minute=0, second=0, microsecond=0)
 
@@ -195,8 +253,7 @@ class CalendarsHandler(BaseHandler):
             try:
                 end = datetime.fromisoformat(end_str)
             except ValueError:
-                await update.message.reply_text("Неверный формат даты окончания.")
-                return
+                return None, "Неверный формат даты окончания."
         else:
             end = None
 
@@ -208,15 +265,4 @@ class CalendarsHandler(BaseHandler):
             "end": end.isoformat() if end else None,
             "all_day": not bool(start_str),
         }
-
-        success = self.ics_client.create_event(cal_id, chat_id, **payload)
-        if success:
-            await update.message.reply_text(
-                f"Событие «{summary}» создано в календаре `{cal_id}`.",
-                parse_mode="Markdown",
-            )
-        else:
-            await update.message.reply_text(
-                f"Не удалось создать событие в календаре `{cal_id}`.",
-                parse_mode="Markdown",
-            )
+        return payload, None
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
@@ -27,7 +28,7 @@ class CallbackHandler(BaseHandler):
     async def _handle_topic_selection(self, query, user_id: int, topic_name: str):
         """Handle topic selection from inline buttons"""
         # Update the user's current topic using existing function
-        self.dialog_service.set_current_topic(user_id, topic_name)
+        await asyncio.to_thread(self.dialog_service.set_current_topic, user_id, topic_name)
         
         if topic_name == "default":
             # Show list of all topics when in default mode
@@ -51,7 +52,7 @@ class CallbackHandler(BaseHandler):
     
     async def _show_topic_list(self, query, user_id: int):
         """Show the list of available topics with inline buttons"""
-        dialog = self.dialog_service.storage.load_dialog(user_id)
+        dialog = await asyncio.to_thread(self.dialog_service.storage.load_dialog, user_id)
         # Filter out "default" from the topic list
         topics = [topic for topic in dialog["topics"].keys() if topic != "default"]
         
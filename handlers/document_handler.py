@@ -1,11 +1,11 @@
+import asyncio
 import tempfile
 from telegram import Update
 from telegram.ext import ContextTypes
-from services.yandex_index_service import YandexIndexService
-from storage.file_storage import FileDialogStorage
+from services.yandex_index_service import YandexIndexService, get_sdk
+from storage.factory import get_locks, get_storage
 from services.dialog_service import DialogService
 from services.config_service import Config
-from yandex_ai_studio_sdk import AIStudio
 from handlers.base_handler import BaseHandler
 
 
@@ -20,19 +20,21 @@ class DocumentHandler(BaseHandler):
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
         user_id = update.effective_user.id
-        storage = FileDialogStorage()
+        storage = get_storage(self.config)
         # Получаем текущий топик пользователя
-        dialog_data = storage.load_dialog(user_id)
-        current_topic = dialog_data.get("current_topic", "default")
+        current_topic = await asyncio.to_thread(storage.get_current_topic, user_id)
 
         # Инициализируем YandexIndexService
-        sdk = AIStudio(
-            folder_id=self.config.getCloudFolder(), auth=self.config.getCloudKey()
-        )
+        sdk = get_sdk(self.config)
         index_service = YandexIndexService(
-            sdk, self.config.getCloudFolder(), DialogService(storage)
+            sdk,
+            self.config.getCloudFolder(),
+            DialogService(storage, get_locks(self.config)),
+        )
+        # May create the index and save its id under the dialog lock
+        index_name = await asyncio.to_thread(
+            index_service.get_index_name, user_id, current_topic
         )
-        index_name = index_service.get_index_name(user_id, current_topic)
 
         self.logger.info(f"Using index name: {index_name}")
         user_input = update.message.text or update.message.caption or ""
@@ -58,7 +60,9 @@ class DocumentHandler(BaseHandler):
 
             # Загружаем файл в индекс
             try:
-                index_service.upload_file_to_index(temp_path, file_name, index_name)
+                await asyncio.to_thread(
+                    index_service.upload_file_to_index, temp_path, file_name, index_name
+                )
                 self.logger.info(
                     f"File uploaded and indexed successfully to {index_name}"
                 )
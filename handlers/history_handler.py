@@ -0,0 +1,56 @@
+import asyncio
+import json
+from telegram import Update
+from telegram.ext import ContextTypes
+from services.dialog_service import DialogService
+from handlers.base_handler import BaseHandler
+
+MAX_RESULTS = 10
+# Characters of each found message shown in the reply
+MAX_SNIPPET = 300
+
+
+class HistoryHandler(BaseHandler):
+    """Handle /export and /search commands over the full dialog history"""
+
+    def __init__(self, config, dialog_service: DialogService):
+        super().__init__(config)
+        self.dialog_service = dialog_service
+
+    async def handle_authorized(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ):
+        user_id = update.effective_user.id
+        command, _, query = (update.message.text or "").partition(" ")
+
+        # The archive is read here only: keep the event loop free
+        if command.startswith("/search"):
+            await self._search(update, user_id, query.strip())
+        else:
+            await self._export(update, user_id)
+
+    async def _export(self, update: Update, user_id: int):
+        dialog = await asyncio.to_thread(self.dialog_service.export_dialog, user_id)
+        data = json.dumps(dialog, ensure_ascii=False, indent=2).encode("utf-8")
+        await update.message.reply_document(
+            document=data, filename=f"dialog_{user_id}.json"
+        )
+
+    async def _search(self, update: Update, user_id: int, query: str):
+        if not query:
+            await update.message.reply_text("Использование: /search <текст>")
+            return
+        found = await asyncio.to_thread(
+            self.dialog_service.search_messages, user_id, query, None, MAX_RESULTS
+        )
+        if not found:
+            await update.message.reply_text("Ничего не найдено")
+            return
+        lines = []
+        for item in found:
+            message = item["message"]
+            text = message.get("text", "")
+            if len(text) > MAX_SNIPPET:
+                text = text[:MAX_SNIPPET] + "…"
+            lines.append(f"[{item['topic']}] {message.get('role', '')}: {text}")
+        await update.message.reply_text("\n\n".join(lines))
@@ -1,3 +1,4 @@
+import asyncio
 from telegram import Update
 from telegram.ext import ContextTypes
 from services.yandexgpt_service import YandexGPTService
@@ -24,23 +25,33 @@ class TextHandler(BaseHandler):
         user_input = update.message.text or update.message.caption or ""
         self.logger.info(f"Received text message: {user_input}")
 
-        # Add user message to dialog history
-        self.dialog_service.add_message_to_topic(
-            user_id, {"role": "user", "text": user_input}
+        # Dialog storage and its per-user lock block: run them off the loop
+        await asyncio.to_thread(
+            self.dialog_service.add_message_to_topic,
+            user_id,
+            {"role": "user", "text": user_input},
         )
 
         # Get last 15 messages for context
-        dialog_context = self.dialog_service.get_last_messages(user_id, 15)
+        dialog_context = await asyncio.to_thread(
+            self.dialog_service.get_last_messages, user_id, 15
+        )
 
         try:
-            reply = self.gpt.ask_yandexgpt_with_context(
-                user_input, dialog_context, user_id
+            # Blocking model call: keep the event loop free for other users
+            reply = await asyncio.to_thread(
+                self.gpt.ask_yandexgpt_with_context,
+                user_input,
+                dialog_context,
+                user_id,
             )
             self.logger.info("TextHandler received response from YandexGPT")
 
             # Add assistant message to dialog history
-            self.dialog_service.add_message_to_topic(
-                user_id, {"role": "assistant", "text": reply}
+            await asyncio.to_thread(
+                self.dialog_service.add_message_to_topic,
+                user_id,
+                {"role": "assistant", "text": reply},
             )
 
             await update.message.reply_text(
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
@@ -21,7 +22,9 @@ class TopicHandler(BaseHandler):
         
         if topic_name:
             # Set the current topic
-            response = self.dialog_service.set_current_topic(user_id, topic_name)
+            response = await asyncio.to_thread(
+                self.dialog_service.set_current_topic, user_id, topic_name
+            )
             
             if topic_name == "default":
                 # Show list of topics with buttons
@@ -37,7 +40,7 @@ class TopicHandler(BaseHandler):
     
     async def _show_topic_buttons(self, update: Update, user_id: int):
         """Show topic selection buttons"""
-        dialog = self.dialog_service.storage.load_dialog(user_id)
+        dialog = await asyncio.to_thread(self.dialog_service.storage.load_dialog, user_id)
         # Filter out "default" from the topic list
         topics = [topic for topic in dialog["topics"].keys() if topic != "default"]
         
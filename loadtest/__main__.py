@@ -0,0 +1,4 @@
+import sys
+from loadtest.harness import main
+
+sys.exit(main())
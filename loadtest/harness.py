@@ -0,0 +1,429 @@
+import argparse
+import asyncio
+import bisect
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import tempfile
+import time
+from typing import Dict, List, Optional
+import requests
+import yaml
+from loadtest.stubs import FAILURE_MARKERS, StubSettings, serve_stubs
+
+UPDATE_TYPES = ("text", "voice", "document", "calendar")
+FIRST_USER_ID = 500000
+
+TEXTS = (
+    "Что у меня завтра?",
+    "Найди свободное окно на этой неделе",
+    "Напомни, о чём мы говорили",
+    "Составь план на пятницу",
+)
+CALENDAR_COMMANDS = ("/calendars", "/calendars event cal-{user} Созвон с командой")
+
+
+def make_update(kind: str, update_id: int, user_id: int, rng: random.Random) -> dict:
+    """Telegram update JSON of one synthetic user action."""
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+    }
+    if kind == "text":
+        message["text"] = rng.choice(TEXTS)
+    elif kind == "voice":
+        message["voice"] = {
+            "file_id": f"voice-{update_id}",
+            "file_unique_id": f"voice-{update_id}",
+            "duration": 3,
+            "mime_type": "audio/ogg",
+        }
+    elif kind == "document":
+        message["document"] = {
+            "file_id": f"doc-{update_id}",
+            "file_unique_id": f"doc-{update_id}",
+            "file_name": f"notes-{update_id}.txt",
+            "mime_type": "text/plain",
+        }
+        message["caption"] = "Сохрани заметки"
+    elif kind == "calendar":
+        text = rng.choice(CALENDAR_COMMANDS).format(user=user_id)
+        command = text.split()[0]
+        message["text"] = text
+        message["entities"] = [
+            {"type": "bot_command", "offset": 0, "length": len(command)}
+        ]
+    else:
+        raise ValueError(f"Unknown update type: {kind}")
+    return {"update_id": update_id, "message": message}
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Linear-interpolated percentile (0..100) of ``values``."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class Sample:
+    """One injected update and what happened to it."""
+
+    __slots__ = ("kind", "update_id", "user_id", "injected", "started", "finished")
+
+    def __init__(self, kind: str, update_id: int, user_id: int):
+        self.kind = kind
+        self.update_id = update_id
+        self.user_id = user_id
+        self.injected = time.time()
+        self.started = None
+        self.finished = None
+
+
+def classify(samples: List[Sample], sent: List[dict], failed: set) -> Dict[int, str]:
+    """Error reason per failed update id.
+
+    Replies are matched to updates by chat and time: one user's updates
+    are handled one at a time, so a reply belongs to the update of that
+    chat whose handler was running when the stub received it.
+    """
+    by_user: Dict[int, List[Sample]] = {}
+    for sample in samples:
+        if sample.started is not None:
+            by_user.setdefault(sample.user_id, []).append(sample)
+    for runs in by_user.values():
+        runs.sort(key=lambda s: s.started)
+    replies: Dict[int, List[str]] = {}
+    for message in sent:
+        runs = by_user.get(message["chat_id"], [])
+        index = bisect.bisect_right([s.started for s in runs], message["time"]) - 1
+        if index >= 0:
+            replies.setdefault(runs[index].update_id, []).append(message["text"])
+
+    errors = {}
+    for sample in samples:
+        texts = replies.get(sample.update_id, [])
+        if sample.finished is None:
+            errors[sample.update_id] = "timeout"
+        elif sample.update_id in failed:
+            errors[sample.update_id] = "exception"
+        elif not texts:
+            errors[sample.update_id] = "no reply"
+        elif any(marker in text for text in texts for marker in FAILURE_MARKERS):
+            errors[sample.update_id] = "error reply"
+    return errors
+
+
+def summarize(samples: List[Sample], errors: Dict[int, str], elapsed: float) -> dict:
+    """Throughput, latency percentiles (ms) and errors per update type."""
+    report = {}
+    for kind in UPDATE_TYPES + ("all",):
+        group = [s for s in samples if kind == "all" or s.kind == kind]
+        if not group:
+            continue
+        latencies = [
+            (s.finished - s.injected) * 1000 for s in group if s.finished is not None
+        ]
+        reasons: Dict[str, int] = {}
+        for s in group:
+            if s.update_id in errors:
+                reasons[errors[s.update_id]] = reasons.get(errors[s.update_id], 0) + 1
+        failed = sum(reasons.values())
+        report[kind] = {
+            "count": len(group),
+            "completed": len(latencies),
+            "throughput": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+            "error_rate": round(failed / len(group), 4),
+            "errors": reasons,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": max(latencies) if latencies else None,
+        }
+    return report
+
+
+def format_report(report: dict, elapsed: float) -> str:
+    def ms(value):
+        return "-" if value is None else f"{value:.0f}"
+
+    lines = [
+        f"Run time {elapsed:.1f}s",
+        f"{'type':<10}{'count':>7}{'done':>7}{'upd/s':>8}{'err %':>7}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}  errors",
+    ]
+    for kind, row in report.items():
+        errors = ", ".join(f"{k}: {v}" for k, v in sorted(row["errors"].items()))
+        lines.append(
+            f"{kind:<10}{row['count']:>7}{row['completed']:>7}"
+            f"{row['throughput']:>8.2f}{row['error_rate'] * 100:>7.1f}"
+            f"{ms(row['p50_ms']):>9}{ms(row['p95_ms']):>9}{ms(row['p99_ms']):>9}"
+            f"{ms(row['max_ms']):>9}  {errors}"
+        )
+    return "\n".join(lines)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def deep_merge(base: dict, override: dict) -> dict:
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+class LoadTest:
+    """Runs the handlers built by ``bot.build_application`` against the
+    stand-ins in ``loadtest.stubs`` and injects synthetic updates.
+
+    Updates of every type arrive as a Poisson process at ``rates``
+    (updates per second) from ``users`` whitelisted users and go through
+    the application's update processor, so per-user ordering,
+    ``concurrent_updates`` and the outbound rate limiter are all in play.
+    """
+
+    def __init__(
+        self,
+        rates: Dict[str, float],
+        duration: float,
+        users: int,
+        settings: StubSettings,
+        base_config: Optional[dict] = None,
+        concurrent_updates: Optional[int] = None,
+        drain: float = 60.0,
+        seed: Optional[int] = None,
+    ):
+        self.rates = {k: v for k, v in rates.items() if v > 0}
+        self.duration = duration
+        self.users = [FIRST_USER_ID + i for i in range(users)]
+        self.settings = settings
+        self.base_config = base_config or {}
+        self.concurrent_updates = concurrent_updates
+        self.drain = drain
+        self.rng = random.Random(seed)
+        self.samples: List[Sample] = []
+        self.failed = set()
+        self._update_ids = iter(range(1, 10**9))
+        self._tasks = set()
+
+    def bot_config(self, http_url: str, grpc_address: str, workdir: str) -> dict:
+        """The bot's config with every external service pointing at a stub."""
+        bot = {
+            "token": "100000:LOADTEST",
+            "whitelist": self.users,
+            "api_url": f"{http_url}/telegram",
+            "uploads_dir": os.path.join(workdir, "uploads"),
+        }
+        # Dialogs of the synthetic users stay in the temporary workdir
+        storage = {"dialogs_dir": os.path.join(workdir, "dialogs")}
+        if self.concurrent_updates:
+            bot["concurrent_updates"] = self.concurrent_updates
+        return deep_merge(
+            self.base_config,
+            {
+                "bot": bot,
+                "storage": storage,
+                "yandex": {
+                    "key": "loadtest",
+                    "model": "yandexgpt",
+                    "base_url": f"{http_url}/openai/v1",
+                    "user_index": {},
+                },
+                "ycloud": {
+                    "api_key": "loadtest",
+                    "folder_id": "loadtest",
+                    "stt_url": f"{http_url}/stt/recognize",
+                    "endpoint": grpc_address,
+                    "verify": False,
+                },
+                "ics": {"api_key": "loadtest", "url": f"{http_url}/ics"},
+            },
+        )
+
+    def start_stubs(self):
+        http_port, grpc_port = free_port(), free_port()
+        process = multiprocessing.get_context("spawn").Process(
+            target=serve_stubs,
+            args=(self.settings, http_port, grpc_port),
+            name="loadtest-stubs",
+            daemon=True,
+        )
+        process.start()
+        http_url = f"http://127.0.0.1:{http_port}"
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                requests.get(f"{http_url}/_loadtest/health", timeout=1)
+                break
+            except requests.ConnectionError:
+                if time.monotonic() > deadline or not process.is_alive():
+                    process.terminate()
+                    raise RuntimeError("Load test stubs did not start")
+                time.sleep(0.1)
+        return process, http_url, f"127.0.0.1:{grpc_port}"
+
+    def run(self) -> dict:
+        process, http_url, grpc_address = self.start_stubs()
+        try:
+            with tempfile.TemporaryDirectory(prefix="avbot-loadtest-") as workdir:
+                os.makedirs(os.path.join(workdir, "uploads"))
+                path = os.path.join(workdir, "config.yml")
+                with open(path, "w", encoding="utf-8") as f:
+                    yaml.safe_dump(
+                        self.bot_config(http_url, grpc_address, workdir),
+                        f,
+                        allow_unicode=True,
+                    )
+                # bot reads its config on import
+                os.environ["CONFIG_PATH"] = path
+                bot = importlib.import_module("bot")
+                app, _ = bot.build_application(with_updater=False)
+
+                started = time.monotonic()
+                asyncio.run(self._drive(app))
+                elapsed = time.monotonic() - started
+                sent = requests.get(f"{http_url}/_loadtest/sent", timeout=10).json()
+        finally:
+            process.terminate()
+            process.join(5)
+
+        errors = classify(self.samples, sent["sent"], self.failed)
+        return {
+            "elapsed": elapsed,
+            "updates": summarize(self.samples, errors, elapsed),
+            "stub_calls": sent["counters"],
+        }
+
+    async def _drive(self, app) -> None:
+        async def on_error(update, context):
+            if update is not None:
+                self.failed.add(update.update_id)
+
+        app.add_error_handler(on_error)
+        async with app:
+            await app.start()
+            deadline = asyncio.get_running_loop().time() + self.duration
+            await asyncio.gather(
+                *(
+                    self._arrivals(app, kind, rate, deadline)
+                    for kind, rate in self.rates.items()
+                )
+            )
+            if self._tasks:
+                await asyncio.wait(self._tasks, timeout=self.drain)
+            await app.stop()
+
+    async def _arrivals(self, app, kind: str, rate: float, deadline: float) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.rng.expovariate(rate))
+            if loop.time() >= deadline:
+                return
+            user_id = self.rng.choice(self.users)
+            data = make_update(kind, next(self._update_ids), user_id, self.rng)
+            task = asyncio.create_task(self._dispatch(app, kind, data))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, app, kind: str, data: dict) -> None:
+        from telegram import Update
+
+        update = Update.de_json(data, app.bot)
+        sample = Sample(kind, update.update_id, update.effective_user.id)
+        self.samples.append(sample)
+
+        async def handle():
+            sample.started = time.time()
+            try:
+                await app.process_update(update)
+            finally:
+                sample.finished = time.time()
+
+        await app.update_processor.process_update(update, handle())
+
+
+def load_script(path: Optional[str]) -> list:
+    if not path:
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m loadtest",
+        description="Load test of the bot's handlers against local stand-ins",
+    )
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--users", type=int, default=20)
+    for kind, rate in (("text", 2.0), ("voice", 0.5), ("document", 0.1)):
+        parser.add_argument(f"--{kind}", type=float, default=rate, help="updates/s")
+    parser.add_argument("--calendar", type=float, default=0.5, help="updates/s")
+    parser.add_argument("--gpt-latency", type=float, default=0.8)
+    parser.add_argument("--gpt-jitter", type=float, default=0.2)
+    parser.add_argument("--gpt-error-rate", type=float, default=0.0)
+    parser.add_argument("--tool-script", help="JSON list of model steps")
+    parser.add_argument("--stt-latency", type=float, default=0.3)
+    parser.add_argument("--ics-latency", type=float, default=0.05)
+    parser.add_argument("--telegram-latency", type=float, default=0.02)
+    parser.add_argument("--index-latency", type=float, default=0.05)
+    parser.add_argument("--concurrent-updates", type=int)
+    parser.add_argument("--config", help="bot config to start from (rate limits, ...)")
+    parser.add_argument("--drain", type=float, default=60, help="seconds to finish")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    base_config = {}
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            base_config = yaml.safe_load(f) or {}
+    settings = StubSettings(
+        telegram_latency=args.telegram_latency,
+        gpt_latency=args.gpt_latency,
+        gpt_jitter=args.gpt_jitter,
+        gpt_error_rate=args.gpt_error_rate,
+        tool_script=load_script(args.tool_script),
+        stt_latency=args.stt_latency,
+        ics_latency=args.ics_latency,
+        index_latency=args.index_latency,
+    )
+    test = LoadTest(
+        rates={kind: getattr(args, kind) for kind in UPDATE_TYPES},
+        duration=args.duration,
+        users=args.users,
+        settings=settings,
+        base_config=base_config,
+        concurrent_updates=args.concurrent_updates,
+        drain=args.drain,
+        seed=args.seed,
+    )
+    # Configured before bot is imported, so its INFO logging stays off
+    logging.basicConfig(level=args.log_level)
+    result = test.run()
+
+    print(format_report(result["updates"], result["elapsed"]))
+    print(
+        "Stub calls: " + ", ".join(f"{k}={v}" for k, v in result["stub_calls"].items())
+    )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0 if result["updates"] else 1
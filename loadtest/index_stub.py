@@ -0,0 +1,192 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import grpc
+from google.protobuf.any_pb2 import Any
+from yandex.cloud.ai.assistants.v1.searchindex import (
+    search_index_file_pb2,
+    search_index_file_service_pb2,
+    search_index_file_service_pb2_grpc,
+    search_index_pb2,
+    search_index_service_pb2,
+    search_index_service_pb2_grpc,
+)
+from yandex.cloud.ai.common.common_pb2 import ExpirationConfig
+from yandex.cloud.ai.files.v1 import file_pb2, file_service_pb2_grpc
+from yandex.cloud.endpoint import (
+    api_endpoint_pb2,
+    api_endpoint_service_pb2,
+    api_endpoint_service_pb2_grpc,
+)
+from yandex.cloud.operation import (
+    operation_pb2,
+    operation_service_pb2_grpc,
+)
+
+# Service ids the SDK resolves through the endpoint service
+SERVICES = ("ai-assistants", "ai-files", "operation")
+INDEX_TYPES = ("text_search_index", "vector_search_index", "hybrid_search_index")
+
+
+def _expiration(request) -> ExpirationConfig:
+    if request.HasField("expiration_config") and request.expiration_config.ttl_days:
+        return request.expiration_config
+    return ExpirationConfig(expiration_policy=ExpirationConfig.STATIC, ttl_days=7)
+
+
+class AIStudioStub:
+    """In-memory AI Studio gRPC services used by the bot: endpoint discovery,
+    files, search indexes and their operations. Operations complete at once;
+    every call waits ``latency`` seconds first."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.address = None
+        self.indexes = {}
+        self.operations = {}
+        self.calls = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self, port: int = 0) -> str:
+        server = grpc.server(ThreadPoolExecutor(max_workers=16))
+        api_endpoint_service_pb2_grpc.add_ApiEndpointServiceServicer_to_server(
+            _Endpoints(self), server
+        )
+        file_service_pb2_grpc.add_FileServiceServicer_to_server(_Files(self), server)
+        search_index_service_pb2_grpc.add_SearchIndexServiceServicer_to_server(
+            _SearchIndexes(self), server
+        )
+        search_index_file_service_pb2_grpc.add_SearchIndexFileServiceServicer_to_server(
+            _SearchIndexFiles(self), server
+        )
+        operation_service_pb2_grpc.add_OperationServiceServicer_to_server(
+            _Operations(self), server
+        )
+        port = server.add_insecure_port(f"127.0.0.1:{port}")
+        server.start()
+        self._server = server
+        self.address = f"127.0.0.1:{port}"
+        return self.address
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.stop(grace=None)
+
+    def call(self) -> None:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}{next(self._ids):08d}"
+
+    def operation(self, result) -> operation_pb2.Operation:
+        packed = Any()
+        packed.Pack(result)
+        operation = operation_pb2.Operation(
+            id=self.new_id("op"), done=True, response=packed
+        )
+        self.operations[operation.id] = operation
+        return operation
+
+
+class _Endpoints(api_endpoint_service_pb2_grpc.ApiEndpointServiceServicer):
+    def __init__(self, stub: AIStudioStub):
+        self.stub = stub
+
+    def List(self, request, context):
+        return api_endpoint_service_pb2.ListApiEndpointsResponse(
+            endpoints=[
+                api_endpoint_pb2.ApiEndpoint(id=name, address=self.stub.address)
+                for name in SERVICES
+            ]
+        )
+
+
+class _Files(file_service_pb2_grpc.FileServiceServicer):
+    def __init__(self, stub: AIStudioStub):
+        self.stub = stub
+
+    def Create(self, request, context):
+        self.stub.call()
+        return file_pb2.File(
+            id=self.stub.new_id("file"),
+            folder_id=request.folder_id,
+            name=request.name,
+            mime_type=request.mime_type,
+            expiration_config=_expiration(request),
+        )
+
+
+class _SearchIndexes(search_index_service_pb2_grpc.SearchIndexServiceServicer):
+    def __init__(self, stub: AIStudioStub):
+        self.stub = stub
+
+    def List(self, request, context):
+        # The SDK asks for further pages until it gets an empty one
+        self.stub.call()
+        start = int(request.page_token or 0)
+        end = start + (request.page_size or 100)
+        return search_index_service_pb2.ListSearchIndicesResponse(
+            indices=list(self.stub.indexes.values())[start:end],
+            next_page_token=str(end),
+        )
+
+    def Create(self, request, context):
+        self.stub.call()
+        index = search_index_pb2.SearchIndex(
+            id=self.stub.new_id("index"),
+            folder_id=request.folder_id,
+            name=request.name,
+            expiration_config=_expiration(request),
+        )
+        kind = next((k for k in INDEX_TYPES if request.HasField(k)), None)
+        if kind:
+            getattr(index, kind).CopyFrom(getattr(request, kind))
+        else:
+            index.text_search_index.SetInParent()
+        self.stub.indexes[index.id] = index
+        return self.stub.operation(index)
+
+    def Get(self, request, context):
+        self.stub.call()
+        index = self.stub.indexes.get(request.search_index_id)
+        if index is None:
+            context.abort(grpc.StatusCode.NOT_FOUND, "search index not found")
+        return index
+
+
+class _SearchIndexFiles(
+    search_index_file_service_pb2_grpc.SearchIndexFileServiceServicer
+):
+    def __init__(self, stub: AIStudioStub):
+        self.stub = stub
+
+    def BatchCreate(self, request, context):
+        self.stub.call()
+        files = [
+            search_index_file_pb2.SearchIndexFile(
+                id=file_id, search_index_id=request.search_index_id
+            )
+            for file_id in request.file_ids
+        ]
+        return self.stub.operation(
+            search_index_file_service_pb2.BatchCreateSearchIndexFileResponse(
+                files=files
+            )
+        )
+
+
+class _Operations(operation_service_pb2_grpc.OperationServiceServicer):
+    def __init__(self, stub: AIStudioStub):
+        self.stub = stub
+
+    def Get(self, request, context):
+        operation = self.stub.operations.get(request.operation_id)
+        if operation is None:
+            context.abort(grpc.StatusCode.NOT_FOUND, "operation not found")
+        return operation
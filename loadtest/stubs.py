@@ -0,0 +1,284 @@
+import asyncio
+import itertools
+import json
+import random
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import parse_qs
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+# Replies that mean the update failed from the user's point of view
+FAILURE_MARKERS = ("Ошибка", "Не удалось")
+
+BOT_USER = {
+    "id": 100000,
+    "is_bot": True,
+    "first_name": "avbot",
+    "username": "avbot_loadtest_bot",
+}
+
+# Served for every voice/document download
+FILE_CONTENT = {
+    "voice": b"OggS" + bytes(4092),
+    "document": "Заметки для нагрузочного теста.\n".encode("utf-8") * 64,
+}
+
+
+class StubSettings:
+    """Latencies (seconds) and behaviour of the local stand-ins.
+
+    ``tool_script`` is the list of steps the model takes for every
+    request: ``{"tool": name, "arguments": {...}}`` asks the bot to call a
+    tool, ``{"text": "..."}`` (or the end of the script) is the answer.
+    """
+
+    def __init__(
+        self,
+        telegram_latency: float = 0.0,
+        gpt_latency: float = 0.5,
+        gpt_jitter: float = 0.0,
+        gpt_error_rate: float = 0.0,
+        tool_script: Optional[list] = None,
+        stt_latency: float = 0.3,
+        ics_latency: float = 0.05,
+        index_latency: float = 0.0,
+    ):
+        self.telegram_latency = telegram_latency
+        self.gpt_latency = gpt_latency
+        self.gpt_jitter = gpt_jitter
+        self.gpt_error_rate = gpt_error_rate
+        self.tool_script = tool_script or []
+        self.stt_latency = stt_latency
+        self.ics_latency = ics_latency
+        self.index_latency = index_latency
+
+
+async def _delay(latency: float, jitter: float = 0.0) -> None:
+    if jitter:
+        latency = random.uniform(latency - jitter, latency + jitter)
+    if latency > 0:
+        await asyncio.sleep(latency)
+
+
+def _user_text(items: list) -> str:
+    for item in reversed(items):
+        if item.get("role") == "user" and isinstance(item.get("content"), str):
+            return item["content"]
+    return ""
+
+
+def model_response(body: dict, script: list) -> dict:
+    """Responses API object: the next step of ``script`` for this conversation."""
+    items = body.get("input") or []
+    if isinstance(items, str):
+        items = [{"role": "user", "content": items}]
+    step_index = sum(1 for i in items if i.get("type") == "function_call_output")
+    step = script[step_index] if step_index < len(script) else {}
+    response_id = f"resp_{random.getrandbits(48):012x}"
+
+    if "tool" in step:
+        output = [
+            {
+                "type": "function_call",
+                "id": f"fc_{response_id}",
+                "call_id": f"call_{response_id}",
+                "name": step["tool"],
+                "arguments": json.dumps(step.get("arguments", {}), ensure_ascii=False),
+                "status": "completed",
+            }
+        ]
+    else:
+        text = step.get("text") or f"Ответ на «{_user_text(items)[:80]}»"
+        output = [
+            {
+                "type": "message",
+                "id": f"msg_{response_id}",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        ]
+    return {
+        "id": response_id,
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": body.get("model", ""),
+        "status": "completed",
+        "output": output,
+        "parallel_tool_calls": False,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": 100,
+            "output_tokens": 20,
+            "total_tokens": 120,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens_details": {"reasoning_tokens": 0},
+        },
+    }
+
+
+def _message(message_id: int, chat_id, text: str = None) -> dict:
+    message = {
+        "message_id": message_id,
+        "date": int(time.time()),
+        "chat": {"id": int(chat_id), "type": "private"},
+        "from": BOT_USER,
+    }
+    if text is not None:
+        message["text"] = text
+    return message
+
+
+def create_stub_app(settings: StubSettings) -> FastAPI:
+    """One app serving every HTTP stand-in under its own prefix:
+    ``/telegram`` (Bot API), ``/openai/v1`` (Responses API), ``/stt``
+    (SpeechKit recognition) and ``/ics`` (calendar service).
+    """
+    app = FastAPI()
+    sent = []
+    counters = {"responses": 0, "stt": 0, "ics": 0, "telegram": 0}
+    calendars = {}
+    message_ids = itertools.count(1)
+
+    # ── Harness ────────────────────────────────────
+    @app.get("/_loadtest/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/_loadtest/sent")
+    async def sent_messages():
+        return {"sent": sent, "counters": counters}
+
+    # ── Telegram Bot API ───────────────────────────
+    @app.post("/telegram/bot{token}/{method}")
+    async def bot_api(token: str, method: str, request: Request):
+        counters["telegram"] += 1
+        raw = await request.body()
+        if request.headers.get("content-type", "").startswith("application/json"):
+            params = json.loads(raw or b"{}")
+        else:
+            params = {k: v[0] for k, v in parse_qs(raw.decode("utf-8")).items()}
+        await _delay(settings.telegram_latency)
+
+        if method == "getMe":
+            result = BOT_USER
+        elif method == "getFile":
+            file_id = params.get("file_id", "")
+            kind = "voice" if file_id.startswith("voice") else "document"
+            result = {
+                "file_id": file_id,
+                "file_unique_id": file_id,
+                "file_size": len(FILE_CONTENT[kind]),
+                "file_path": f"{kind}/{file_id}.{'oga' if kind == 'voice' else 'txt'}",
+            }
+        elif method in ("sendMessage", "editMessageText"):
+            chat_id = params.get("chat_id")
+            sent.append(
+                {
+                    "chat_id": int(chat_id),
+                    "method": method,
+                    "text": params.get("text", ""),
+                    "time": time.time(),
+                }
+            )
+            result = _message(next(message_ids), chat_id, params.get("text", ""))
+        else:
+            result = True
+        return {"ok": True, "result": result}
+
+    @app.get("/telegram/file/bot{token}/{kind}/{name}")
+    async def bot_file(token: str, kind: str, name: str):
+        await _delay(settings.telegram_latency)
+        return Response(FILE_CONTENT.get(kind, b""))
+
+    # ── OpenAI-compatible Responses API ────────────
+    @app.post("/openai/v1/responses")
+    async def responses(request: Request):
+        counters["responses"] += 1
+        body = await request.json()
+        await _delay(settings.gpt_latency, settings.gpt_jitter)
+        if settings.gpt_error_rate and random.random() < settings.gpt_error_rate:
+            return JSONResponse(
+                {"error": {"message": "injected failure", "type": "server_error"}},
+                status_code=500,
+            )
+        return model_response(body, settings.tool_script)
+
+    # ── SpeechKit ──────────────────────────────────
+    @app.post("/stt/recognize")
+    async def recognize(request: Request):
+        counters["stt"] += 1
+        await request.body()
+        await _delay(settings.stt_latency)
+        return {"result": "Что у меня запланировано на завтра?"}
+
+    # ── ICS calendar service ───────────────────────
+    def user_calendars(user_id: str) -> list:
+        if user_id not in calendars:
+            calendars[user_id] = [
+                {
+                    "id": f"cal-{user_id}",
+                    "name": "Рабочий",
+                    "client_type": "caldav",
+                    "url": "https://caldav.example.com/work/",
+                    "timezone": "Europe/Moscow",
+                }
+            ]
+        return calendars[user_id]
+
+    @app.get("/ics/calendars")
+    async def get_calendars(user_id: str = ""):
+        counters["ics"] += 1
+        await _delay(settings.ics_latency)
+        return {"calendars": user_calendars(user_id)}
+
+    @app.post("/ics/calendars", status_code=201)
+    async def add_calendar(request: Request):
+        counters["ics"] += 1
+        payload = await request.json()
+        await _delay(settings.ics_latency)
+        owned = user_calendars(str(payload.get("chat_id", "")))
+        calendar = dict(payload, id=f"cal-{payload.get('chat_id')}-{len(owned)}")
+        owned.append(calendar)
+        return calendar
+
+    @app.get("/ics/calendars/{calendar_id}/events")
+    async def get_events(calendar_id: str):
+        counters["ics"] += 1
+        await _delay(settings.ics_latency)
+        return {"events": [], "synced_at": datetime.now(timezone.utc).isoformat()}
+
+    @app.post("/ics/calendars/{calendar_id}/events", status_code=201)
+    async def create_event(calendar_id: str, request: Request):
+        counters["ics"] += 1
+        payload = await request.json()
+        await _delay(settings.ics_latency)
+        return dict(payload, id=f"evt-{next(message_ids)}")
+
+    @app.put("/ics/calendars/{calendar_id}", status_code=204)
+    @app.delete("/ics/calendars/{calendar_id}", status_code=204)
+    async def change_calendar(calendar_id: str):
+        counters["ics"] += 1
+        await _delay(settings.ics_latency)
+        return Response(status_code=204)
+
+    return app
+
+
+def serve_stubs(settings: StubSettings, http_port: int, grpc_port: int) -> None:
+    """Stub process: the HTTP stand-ins and the AI Studio gRPC stand-in."""
+    import uvicorn
+    from loadtest.index_stub import AIStudioStub
+
+    index = AIStudioStub(settings.index_latency)
+    index.start(grpc_port)
+    uvicorn.run(
+        create_stub_app(settings),
+        host="127.0.0.1",
+        port=http_port,
+        log_level="warning",
+        access_log=False,
+    )
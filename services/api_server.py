@@ -1,18 +1,42 @@
+import asyncio
+import hmac
 import logging
-from datetime import datetime
-from pathlib import Path
-from fastapi import FastAPI, Depends, HTTPException, Header
+import os
+from datetime import datetime, timezone
+from fastapi import FastAPI, Depends, HTTPException, Header, Request
+from fastapi.responses import Response
+from fastapi.routing import APIRoute
 from pydantic import BaseModel, Field
-from typing import Annotated, Optional
-from telegram import Bot
+from typing import Annotated, Callable, List, Optional
+from telegram import Bot, Update
+from telegram.error import BadRequest, RetryAfter
+from telegram.ext import ExtBot
 import uvicorn
+from clients.icsclient import ICSClient
+from services.batch_sender import BatchSender
+from services.calendar_store import parse_dt
+from services.circuit_breaker import CLOSED, breaker_states
 from services.config_service import Config
+from services.delivery_queue import DEFAULT_QUEUE_FILE, DeliveryQueue
+from services.metrics import CONTENT_TYPE, metrics, render
+from services.profiler import SETTINGS, profiler
+from services.rate_limiter import BULK, PriorityRateLimiter, retry_after_seconds
+from services.sender_bridge import (
+    DEFAULT_SOCKET,
+    PROFILING_EVENT,
+    BridgeBot,
+    BridgeClient,
+    BridgeCore,
+    BridgeError,
+)
+from services.skills import skills
 from services.yandexgpt_service import YandexGPTService
 
+EVENT_TEMPLATE = "event_template"
+DEFAULT_EVENT_TEMPLATE = "📅 *{calendar_name}*\n\n🔔 *{summary}*\n\n{time_line}{location_line}{description_line}"
 
-EVENT_TEMPLATE_FILE = (
-    Path(__file__).resolve().parent.parent / "skills" / "event_template.md"
-)
+# Telegram rejects longer messages
+MAX_MESSAGE_LENGTH = 4096
 
 MONTHS_RU = [
     "",
@@ -43,6 +67,59 @@ class ErrorResponse(BaseModel):
     error: dict
 
 
+class HealthResponse(BaseModel):
+    status: str
+    breakers: dict = {}
+    outbound: Optional[dict] = None
+    workers: Optional[dict] = None
+    bridge: Optional[dict] = None
+
+
+class ProfilingState(BaseModel):
+    enabled: bool
+    sample_rate: float
+    slow_threshold_ms: float
+    directory: str
+    written: int
+
+
+class BatchAcceptedResponse(BaseModel):
+    status: str
+    batch_id: str
+    total: int
+
+
+class BatchItemStatus(BaseModel):
+    index: int
+    chat_id: int
+    status: str
+    message_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    status: str
+    total: int
+    sent: int
+    failed: int
+    pending: int
+    items: List[BatchItemStatus]
+
+
+class CalendarEventResult(BaseModel):
+    index: int
+    status: str
+    error: Optional[str] = None
+
+
+class CalendarEventsBatchResponse(BaseModel):
+    status: str
+    created: int
+    failed: int
+    results: List[CalendarEventResult]
+
+
 # ──────────────────────────────────────────────
 # Request models
 # ──────────────────────────────────────────────
@@ -63,6 +140,14 @@ class SendMessageRequest(BaseModel):
     )
 
 
+class SendBatchRequest(BaseModel):
+    """Send several text messages, delivered in the background."""
+
+    messages: List[SendMessageRequest] = Field(
+        ..., min_length=1, max_length=1000, description="Messages to send"
+    )
+
+
 class SendPhotoRequest(BaseModel):
     """Send a photo to a Telegram chat."""
 
@@ -118,9 +203,56 @@ class CalendarEventRequest(BaseModel):
     uid: str = Field("", description="Event UID")
 
 
+class CalendarEventItem(BaseModel):
+    """Single event to be created in a calendar."""
+
+    summary: str = Field(..., description="Event title/summary")
+    description: str = Field("", description="Event description")
+    location: str = Field("", description="Event location")
+    start: str = Field("", description="Start datetime (ISO format)")
+    end: str = Field("", description="End datetime (ISO format)")
+    all_day: bool = Field(False, description="All-day event flag")
+
+
+class CalendarEventsBatchRequest(BaseModel):
+    """Create several events in one calendar."""
+
+    user_id: str = Field(..., description="Calendar owner (Telegram chat ID)")
+    calendar_id: str = Field(..., description="Calendar ID")
+    events: List[CalendarEventItem] = Field(
+        ..., min_length=1, max_length=500, description="Events to create"
+    )
+
+
+class ProfilingSettings(BaseModel):
+    """Runtime profiler settings; omitted fields keep their value."""
+
+    enabled: Optional[bool] = Field(None, description="Profile requests")
+    sample_rate: Optional[float] = Field(
+        None, ge=0, le=1, description="Fraction of requests profiled"
+    )
+    slow_threshold_ms: Optional[float] = Field(
+        None, ge=0, description="Requests slower than this are always profiled"
+    )
+
+
 # ──────────────────────────────────────────────
 # API Server
 # ──────────────────────────────────────────────
+class ProfiledRoute(APIRoute):
+    """Route whose handler runs under the sampling profiler."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        path = self.path
+
+        async def profiled_handler(request: Request):
+            with profiler.profile("api", path):
+                return await handler(request)
+
+        return profiled_handler
+
+
 class ApiServer:
     """
     HTTP API server that wraps the Telegram bot.
@@ -137,20 +269,59 @@ class ApiServer:
         config: Config,
         host: str = "0.0.0.0",
         logger: logging.Logger = None,
+        update_queue: Optional[asyncio.Queue] = None,
+        webhook_secret: str = "",
+        worker_stats: Optional[Callable[[], dict]] = None,
+        bridge: Optional[BridgeClient] = None,
+        worker_metrics: Optional[Callable[[], list]] = None,
+        worker_profiling: Optional[Callable[[dict], None]] = None,
     ):
         self.api_key = api_key
-        self.bot = bot
+        # In a separate API process Telegram calls and stateful operations
+        # go through the bridge to the process that owns the bot token
+        self.bridge = bridge
+        self.bot = BridgeBot(bridge) if bridge else bot
+        self.core = BridgeCore(bridge) if bridge else self
         self.port = port
         self.host = host
         self.config = config
+        # Webhook mode: Telegram updates go to the PTB Application
+        self.update_queue = update_queue
+        self.webhook_secret = webhook_secret
+        # Supervisor mode: load of the bot worker processes
+        self.worker_stats = worker_stats
+        self.worker_metrics = worker_metrics
+        self.worker_profiling = worker_profiling
         self.gpt = YandexGPTService(config)
+        self.ics = ICSClient(config)
+        # API traffic goes through the shared outbound scheduler as bulk,
+        # behind interactive bot replies
+        self.send_options = {"rate_limit_args": BULK} if isinstance(bot, ExtBot) else {}
+        self.batches = None
+        self.deliveries = None
+        if not bridge:
+            self.batches = BatchSender(
+                concurrency=config.get("api", "batch_concurrency", 20),
+                retention=config.get("api", "batch_retention", 3600),
+            )
+            self.deliveries = DeliveryQueue(
+                path=config.get("api", "delivery_queue_file", DEFAULT_QUEUE_FILE),
+                dedup_window=config.get("api", "calendar_dedup_window", 600),
+                concurrency=config.get("api", "delivery_concurrency", 20),
+            )
+        self.digest = config.get("api", "calendar_digest", {}) or {}
         self.app = FastAPI(
             title="AVBot Telegram API",
             description="API for sending messages to Telegram via AVBot",
             version="1.0.0",
         )
+        self.app.router.route_class = ProfiledRoute
         self.logger = logger or logging.getLogger(__name__)
         self._register_routes()
+        if bridge:
+            # Profiler settings changed through another API process
+            bridge.on_event = self._bridge_event
+            self.app.router.add_event_handler("startup", self._sync_profiling)
 
     # ── Authentication dependency ──────────────────
     async def _authenticate(
@@ -164,12 +335,141 @@ class ApiServer:
                 detail={"code": 401, "message": "Unauthorized"},
             )
 
+    async def _authenticate_scrape(
+        self,
+        x_api_key: Annotated[Optional[str], Header(alias="x-api-key")] = None,
+        authorization: Annotated[Optional[str], Header()] = None,
+    ) -> None:
+        """Dependency for /metrics: the API key as x-api-key or as a bearer
+        token, which Prometheus sends with ``authorization.credentials``."""
+        scheme, _, token = (authorization or "").partition(" ")
+        if scheme.lower() == "bearer" and token:
+            x_api_key = x_api_key or token
+        if not x_api_key or not hmac.compare_digest(x_api_key, self.api_key):
+            raise HTTPException(
+                status_code=401,
+                detail={"code": 401, "message": "Unauthorized"},
+            )
+
+    async def _verify_webhook(
+        self,
+        secret_token: Annotated[
+            Optional[str], Header(alias="X-Telegram-Bot-Api-Secret-Token")
+        ] = None,
+    ) -> None:
+        """Dependency checking the secret token Telegram sends with updates."""
+        if not secret_token or not hmac.compare_digest(
+            secret_token, self.webhook_secret
+        ):
+            raise HTTPException(
+                status_code=403,
+                detail={"code": 403, "message": "Forbidden"},
+            )
+
+    def _telegram_error(self, e: Exception) -> HTTPException:
+        """Map a Telegram send failure to an HTTP error."""
+        if isinstance(e, BridgeError):
+            return HTTPException(
+                status_code=503,
+                detail={"code": 503, "message": str(e)},
+            )
+        if isinstance(e, RetryAfter):
+            retry_after = retry_after_seconds(e)
+            return HTTPException(
+                status_code=429,
+                detail={"code": 429, "message": str(e)},
+                headers={"Retry-After": str(int(retry_after) + 1)},
+            )
+        return HTTPException(
+            status_code=500,
+            detail={"code": 500, "message": str(e)},
+        )
+
     # ── Route registration ─────────────────────────
     def _register_routes(self):
-        @self.app.get("/health", response_model=SuccessResponse)
+        @self.app.get("/health", response_model=HealthResponse)
         async def health():
-            """Health check endpoint."""
-            return {"status": "ok"}
+            """Health check endpoint with backend circuit breaker states."""
+            breakers = breaker_states()
+            degraded = any(b["state"] != CLOSED for b in breakers.values())
+            health = {"breakers": breakers}
+            try:
+                health.update(await self.core.core_health())
+            except Exception as e:
+                degraded = True
+                health["bridge"] = {"error": str(e)}
+            health["status"] = "degraded" if degraded else "ok"
+            return health
+
+        if self.config.get("api", "metrics", False):
+
+            @self.app.get("/metrics", include_in_schema=False)
+            async def prometheus_metrics(
+                _: Annotated[None, Depends(self._authenticate_scrape)],
+            ):
+                """Prometheus scrape endpoint; it shares the port of the
+                public webhook, so it needs the API key too."""
+                try:
+                    families = await self.core.core_metrics()
+                except BridgeError as e:
+                    raise self._telegram_error(e)
+                return Response(render(families), media_type=CONTENT_TYPE)
+
+        if self.update_queue is not None or (self.bridge and self.webhook_secret):
+
+            @self.app.post("/telegram/webhook", include_in_schema=False)
+            async def telegram_webhook(
+                request: Request,
+                _: Annotated[None, Depends(self._verify_webhook)],
+            ):
+                """Receive a Telegram update and hand it to the bot application."""
+                try:
+                    data = await request.json()
+                    Update.de_json(data, None)
+                except Exception as e:
+                    self.logger.error("Invalid Telegram update: %s", e)
+                    raise HTTPException(
+                        status_code=400,
+                        detail={"code": 400, "message": "Invalid update"},
+                    )
+                try:
+                    await self.core.feed_update(data)
+                except Exception as e:
+                    self.logger.error("Failed to hand over Telegram update: %s", e)
+                    raise self._telegram_error(e)
+                return {"status": "ok"}
+
+        @self.app.get(
+            "/profiling",
+            response_model=ProfilingState,
+            responses={401: {"model": ErrorResponse}},
+        )
+        async def get_profiling(
+            _: Annotated[None, Depends(self._authenticate)],
+        ):
+            """Current profiler settings."""
+            return profiler.state()
+
+        @self.app.post(
+            "/profiling",
+            response_model=ProfilingState,
+            responses={401: {"model": ErrorResponse}},
+        )
+        async def set_profiling(
+            req: ProfilingSettings,
+            _: Annotated[None, Depends(self._authenticate)],
+        ):
+            """Turn profiling on or off and tune it without a restart."""
+            settings = req.model_dump(exclude_none=True)
+            self.logger.info("Profiling settings changed: %s", settings)
+            try:
+                state = await self.core.set_profiling(settings)
+            except BridgeError as e:
+                raise self._telegram_error(e)
+            if self.bridge:
+                # API routes of this process are profiled here
+                profiler.update(**settings)
+            return state
 
         @self.app.post(
             "/send",
@@ -194,14 +494,52 @@ class ApiServer:
                     disable_web_page_preview=req.disable_web_page_preview,
                     disable_notification=req.disable_notification,
                     reply_to_message_id=req.reply_to_message_id,
+                    **self.send_options,
                 )
                 return {"status": "sent", "message_id": msg.message_id}
             except Exception as e:
                 self.logger.error("Failed to send message: %s", e)
+                raise self._telegram_error(e)
+
+        @self.app.post(
+            "/sendBatch",
+            status_code=202,
+            response_model=BatchAcceptedResponse,
+            responses={401: {"model": ErrorResponse}},
+        )
+        async def send_batch(
+            req: SendBatchRequest,
+            _: Annotated[None, Depends(self._authenticate)],
+        ):
+            """Queue text messages for concurrent rate-limited delivery."""
+            try:
+                return await self.core.submit_batch(
+                    [message.model_dump() for message in req.messages]
+                )
+            except Exception as e:
+                self.logger.error("Failed to queue batch: %s", e)
+                raise self._telegram_error(e)
+
+        @self.app.get(
+            "/batch/{batch_id}",
+            response_model=BatchStatusResponse,
+            responses={401: {"model": ErrorResponse}, 404: {"model": ErrorResponse}},
+        )
+        async def batch_status(
+            batch_id: str,
+            _: Annotated[None, Depends(self._authenticate)],
+        ):
+            """Delivery status of every message in a batch."""
+            try:
+                status = await self.core.batch_status(batch_id)
+            except Exception as e:
+                raise self._telegram_error(e)
+            if status is None:
                 raise HTTPException(
-                    status_code=500,
-                    detail={"code": 500, "message": str(e)},
+                    status_code=404,
+                    detail={"code": 404, "message": "Batch not found"},
                 )
+            return status
 
         @self.app.post(
             "/sendPhoto",
@@ -220,14 +558,12 @@ class ApiServer:
                     photo=req.photo,
                     caption=req.caption,
                     parse_mode=req.parse_mode,
+                    **self.send_options,
                 )
                 return {"status": "sent", "message_id": msg.message_id}
             except Exception as e:
                 self.logger.error("Failed to send photo: %s", e)
-                raise HTTPException(
-                    status_code=500,
-                    detail={"code": 500, "message": str(e)},
-                )
+                raise self._telegram_error(e)
 
         @self.app.post(
             "/sendDocument",
@@ -246,14 +582,12 @@ class ApiServer:
                     document=req.document,
                     caption=req.caption,
                     filename=req.filename,
+                    **self.send_options,
                 )
                 return {"status": "sent", "message_id": msg.message_id}
             except Exception as e:
                 self.logger.error("Failed to send document: %s", e)
-                raise HTTPException(
-                    status_code=500,
-                    detail={"code": 500, "message": str(e)},
-                )
+                raise self._telegram_error(e)
 
         @self.app.post(
             "/sendAction",
@@ -270,14 +604,12 @@ class ApiServer:
                 await self.bot.send_chat_action(
                     chat_id=req.chat_id,
                     action=req.action,
+                    **self.send_options,
                 )
                 return {"status": "sent"}
             except Exception as e:
                 self.logger.error("Failed to send action: %s", e)
-                raise HTTPException(
-                    status_code=500,
-                    detail={"code": 500, "message": str(e)},
-                )
+                raise self._telegram_error(e)
 
         @self.app.post(
             "/forwardMessage",
@@ -300,51 +632,258 @@ class ApiServer:
                     chat_id=req.chat_id,
                     from_chat_id=req.from_chat_id,
                     message_id=req.message_id,
+                    **self.send_options,
                 )
                 return {"status": "sent", "message_id": msg.message_id}
             except Exception as e:
                 self.logger.error("Failed to forward message: %s", e)
-                raise HTTPException(
-                    status_code=500,
-                    detail={"code": 500, "message": str(e)},
-                )
+                raise self._telegram_error(e)
 
         @self.app.post(
             "/calendar/event",
+            status_code=202,
             response_model=SuccessResponse,
-            responses={401: {"model": ErrorResponse}},
+            responses={401: {"model": ErrorResponse}, 422: {"model": ErrorResponse}},
         )
         async def calendar_event(
             req: CalendarEventRequest,
             _: Annotated[None, Depends(self._authenticate)],
         ):
-            """Receive calendar events, format via template, and send to Telegram."""
+            """Validate a calendar event and queue its Telegram notification."""
             self.logger.info("Received calendar event: summary=%s", req.summary)
 
             try:
-                text = self._format_event(req)
-                await self.bot.send_message(
-                    chat_id=req.chat_id, text=text, parse_mode="Markdown"
-                )
-                self.logger.info(
-                    "Sent calendar event notification to chat %s", req.chat_id
-                )
-                return {"status": "sent"}
+                self._format_event(req)
             except Exception as e:
                 self.logger.error(
-                    "Failed to process calendar event for chat %s: %s", req.chat_id, e
+                    "Invalid calendar event for chat %s: %s", req.chat_id, e
                 )
                 raise HTTPException(
-                    status_code=500,
-                    detail={"code": 500, "message": str(e)},
+                    status_code=422,
+                    detail={"code": 422, "message": str(e)},
                 )
+            try:
+                return {"status": await self.core.calendar_event(req.model_dump())}
+            except Exception as e:
+                self.logger.error("Failed to queue calendar event: %s", e)
+                raise self._telegram_error(e)
 
-    def _format_event(self, req: CalendarEventRequest) -> str:
+        @self.app.post(
+            "/calendar/events:batch",
+            response_model=CalendarEventsBatchResponse,
+            responses={401: {"model": ErrorResponse}},
+        )
+        async def calendar_events_batch(
+            req: CalendarEventsBatchRequest,
+            _: Annotated[None, Depends(self._authenticate)],
+        ):
+            """Create several calendar events with bounded concurrency."""
+            self.logger.info(
+                "Creating %d events in calendar %s for user %s",
+                len(req.events),
+                req.calendar_id,
+                req.user_id,
+            )
+            results = await asyncio.to_thread(
+                self.ics.create_events,
+                req.calendar_id,
+                req.user_id,
+                [event.model_dump() for event in req.events],
+            )
+            created = sum(1 for r in results if r["status"] == "ok")
+            failed = len(results) - created
+            if not failed:
+                status = "created"
+            elif created:
+                status = "partial"
+            else:
+                status = "failed"
+            return {
+                "status": status,
+                "created": created,
+                "failed": failed,
+                "results": results,
+            }
+
+    # ── Core operations ────────────────────────────
+    # Run in the process that owns the bot; a separate API process reaches
+    # them through the sender bridge (self.core)
+    async def calendar_event(self, payload: dict) -> str:
+        """Queue a calendar notification unless it is a repeat."""
+        req = CalendarEventRequest(**payload)
+        # ICS retries repeat the same event: uid + start identify it
+        key = f"{req.chat_id}:{req.uid or req.summary}:{req.start}"
+        window = self._digest_window(req)
+        if not self.deliveries.enqueue(req.chat_id, payload, key=key, window=window):
+            self.logger.info("Duplicate calendar event %s skipped", key)
+            return "duplicate"
+        return "queued"
+
+    async def submit_batch(self, messages: List[dict]) -> dict:
+        requests = [SendMessageRequest(**message) for message in messages]
+        batch = self.batches.submit(requests, self._send_batch_message)
+        self.logger.info(
+            "Queued batch %s with %d messages", batch.batch_id, len(requests)
+        )
+        return {"status": "queued", "batch_id": batch.batch_id, "total": len(requests)}
+
+    async def batch_status(self, batch_id: str) -> Optional[dict]:
+        batch = self.batches.get(batch_id)
+        return batch.to_dict() if batch else None
+
+    async def feed_update(self, update: dict) -> None:
+        await self.update_queue.put(Update.de_json(update, self.bot))
+
+    async def core_health(self) -> dict:
+        health = {}
+        limiter = getattr(self.bot, "rate_limiter", None)
+        if isinstance(limiter, PriorityRateLimiter):
+            health["outbound"] = limiter.stats()
+        if self.worker_stats:
+            health["workers"] = self.worker_stats()
+        return health
+
+    async def core_metrics(self) -> list:
+        """Metric families of this process and of the bot workers."""
+        families = metrics.collect()
+        if self.worker_metrics:
+            families.extend(self.worker_metrics())
+        return families
+
+    async def set_profiling(self, settings: dict) -> dict:
+        state = profiler.update(**settings)
+        if self.worker_profiling:
+            self.worker_profiling(settings)
+        return state
+
+    async def profiling_state(self) -> dict:
+        return profiler.state()
+
+    def _bridge_event(self, event: str, data) -> None:
+        if event == PROFILING_EVENT:
+            profiler.update(**{key: data[key] for key in SETTINGS if key in data})
+
+    async def _sync_profiling(self) -> None:
+        """Take over the sender's profiler settings when the process starts
+        (they may have been changed since the config was read)."""
         try:
-            template = EVENT_TEMPLATE_FILE.read_text(encoding="utf-8")
-        except Exception:
-            template = "📅 *{calendar_name}*\n\n🔔 *{summary}*\n\n{time_line}{location_line}{description_line}"
+            self._bridge_event(PROFILING_EVENT, await self.core.profiling_state())
+        except BridgeError as e:
+            self.logger.warning("Profiler settings not synced: %s", e)
+
+    async def run_deliveries(self) -> None:
+        """Deliver queued calendar notifications until cancelled."""
+        await self.deliveries.run(self._deliver_event)
+
+    async def _send_batch_message(self, req: SendMessageRequest):
+        return await self.bot.send_message(
+            chat_id=req.chat_id,
+            text=req.text,
+            parse_mode=req.parse_mode,
+            disable_web_page_preview=req.disable_web_page_preview,
+            disable_notification=req.disable_notification,
+            reply_to_message_id=req.reply_to_message_id,
+            **self.send_options,
+        )
 
+    def _digest_window(self, req: CalendarEventRequest) -> float:
+        """Seconds to collect events into one message: per chat, per calendar
+        or the default window (0 sends every event on its own)."""
+        for group, key in (("chats", req.chat_id), ("calendars", req.calendar_id)):
+            settings = self.digest.get(group) or {}
+            for candidate in (key, str(key)):
+                if candidate in settings:
+                    return float(settings[candidate] or 0)
+        return float(self.digest.get("window", 0) or 0)
+
+    async def _deliver_event(self, item: dict) -> None:
+        """Send queued calendar notifications (DeliveryQueue callback).
+
+        Events of a digest are sorted by start time and joined into as few
+        messages as the Telegram length limit allows.
+        """
+        events = [CalendarEventRequest(**payload) for payload in item["payloads"]]
+        far_future = datetime.max.replace(tzinfo=timezone.utc)
+        events.sort(key=lambda e: parse_dt(e.start) or far_future)
+        messages = self._split_message([self._format_event(e) for e in events])
+        # Parts delivered by an earlier attempt are not sent again
+        for index in range(item.get("sent", 0), len(messages)):
+            try:
+                await self.bot.send_message(
+                    chat_id=item["chat_id"],
+                    text=messages[index],
+                    parse_mode="Markdown",
+                    **self.send_options,
+                )
+            except BadRequest as e:
+                if "parse entities" not in str(e).lower():
+                    raise
+                # Markup from event fields (or a cut entity): send as is
+                self.logger.warning(
+                    "Sending calendar digest to chat %s as plain text: %s",
+                    item["chat_id"],
+                    e,
+                )
+                await self.bot.send_message(
+                    chat_id=item["chat_id"], text=messages[index], **self.send_options
+                )
+            item["sent"] = index + 1
+        self.logger.info(
+            "Sent %d calendar event notification(s) to chat %s",
+            len(events),
+            item["chat_id"],
+        )
+
+    @staticmethod
+    def _split_lines(text: str, limit: int) -> List[str]:
+        """Cut text longer than ``limit`` between lines; only a single line
+        longer than ``limit`` is cut inside."""
+        chunks = []
+        current = ""
+        for line in text.split("\n"):
+            while len(line) > limit:
+                if current:
+                    chunks.append(current)
+                    current = ""
+                chunks.append(line[:limit])
+                line = line[limit:]
+            candidate = f"{current}\n{line}" if current else line
+            if len(candidate) > limit:
+                chunks.append(current)
+                candidate = line
+            current = candidate
+        if current:
+            chunks.append(current)
+        return chunks
+
+    @staticmethod
+    def _split_message(parts: List[str], limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+        """Join parts with blank lines into messages of at most ``limit`` chars.
+
+        A part is split only when it does not fit into a message by itself,
+        and then between lines, so that Markdown entities stay closed.
+        """
+        messages = []
+        current = ""
+        for part in parts:
+            if len(part) > limit:
+                if current:
+                    messages.append(current)
+                    current = ""
+                messages.extend(ApiServer._split_lines(part, limit))
+                continue
+            if not part:
+                continue
+            candidate = f"{current}\n\n{part}" if current else part
+            if len(candidate) > limit:
+                messages.append(current)
+                candidate = part
+            current = candidate
+        if current:
+            messages.append(current)
+        return messages
+
+    def _format_event(self, req: CalendarEventRequest) -> str:
         calendar_name = req.calendar_name or req.calendar_id or "Календарь"
         summary = req.summary or "(без темы)"
 
@@ -362,7 +901,7 @@ class ApiServer:
         location_line = f"📍 {req.location}\n" if req.location else ""
         description_line = f"📝 {req.description}\n" if req.description else ""
 
-        return template.format(
+        values = dict(
             calendar_name=calendar_name,
             summary=summary,
             time_line=time_line,
@@ -370,6 +909,10 @@ class ApiServer:
             description_line=description_line,
             uid=req.uid or "",
         )
+        try:
+            return skills.render(EVENT_TEMPLATE, **values)
+        except KeyError:
+            return DEFAULT_EVENT_TEMPLATE.format(**values)
 
     def _parse_dt(self, iso_str: str) -> Optional[str]:
         try:
@@ -388,8 +931,41 @@ class ApiServer:
             log_level="info",
         )
         server = uvicorn.Server(config)
-        await server.serve()
+        worker = None
+        if self.deliveries:
+            worker = asyncio.create_task(self.run_deliveries())
+        try:
+            await server.serve()
+        finally:
+            if worker:
+                worker.cancel()
 
     def getTask(self):
         """Return the run coroutine for use with asyncio.create_task."""
         return self.run()
+
+
+def create_app() -> FastAPI:
+    """uvicorn factory for a separate API process (``api.process: true``).
+
+    Run as ``uvicorn services.api_server:create_app --factory --workers N``
+    next to the bot, which serves the sender bridge socket.
+    """
+    logging.basicConfig(
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        level=logging.INFO,
+    )
+    config = Config.load(os.environ.get("CONFIG_PATH", "./config/config.yml"))
+    profiler.configure(config)
+    webhook = config.getBot("webhook", {}) or {}
+    use_webhook = config.getBot("mode", "polling") == "webhook"
+    server = ApiServer(
+        api_key=config.get("api", "api_key", ""),
+        bot=None,
+        port=config.get("api", "port", 5200),
+        config=config,
+        logger=logging.getLogger("api"),
+        webhook_secret=webhook.get("secret_token", "") if use_webhook else "",
+        bridge=BridgeClient(config.get("api", "bridge_socket", DEFAULT_SOCKET)),
+    )
+    return server.app
@@ -10,21 +10,11 @@ class AuthService:
     
     async def is_authorized(self, update: Update) -> bool:
         """Check if the user is authorized"""
-        # If whitelist is empty, allow all users
-        if not self.config.getBotWhitelist():
+        # Frozen set from the current config snapshot; empty allows all users
+        whitelist = self.config.getBotWhitelist()
+        if not whitelist or not update.effective_user:
             return True
-        
-        # If whitelist is not empty, check if user is in whitelist
-        if not update.effective_user:
-            return True
-            
-        # Get user ID from update
-        user_id = None
-        if update.effective_user:
-            user_id = update.effective_user.id
-            
-        # Check if user is in whitelist
-        return user_id in self.config.getBotWhitelist()
+        return update.effective_user.id in whitelist
     
     async def send_unauthorized_message(self, update: Update):
         """Send unauthorized access message to user"""
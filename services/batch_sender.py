@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class BatchItem:
+    __slots__ = ("index", "chat_id", "status", "message_id", "error")
+
+    def __init__(self, index: int, chat_id: int):
+        self.index = index
+        self.chat_id = chat_id
+        self.status = PENDING
+        self.message_id: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "chat_id": self.chat_id,
+            "status": self.status,
+            "message_id": self.message_id,
+            "error": self.error,
+        }
+
+
+class Batch:
+    def __init__(self, batch_id: str, items: List[BatchItem]):
+        self.batch_id = batch_id
+        self.items = items
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        counts = {PENDING: 0, SENT: 0, FAILED: 0}
+        for item in self.items:
+            counts[item.status] += 1
+        return {
+            "batch_id": self.batch_id,
+            "status": "done" if self.finished_at else PENDING,
+            "total": len(self.items),
+            "sent": counts[SENT],
+            "failed": counts[FAILED],
+            "pending": counts[PENDING],
+            "items": [item.to_dict() for item in self.items],
+        }
+
+
+class BatchSender:
+    """Fan-out delivery of message batches with per-item status.
+
+    Each batch is delivered by a background task that keeps at most
+    ``concurrency`` sends in flight; pacing against Telegram limits is
+    left to the bot's rate limiter. Finished batches are kept for
+    ``retention`` seconds (and at most ``max_batches``) for status polling.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 20,
+        retention: float = 3600,
+        max_batches: int = 1000,
+    ):
+        self.concurrency = concurrency
+        self.retention = retention
+        self.max_batches = max_batches
+        self._batches: "OrderedDict[str, Batch]" = OrderedDict()
+        self._tasks = set()
+
+    def submit(
+        self, requests: List[Any], send: Callable[[Any], Awaitable[Any]]
+    ) -> Batch:
+        """Register a batch and start delivering it in the background.
+
+        ``send`` is awaited once per request and returns the sent message.
+        """
+        self._evict()
+        batch = Batch(
+            uuid.uuid4().hex,
+            [BatchItem(i, req.chat_id) for i, req in enumerate(requests)],
+        )
+        self._batches[batch.batch_id] = batch
+        task = asyncio.create_task(self._deliver(batch, requests, send))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return batch
+
+    def get(self, batch_id: str) -> Optional[Batch]:
+        return self._batches.get(batch_id)
+
+    async def _deliver(self, batch: Batch, requests: List[Any], send) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def deliver_one(item: BatchItem, req) -> None:
+            async with semaphore:
+                try:
+                    msg = await send(req)
+                    item.message_id = getattr(msg, "message_id", None)
+                    item.status = SENT
+                except Exception as e:
+                    item.error = str(e)
+                    item.status = FAILED
+
+        await asyncio.gather(
+            *(deliver_one(item, req) for item, req in zip(batch.items, requests))
+        )
+        batch.finished_at = time.time()
+        summary = batch.to_dict()
+        logger.info(
+            "Batch %s done: %d sent, %d failed",
+            batch.batch_id,
+            summary["sent"],
+            summary["failed"],
+        )
+
+    def _evict(self) -> None:
+        """Forget expired batches, then the oldest finished ones over the cap."""
+        now = time.time()
+        finished = [b for b in self._batches.values() if b.finished_at]
+        for batch in finished:
+            if (
+                now - batch.finished_at > self.retention
+                or len(self._batches) >= self.max_batches
+            ):
+                del self._batches[batch.batch_id]
@@ -0,0 +1,404 @@
+import asyncio
+import logging
+import threading
+import time
+from bisect import bisect_left
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from clients.icsclient import ICSClient
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+
+# Upper bound on candidates checked per recurring event and window
+MAX_OCCURRENCES = 5000
+
+
+def parse_dt(value, default_tz=timezone.utc) -> Optional[datetime]:
+    """Parse an ISO date or datetime into an aware datetime.
+
+    Date-only values become midnight, naive values get ``default_tz``.
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, date):
+        dt = datetime(value.year, value.month, value.day)
+    else:
+        try:
+            dt = datetime.fromisoformat(str(value).strip())
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=default_tz)
+    return dt
+
+
+def parse_rrule(rrule: str) -> Dict[str, str]:
+    """Split an RFC 5545 RRULE value into its parts."""
+    if rrule.upper().startswith("RRULE:"):
+        rrule = rrule[6:]
+    parts = {}
+    for item in rrule.split(";"):
+        if "=" in item:
+            key, value = item.split("=", 1)
+            parts[key.strip().upper()] = value.strip()
+    return parts
+
+
+def _parse_until(value: str, default_tz) -> Optional[datetime]:
+    # UNTIL comes in basic format: 20261231 or 20261231T235959Z
+    try:
+        if "T" in value:
+            dt = datetime.strptime(value.rstrip("Z"), "%Y%m%dT%H%M%S")
+            return dt.replace(
+                tzinfo=timezone.utc if value.endswith("Z") else default_tz
+            )
+        dt = datetime.strptime(value, "%Y%m%d")
+        return dt.replace(hour=23, minute=59, second=59, tzinfo=default_tz)
+    except ValueError:
+        return parse_dt(value, default_tz)
+
+
+def _add_months(dt: datetime, months: int) -> Optional[datetime]:
+    month = dt.month - 1 + months
+    year = dt.year + month // 12
+    try:
+        return dt.replace(year=year, month=month % 12 + 1)
+    except ValueError:
+        # Day does not exist in that month (e.g. the 31st) — skipped per RFC 5545
+        return None
+
+
+def _first_step(freq: str, interval: int, start: datetime, window_start: datetime):
+    """Index of a rule step starting at or before ``window_start``, late
+    enough that every earlier step lies wholly before the window."""
+    if window_start <= start:
+        return 0
+    if freq == "DAILY":
+        return int((window_start - start) / timedelta(days=interval))
+    if freq == "WEEKLY":
+        return int((window_start - start) / timedelta(weeks=interval))
+    months = (window_start.year - start.year) * 12 + window_start.month - start.month
+    if freq == "YEARLY":
+        months //= 12
+    # One step back: the start's day of month may be later than the window's
+    return max(0, months // interval - 1)
+
+
+def expand_recurrence(
+    start: datetime,
+    rrule: str,
+    window_start: datetime,
+    window_end: datetime,
+    exdates=(),
+    default_tz=timezone.utc,
+) -> List[datetime]:
+    """Return occurrence starts of a recurring event inside the window.
+
+    Supports FREQ=DAILY/WEEKLY/MONTHLY/YEARLY with INTERVAL, COUNT, UNTIL
+    and BYDAY (for weekly rules). Other rule parts are ignored.
+    """
+    parts = parse_rrule(rrule)
+    freq = parts.get("FREQ", "").upper()
+    interval = max(1, int(parts.get("INTERVAL", "1") or 1))
+    count = int(parts["COUNT"]) if parts.get("COUNT", "").isdigit() else None
+    until = _parse_until(parts["UNTIL"], default_tz) if parts.get("UNTIL") else None
+    excluded = {d.timestamp() for d in (parse_dt(x, default_tz) for x in exdates) if d}
+
+    if freq not in ("DAILY", "WEEKLY", "MONTHLY", "YEARLY"):
+        return [start] if window_start <= start < window_end else []
+
+    byday = [
+        WEEKDAYS[day[-2:].upper()]
+        for day in parts.get("BYDAY", "").split(",")
+        if day[-2:].upper() in WEEKDAYS
+    ]
+
+    def candidates(step):
+        while True:
+            if freq == "DAILY":
+                yield start + timedelta(days=step * interval)
+            elif freq == "WEEKLY":
+                week = start + timedelta(weeks=step * interval)
+                if byday:
+                    monday = week - timedelta(days=week.weekday())
+                    for weekday in sorted(byday):
+                        yield monday + timedelta(days=weekday)
+                else:
+                    yield week
+            elif freq == "MONTHLY":
+                yield _add_months(start, step * interval)
+            else:
+                yield _add_months(start, step * interval * 12)
+            step += 1
+
+    # COUNT needs every occurrence since DTSTART; without it skip straight to
+    # the window, so that old open-ended series don't run into the cap
+    first = 0 if count is not None else _first_step(freq, interval, start, window_start)
+    occurrences = []
+    generated = 0
+    for iteration, occurrence in enumerate(candidates(first)):
+        if iteration >= MAX_OCCURRENCES:
+            break
+        if occurrence is None:
+            continue
+        if occurrence < start:
+            continue
+        if until and occurrence > until:
+            break
+        if count is not None and generated >= count:
+            break
+        if occurrence >= window_end:
+            break
+        generated += 1
+        if occurrence >= window_start and occurrence.timestamp() not in excluded:
+            occurrences.append(occurrence)
+    return occurrences
+
+
+class EventIndex:
+    """Occurrences sorted by start time for overlap queries.
+
+    A query bisects the start array and scans back at most the longest
+    event duration, so lookups cost O(log n + k).
+    """
+
+    __slots__ = (
+        "window_start",
+        "window_end",
+        "starts",
+        "ends",
+        "events",
+        "max_duration",
+    )
+
+    def __init__(
+        self,
+        occurrences: List[Tuple[float, float, dict]],
+        window_start: float,
+        window_end: float,
+    ):
+        occurrences.sort(key=lambda item: item[0])
+        self.window_start = window_start
+        self.window_end = window_end
+        self.starts = [item[0] for item in occurrences]
+        self.ends = [item[1] for item in occurrences]
+        self.events = [item[2] for item in occurrences]
+        self.max_duration = max((e - s for s, e, _ in occurrences), default=0.0)
+
+    def covers(self, start: float, end: float) -> bool:
+        return self.window_start <= start and end <= self.window_end
+
+    def overlapping(self, start: float, end: float) -> List[Tuple[float, float, dict]]:
+        lo = bisect_left(self.starts, start - self.max_duration)
+        hi = bisect_left(self.starts, end)
+        result = []
+        for i in range(lo, hi):
+            if self.ends[i] > start or self.starts[i] >= start:
+                result.append((self.starts[i], self.ends[i], self.events[i]))
+        return result
+
+
+class _UserCalendar:
+    def __init__(self):
+        # (calendar_id, uid) -> raw event from the ICS service
+        self.events: Dict[Tuple[str, str], dict] = {}
+        # calendar_id -> incremental sync cursor
+        self.cursors: Dict[str, str] = {}
+        self.index: Optional[EventIndex] = None
+        self.synced_at: Optional[float] = None
+
+
+class CalendarEventStore:
+    """In-memory per-user copy of ICS events with an interval index.
+
+    Events are pulled from the ICS service incrementally (only changes
+    since the last cursor), recurrences are expanded for a sliding window
+    around now, and schedule queries are answered from memory.
+    """
+
+    def __init__(
+        self,
+        ics: ICSClient,
+        past_days: int = 7,
+        horizon_days: int = 90,
+        default_tz=timezone.utc,
+    ):
+        self.ics = ics
+        self.past = timedelta(days=past_days)
+        self.horizon = timedelta(days=horizon_days)
+        self.default_tz = default_tz
+        self._users: Dict[str, _UserCalendar] = {}
+        self._lock = threading.Lock()
+
+    # ── Sync ───────────────────────────────────────
+    def track(self, user_id) -> _UserCalendar:
+        """Start keeping the calendars of a user in sync."""
+        user_id = str(user_id)
+        with self._lock:
+            if user_id not in self._users:
+                self._users[user_id] = _UserCalendar()
+            return self._users[user_id]
+
+    def is_synced(self, user_id) -> bool:
+        """Whether the user has been synced at least once."""
+        return self.track(user_id).synced_at is not None
+
+    def sync_user(self, user_id) -> bool:
+        """Pull changed events of all user calendars and rebuild the index."""
+        user_id = str(user_id)
+        user = self.track(user_id)
+        calendars = self.ics.get_calendars(user_id)
+        if calendars is None:
+            return False
+
+        calendar_ids = {str(c.get("id")) for c in calendars if c.get("id")}
+        with self._lock:
+            for key in [k for k in user.events if k[0] not in calendar_ids]:
+                del user.events[key]
+            for calendar_id in [c for c in user.cursors if c not in calendar_ids]:
+                del user.cursors[calendar_id]
+
+        for calendar_id in calendar_ids:
+            cursor = user.cursors.get(calendar_id)
+            data = self.ics.get_events(calendar_id, user_id, since=cursor)
+            if data is None:
+                continue
+            with self._lock:
+                if cursor is None:
+                    # Full snapshot: drop whatever we had for this calendar
+                    for key in [k for k in user.events if k[0] == calendar_id]:
+                        del user.events[key]
+                for event in data.get("events", []):
+                    key = (calendar_id, str(event.get("uid") or event.get("id")))
+                    if event.get("status") == "cancelled" or event.get("deleted"):
+                        user.events.pop(key, None)
+                    else:
+                        user.events[key] = dict(event, calendar_id=calendar_id)
+                if data.get("synced_at"):
+                    user.cursors[calendar_id] = data["synced_at"]
+
+        user.index = self._build_index(user, *self._default_window())
+        user.synced_at = time.time()
+        logger.info(
+            f"Calendar store synced for user {user_id}: {len(user.events)} events"
+        )
+        return True
+
+    def sync_all(self) -> None:
+        for user_id in list(self._users):
+            try:
+                self.sync_user(user_id)
+            except Exception as e:
+                logger.error(f"Calendar store sync failed for user {user_id}: {e}")
+
+    async def run(self, interval: float):
+        """Periodically re-sync every tracked user."""
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.sync_all)
+
+    # ── Index ──────────────────────────────────────
+    def _default_window(self) -> Tuple[datetime, datetime]:
+        now = datetime.now(timezone.utc)
+        return now - self.past, now + self.horizon
+
+    def _build_index(
+        self, user: _UserCalendar, window_start: datetime, window_end: datetime
+    ) -> EventIndex:
+        with self._lock:
+            events = list(user.events.values())
+
+        occurrences = []
+        for event in events:
+            start = parse_dt(event.get("start"), self.default_tz)
+            if start is None:
+                continue
+            end = parse_dt(event.get("end"), self.default_tz)
+            all_day = bool(event.get("all_day")) or len(str(event.get("start"))) == 10
+            if end is None or end < start:
+                end = start + (timedelta(days=1) if all_day else timedelta(0))
+            duration = end - start
+
+            if event.get("rrule"):
+                starts = expand_recurrence(
+                    start,
+                    event["rrule"],
+                    window_start - duration,
+                    window_end,
+                    event.get("exdate") or (),
+                    self.default_tz,
+                )
+            else:
+                starts = [start]
+
+            for occurrence in starts:
+                occurrence_end = occurrence + duration
+                if occurrence_end < window_start or occurrence >= window_end:
+                    continue
+                occurrences.append(
+                    (
+                        occurrence.timestamp(),
+                        occurrence_end.timestamp(),
+                        {
+                            "uid": event.get("uid", ""),
+                            "calendar_id": event.get("calendar_id", ""),
+                            "summary": event.get("summary", ""),
+                            "location": event.get("location", ""),
+                            "start": occurrence.isoformat(),
+                            "end": occurrence_end.isoformat(),
+                            "all_day": all_day,
+                            "busy": not all_day
+                            and str(event.get("transp", "")).upper() != "TRANSPARENT",
+                        },
+                    )
+                )
+        return EventIndex(occurrences, window_start.timestamp(), window_end.timestamp())
+
+    def _index_for(self, user_id, start: datetime, end: datetime) -> EventIndex:
+        user = self.track(user_id)
+        index = user.index
+        if index is None or not index.covers(start.timestamp(), end.timestamp()):
+            # Outside of the precomputed window: expand just for this range
+            return self._build_index(user, start, end)
+        return index
+
+    # ── Queries ────────────────────────────────────
+    def get_events(self, user_id, start: datetime, end: datetime) -> List[dict]:
+        """Events overlapping [start, end), ordered by start time."""
+        index = self._index_for(user_id, start, end)
+        return [
+            event
+            for _, _, event in index.overlapping(start.timestamp(), end.timestamp())
+        ]
+
+    def find_free_slots(
+        self, user_id, duration: timedelta, start: datetime, end: datetime
+    ) -> List[Tuple[datetime, datetime]]:
+        """Gaps of at least ``duration`` between busy events in [start, end).
+
+        All-day and transparent events do not block time.
+        """
+        range_start, range_end = start.timestamp(), end.timestamp()
+        index = self._index_for(user_id, start, end)
+        needed = duration.total_seconds()
+
+        slots = []
+        cursor = range_start
+        for busy_start, busy_end, event in index.overlapping(range_start, range_end):
+            if not event["busy"]:
+                continue
+            if busy_start - cursor >= needed:
+                slots.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if range_end - cursor >= needed:
+            slots.append((cursor, range_end))
+
+        tz = start.tzinfo or self.default_tz
+        return [
+            (datetime.fromtimestamp(s, tz), datetime.fromtimestamp(e, tz))
+            for s, e in slots
+        ]
@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the backend circuit is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Backend '{name}' is unavailable (retry in {retry_in:.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker for a single backend.
+
+    Outcomes of the last ``window`` calls are tracked. Once at least
+    ``min_calls`` were made and the failure share reaches ``failure_rate``
+    the circuit opens and calls fail fast for ``open_seconds``. After that
+    up to ``half_open_probes`` trial calls are let through: a success
+    closes the circuit, a failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._outcomes = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if (
+            self._state == OPEN
+            and time.monotonic() - self._opened_at >= self.open_seconds
+        ):
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def _retry_in(self) -> float:
+        return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        """Reserve the right to make a call; False means fail fast."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                logger.info(f"Circuit '{self.name}' closed after successful probe")
+                self._state = CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append(False)
+            calls = len(self._outcomes)
+            failures = calls - sum(self._outcomes)
+            if (
+                self._state == CLOSED
+                and calls >= self.min_calls
+                and failures / calls >= self.failure_rate
+            ):
+                self._open()
+
+    def _open(self) -> None:
+        logger.warning(
+            f"Circuit '{self.name}' opened for {self.open_seconds:.0f}s "
+            f"({len(self._outcomes)} recent calls)"
+        )
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probes = 0
+
+    def call(self, fn: Callable, *args, is_failure: Callable = None, **kwargs):
+        """Run ``fn`` through the breaker.
+
+        Exceptions and results matching ``is_failure`` count as failures.
+        Raises CircuitOpenError without calling ``fn`` while the circuit is open.
+        """
+        if not self.allow():
+            with self._lock:
+                raise CircuitOpenError(self.name, self._retry_in())
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        if is_failure is not None and is_failure(result):
+            self.record_failure()
+        else:
+            self.record_success()
+        return result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            calls = len(self._outcomes)
+            failures = calls - sum(self._outcomes)
+            snapshot = {
+                "state": state,
+                "calls": calls,
+                "failure_rate": round(failures / calls, 3) if calls else 0.0,
+            }
+            if state == OPEN:
+                snapshot["retry_in"] = round(self._retry_in(), 1)
+            return snapshot
+
+
+# Breakers are shared per backend across all services of the process
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str, **settings) -> CircuitBreaker:
+    """Return the process-wide breaker for a backend, creating it on first use."""
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **settings)
+        return _breakers[name]
+
+
+def breaker_states() -> Dict[str, dict]:
+    """Snapshot of every registered breaker, for health output."""
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
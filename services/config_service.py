@@ -1,30 +1,151 @@
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
 import yaml
 
+logger = logging.getLogger(__name__)
+
 # Load configuration from YAML file
 def load_config(path):
     with open(path, 'r', encoding='utf-8') as f:
         return yaml.safe_load(f)
 
+def freeze(value):
+    """Read-only copy of parsed YAML: dicts become mappingproxies, lists tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+def parse_whitelist(values):
+    return frozenset(int(uid) for uid in values or () if str(uid).isdigit())
+
+def check_reloaded(data, previous):
+    """Reject a file caught mid-write by an editor (empty or truncated)."""
+    if not isinstance(data, dict):
+        raise ValueError("not a mapping")
+    bot = data.get("bot")
+    if not isinstance(bot, dict) or not bot.get("token"):
+        raise ValueError("bot.token is missing")
+    # An empty whitelist lets everyone in: only a restart may drop it
+    if previous.whitelist and not parse_whitelist(bot.get("whitelist")):
+        raise ValueError("bot.whitelist is empty")
+
+class ConfigSnapshot:
+    """One parsed version of the config file; never modified after load.
+
+    Values needed on every update (whitelist, model URI) are computed here
+    once, so readers only do attribute lookups.
+    """
+
+    __slots__ = ("sections", "whitelist", "bot_token", "cloud_key", "folder_id",
+                 "model", "model_uri", "mtime")
+
+    def __init__(self, data, mtime=None):
+        sections = freeze(data or {})
+        bot = sections.get("bot") or {}
+        cloud = sections.get("ycloud") or {}
+        yandex = sections.get("yandex") or {}
+        folder_id = cloud.get("folder_id")
+        model = yandex.get("model")
+        init = super().__setattr__
+        init("sections", sections)
+        init("whitelist", parse_whitelist(bot.get("whitelist")))
+        init("bot_token", bot.get("token"))
+        init("cloud_key", cloud.get("api_key"))
+        init("folder_id", folder_id)
+        init("model", model)
+        init("model_uri", f"gpt://{folder_id}/{model}")
+        init("mtime", mtime)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ConfigSnapshot is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError("ConfigSnapshot is read-only")
+
 class Config:
-    def __init__(self, config):
-        self.config = config
+    """Access to the current ConfigSnapshot.
+
+    A config loaded from a file (``Config.load``) stats it at most every
+    ``check_interval`` seconds and re-reads it when the mtime changed; the
+    new snapshot replaces the old one in a single assignment, so readers
+    never see a half-applied file. ``request_reload`` (wired to SIGHUP)
+    forces a re-read on the next access. A file that fails to load, or
+    fails ``check_reloaded``, keeps the previous snapshot.
+    """
+
+    def __init__(self, config, path=None, check_interval=2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot = ConfigSnapshot(config)
+        self._checked_at = time.monotonic()
+        self._force = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, check_interval=2.0):
+        """Config read from ``path`` and reloaded when the file changes."""
+        config = cls(None, path, check_interval)
+        config._snapshot = config._read()
+        return config
+
+    # ── Reloading ──────────────────────────────────
+    def _read(self, check=False):
+        mtime = os.stat(self.path).st_mtime_ns
+        data = load_config(self.path)
+        if check:
+            check_reloaded(data, self._snapshot)
+        return ConfigSnapshot(data, mtime)
+
+    def request_reload(self, *_):
+        """Re-read the file on next access (safe to call from a signal handler)."""
+        self._force = True
+
+    def reload(self, force=False):
+        """Re-read the file if it changed (always with ``force``)."""
+        if not self.path:
+            return
+        with self._lock:
+            force = force or self._force
+            self._force = False
+            self._checked_at = time.monotonic()
+            try:
+                if not force and os.stat(self.path).st_mtime_ns == self._snapshot.mtime:
+                    return
+                snapshot = self._read(check=True)
+            except (OSError, ValueError, yaml.YAMLError) as e:
+                logger.error(f"Failed to reload config {self.path}: {e}")
+                return
+            self._snapshot = snapshot
+            logger.info(f"Config reloaded from {self.path}")
+
+    @property
+    def snapshot(self):
+        if self.path and (self._force or time.monotonic() - self._checked_at >= self.check_interval):
+            self.reload()
+        return self._snapshot
+
+    # ── Access ─────────────────────────────────────
     def get(self, group, key, default=None):
-        if key not in self.config[group]:
+        values = self.snapshot.sections.get(group)
+        if not values or key not in values:
             return default
-        return self.config[group][key] 
+        return values[key]
     def getBot(self,key, default=None):
         return self.get("bot", key, default)
     def getBotToken(self):
-        return self.get("bot", 'token')
-    def getBotWhitelist(self,default=None):
-        whitelist = self.get("bot", 'whitelist', default)
-        return { int(uid) for uid in whitelist if str(uid).isdigit()}
+        return self.snapshot.bot_token
+    def getBotWhitelist(self):
+        return self.snapshot.whitelist
     def getCloud(self,key, default=None):
         return self.get("ycloud", key, default)
     def getCloudKey(self):
-        return self.getCloud("api_key")
+        return self.snapshot.cloud_key
     def getCloudFolder(self):
-        return self.getCloud("folder_id")
+        return self.snapshot.folder_id
     def getYandex(self,key, default=None):
         return self.get("yandex", key, default)
-
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from telegram.error import BadRequest, Forbidden, RetryAfter
+from services.rate_limiter import retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_FILE = os.path.join("data", "calendar_queue.json")
+
+
+class DeliveryQueue:
+    """Small persisted queue of pending Telegram deliveries.
+
+    Items are plain JSON dicts with a ``chat_id`` and a list of
+    ``payloads``. An item enqueued with a ``window`` stays open for that
+    many seconds: later payloads for the same chat join it, if it goes out
+    within their own window, and are delivered together when it ends. The whole queue, together
+    with the deduplication keys seen during the last ``dedup_window``
+    seconds, is saved to ``path`` after changes, so pending deliveries and
+    deduplication survive a restart. Inside the event loop the changes
+    are batched and written from a thread.
+    ``run`` delivers due items of up to ``concurrency`` chats at a time,
+    one item per chat, so a slow or rate-limited chat holds up only its
+    own deliveries. Failures are retried with exponential backoff and an
+    item is dropped after ``max_attempts``.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_QUEUE_FILE,
+        dedup_window: float = 600,
+        max_attempts: int = 5,
+        retry_delay: float = 2,
+        concurrency: int = 20,
+    ):
+        self.path = path
+        self.dedup_window = dedup_window
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.concurrency = concurrency
+        self._items: List[Dict] = []
+        self._seen: Dict[str, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        # Chats with a delivery in flight
+        self._busy: Set = set()
+        self._tasks = set()
+        self._dirty = False
+        self._writer: Optional[asyncio.Task] = None
+        self._write_lock = threading.Lock()
+        self._load()
+
+    # ── Persistence ────────────────────────────────
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._items = data.get("items", [])
+            self._seen = data.get("seen", {})
+            if self._items:
+                logger.info(f"Restored {len(self._items)} pending deliveries")
+        except Exception as e:
+            logger.error(f"Failed to load delivery queue {self.path}: {e}")
+
+    def _snapshot(self) -> str:
+        return json.dumps(
+            {"items": self._items, "seen": self._seen}, ensure_ascii=False
+        )
+
+    def _write(self, data: str) -> None:
+        with self._write_lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(data)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.error(f"Failed to save delivery queue {self.path}: {e}")
+
+    def _save(self) -> None:
+        """Persist the queue: right away outside the event loop, otherwise
+        by the background writer, which batches changes."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(self._snapshot())
+            return
+        self._dirty = True
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._write_changes())
+
+    async def _write_changes(self) -> None:
+        # Changes made during a write go into the next one
+        while self._dirty:
+            self._dirty = False
+            await asyncio.to_thread(self._write, self._snapshot())
+
+    async def flush(self) -> None:
+        """Wait until every change so far is on disk."""
+        while self._writer is not None and not self._writer.done():
+            await self._writer
+
+    # ── Queue ──────────────────────────────────────
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def enqueue(
+        self,
+        chat_id: int,
+        payload: Dict,
+        key: Optional[str] = None,
+        window: float = 0,
+    ) -> bool:
+        """Add a delivery. Returns False if ``key`` was seen within the window.
+
+        With ``window`` > 0 the payload joins the open digest of the chat,
+        or opens a new one delivered ``window`` seconds from now.
+        """
+        now = time.time()
+        self._seen = {
+            k: t for k, t in self._seen.items() if now - t < self.dedup_window
+        }
+        if key is not None:
+            if key in self._seen:
+                return False
+            self._seen[key] = now
+        digest = self._open_digest(chat_id, now, window) if window > 0 else None
+        if digest is not None:
+            digest["payloads"].append(payload)
+        else:
+            self._items.append(
+                {
+                    "id": uuid.uuid4().hex,
+                    "chat_id": chat_id,
+                    "payloads": [payload],
+                    "attempts": 0,
+                    "next_at": now + window,
+                    "open_until": now + window,
+                }
+            )
+        self._save()
+        if self._wakeup:
+            self._wakeup.set()
+        return True
+
+    def _open_digest(self, chat_id: int, now: float, window: float) -> Optional[Dict]:
+        """An open digest of the chat that goes out within ``window``, so
+        that joining it never delays a payload past its own window."""
+        for item in self._items:
+            if item["chat_id"] == chat_id and now < item["open_until"] <= now + window:
+                return item
+        return None
+
+    def _due(self, now: float) -> List[Dict]:
+        """The earliest due item of every chat without a delivery in flight."""
+        due = {}
+        for item in self._items:
+            chat_id = item["chat_id"]
+            if item["next_at"] > now or chat_id in self._busy:
+                continue
+            if chat_id not in due or item["next_at"] < due[chat_id]["next_at"]:
+                due[chat_id] = item
+        return sorted(due.values(), key=lambda item: item["next_at"])
+
+    def _next_delay(self, now: float) -> Optional[float]:
+        """Seconds until an idle chat has an item due; None to wait for a
+        wakeup (enqueue or a finished delivery)."""
+        if len(self._busy) >= self.concurrency:
+            return None
+        pending = [
+            item["next_at"] for item in self._items if item["chat_id"] not in self._busy
+        ]
+        return max(0.0, min(pending) - now) if pending else None
+
+    async def run(self, send: Callable[[Dict], Awaitable[None]]) -> None:
+        """Deliver queued items with ``send(item)`` until cancelled."""
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                now = time.time()
+                for item in self._due(now)[: self.concurrency - len(self._busy)]:
+                    self._busy.add(item["chat_id"])
+                    task = asyncio.create_task(self._deliver(item, send))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                delay = self._next_delay(now)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
+            if self._writer is not None:
+                self._writer.cancel()
+            self._write(self._snapshot())
+
+    async def _deliver(self, item: Dict, send) -> None:
+        try:
+            await send(item)
+            self._items.remove(item)
+        except (BadRequest, Forbidden) as e:
+            # Retrying will not help: bad markup, blocked bot, unknown chat
+            logger.error(f"Dropping delivery to chat {item['chat_id']}: {e}")
+            self._items.remove(item)
+        except Exception as e:
+            item["attempts"] += 1
+            if item["attempts"] >= self.max_attempts:
+                logger.error(
+                    f"Dropping delivery to chat {item['chat_id']} "
+                    f"after {item['attempts']} attempts: {e}"
+                )
+                self._items.remove(item)
+            else:
+                delay = self.retry_delay * 2 ** (item["attempts"] - 1)
+                if isinstance(e, RetryAfter):
+                    delay = max(delay, retry_after_seconds(e))
+                logger.warning(
+                    f"Delivery to chat {item['chat_id']} failed, "
+                    f"retrying in {delay:.0f}s: {e}"
+                )
+                item["next_at"] = time.time() + delay
+        finally:
+            self._busy.discard(item["chat_id"])
+        self._save()
+        self._wakeup.set()
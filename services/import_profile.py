@@ -0,0 +1,91 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# "import time:       self [us] |  cumulative |   imported package"
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+
+class ImportTime:
+    """Import cost of one module, in microseconds."""
+
+    __slots__ = ("module", "self_us", "cumulative_us", "depth")
+
+    def __init__(self, module: str, self_us: int, cumulative_us: int, depth: int):
+        self.module = module
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+
+
+def import_times(module: str = "bot", env: Optional[Dict[str, str]] = None):
+    """Per-module import cost of ``module`` in a fresh interpreter.
+
+    Runs ``python -X importtime -c "import <module>"`` from the project
+    root; ``env`` is added to the current environment (e.g. CONFIG_PATH).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    times: List[ImportTime] = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            times.append(
+                ImportTime(name, int(self_us), int(cumulative_us), len(indent) // 2)
+            )
+    return times
+
+
+def total_ms(times: List[ImportTime], module: str = "bot") -> float:
+    """Cumulative import time of ``module`` itself, in milliseconds."""
+    for entry in reversed(times):
+        if entry.module == module and entry.depth == 0:
+            return entry.cumulative_us / 1000
+    raise KeyError(module)
+
+
+def format_report(
+    times: List[ImportTime], top: int = 25, sort: str = "cumulative"
+) -> str:
+    key = "self_us" if sort == "self" else "cumulative_us"
+    ranked = sorted(times, key=lambda t: getattr(t, key), reverse=True)[:top]
+    lines = [f"{'cumulative ms':>14}{'self ms':>10}  module"]
+    for entry in ranked:
+        lines.append(
+            f"{entry.cumulative_us / 1000:>14.1f}{entry.self_us / 1000:>10.1f}  "
+            f"{'  ' * entry.depth}{entry.module}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m services.import_profile",
+        description="Per-module import cost of a module (default: bot)",
+    )
+    parser.add_argument("module", nargs="?", default="bot")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--sort", choices=["cumulative", "self"], default="cumulative")
+    args = parser.parse_args(argv)
+
+    times = import_times(args.module)
+    print(f"import {args.module}: {total_ms(times, args.module):.1f} ms")
+    print(format_report(times, args.top, args.sort))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
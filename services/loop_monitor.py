@@ -0,0 +1,176 @@
+import asyncio
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional
+from services.metrics import LOOP_BLOCKS, LOOP_LAG_SECONDS
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Handler/user context of the task running on each loop, read by watchdogs
+_task_context: Dict[asyncio.Task, dict] = {}
+_tracking = False
+_DISABLED = nullcontext()
+
+
+class _TaskContext:
+    __slots__ = ("context", "task")
+
+    def __init__(self, context: dict):
+        self.context = context
+
+    def __enter__(self):
+        self.task = asyncio.current_task()
+        if self.task is not None:
+            _task_context[self.task] = self.context
+        return self
+
+    def __exit__(self, *exc):
+        _task_context.pop(self.task, None)
+        return False
+
+
+def handler_context(**context):
+    """Label the current task (e.g. handler, user_id) for block reports."""
+    if not _tracking:
+        return _DISABLED
+    return _TaskContext(context)
+
+
+def offending_frame(stack: traceback.StackSummary) -> Optional[traceback.FrameSummary]:
+    """Innermost frame of our own code, else the innermost frame."""
+    for frame in reversed(stack):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(PROJECT_ROOT) and "site-packages" not in filename:
+            return frame
+    return stack[-1] if stack else None
+
+
+class LoopLagMonitor:
+    """Watchdog reporting what blocks an asyncio event loop.
+
+    A heartbeat callback runs on the loop every ``threshold / 2`` seconds
+    and records the loop lag. A watchdog thread notices when the
+    heartbeat has not run for ``threshold`` seconds, captures the loop
+    thread's stack with ``sys._current_frames`` and logs it together with
+    the handler and user of the blocking task. Every block is kept in
+    ``blocks`` and passed to ``on_block``.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.1,
+        on_block: Optional[Callable[[dict], None]] = None,
+        max_blocks: int = 100,
+    ):
+        self.threshold = threshold
+        self.interval = threshold / 2
+        self.on_block = on_block
+        self.blocks: "collections.deque[dict]" = collections.deque(maxlen=max_blocks)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._beat_at = 0.0
+        self._due = 0.0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._stall: Optional[dict] = None
+        self._stopped = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Watch ``loop`` (default: the running loop); may be called before it runs."""
+        global _tracking
+        _tracking = True
+        self._loop = loop or asyncio.get_running_loop()
+        self._stopped.clear()
+        self._handle = self._loop.call_soon(self._beat)
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+
+    # ── Loop side ──────────────────────────────────
+    def _beat(self) -> None:
+        now = time.monotonic()
+        if self._loop_thread is None:
+            self._loop_thread = threading.get_ident()
+        elif now > self._due:
+            LOOP_LAG_SECONDS.observe(now - self._due)
+        stall = self._stall
+        if stall is not None:
+            stall["duration"] = round(now - self._beat_at, 3)
+            logger.warning(
+                f"Event loop resumed after {stall['duration']:.3f}s "
+                f"({stall['handler'] or 'no handler'})"
+            )
+            self._stall = None
+        self._beat_at = now
+        self._due = now + self.interval
+        self._handle = self._loop.call_later(self.interval, self._beat)
+
+    # ── Watchdog thread ────────────────────────────
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval / 2):
+            loop = self._loop
+            if loop.is_closed():
+                return
+            if self._loop_thread is None or self._stall is not None:
+                continue
+            if not loop.is_running():
+                continue
+            blocked_for = time.monotonic() - self._beat_at - self.interval
+            if blocked_for >= self.threshold:
+                self._report(blocked_for)
+
+    def _report(self, blocked_for: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame)
+        culprit = offending_frame(stack)
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        context = _task_context.get(task, {}) if task else {}
+        block = {
+            "blocked_for": round(blocked_for, 3),
+            "duration": None,
+            "handler": context.get("handler"),
+            "user_id": context.get("user_id"),
+            "task": task.get_name() if task else None,
+            "frame": (
+                f"{culprit.filename}:{culprit.lineno} in {culprit.name}"
+                if culprit
+                else None
+            ),
+            "stack": traceback.format_list(stack),
+        }
+        self._stall = block
+        self.blocks.append(block)
+        LOOP_BLOCKS.inc(handler=block["handler"] or "")
+        logger.warning(
+            f"Event loop blocked for more than {blocked_for:.3f}s "
+            f"by handler {block['handler']} (user {block['user_id']}) "
+            f"at {block['frame']}\n" + "".join(block["stack"])
+        )
+        if self.on_block:
+            self.on_block(block)
+
+    def stats(self) -> List[dict]:
+        """Recent blocks without stacks."""
+        return [
+            {k: v for k, v in block.items() if k != "stack"} for block in self.blocks
+        ]
@@ -0,0 +1,308 @@
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from contextlib import nullcontext
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Seconds; covers a cache hit up to a slow model response
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Dialog files and similar payloads
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# Lock waits: usually well under a millisecond, seconds under contention
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Returned by ``time()`` while metrics are disabled
+_DISABLED = nullcontext()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry, name: str, help: str, labels: Sequence[str]):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> dict:
+        return dict(zip(self.labelnames, key))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[list]:
+        with self._lock:
+            return [
+                [self.name, self._labels(key), value]
+                for key, value in self._values.items()
+            ]
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: "Histogram", labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, help, labels, buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last one is +Inf), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def time(self, **labels):
+        """Context manager observing the duration of its block."""
+        if not self.registry.enabled:
+            return _DISABLED
+        return _Timer(self, labels)
+
+    def timed(self, **labels):
+        """Decorator observing the duration of every call (sync or async)."""
+
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    with self.time(**labels):
+                        return await func(*args, **kwargs)
+
+            else:
+
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    with self.time(**labels):
+                        return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def samples(self) -> List[list]:
+        samples = []
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                labels = self._labels(key)
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    samples.append(
+                        [
+                            f"{self.name}_bucket",
+                            {**labels, "le": _format_value(bound)},
+                            cumulative,
+                        ]
+                    )
+                samples.append([f"{self.name}_sum", labels, total])
+                samples.append([f"{self.name}_count", labels, cumulative])
+        return samples
+
+
+class MetricsRegistry:
+    """Counters and histograms exported in the Prometheus text format.
+
+    Disabled by default: ``inc``/``observe`` return immediately and
+    ``time()`` hands out a shared no-op context manager, so instrumented
+    call sites cost one attribute check.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self, name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(self, name, help, labels, buckets))
+
+    def collect(self) -> List[dict]:
+        """Metric families as plain data (picklable, JSON-serialisable)."""
+        return [
+            {
+                "name": metric.name,
+                "type": metric.kind,
+                "help": metric.help,
+                "samples": metric.samples(),
+            }
+            for metric in self._metrics.values()
+        ]
+
+    def reset(self) -> None:
+        for metric in self._metrics.values():
+            metric.reset()
+
+
+def with_labels(families: Iterable[dict], **labels) -> List[dict]:
+    """Copy of collected families with ``labels`` added to every sample."""
+    extra = {name: str(value) for name, value in labels.items()}
+    return [
+        {
+            **family,
+            "samples": [
+                [name, {**extra, **sample_labels}, value]
+                for name, sample_labels, value in family["samples"]
+            ],
+        }
+        for family in families
+    ]
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render(families: Iterable[dict]) -> str:
+    """Prometheus text exposition of collected families.
+
+    Families with the same name (e.g. from several worker processes) are
+    merged under one HELP/TYPE header.
+    """
+    merged: Dict[str, dict] = {}
+    for family in families:
+        known = merged.get(family["name"])
+        if known is None:
+            merged[family["name"]] = {**family, "samples": list(family["samples"])}
+        else:
+            known["samples"].extend(family["samples"])
+
+    lines = []
+    for family in merged.values():
+        lines.append(f"# HELP {family['name']} {family['help']}")
+        lines.append(f"# TYPE {family['name']} {family['type']}")
+        for name, labels, value in family["samples"]:
+            if labels:
+                pairs = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+                name = f"{name}{{{pairs}}}"
+            lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# Process-wide registry; enabled from config (api.metrics) at startup
+metrics = MetricsRegistry()
+
+HANDLER_SECONDS = metrics.histogram(
+    "avbot_handler_seconds", "Telegram update handling time", ["handler"]
+)
+GPT_REQUEST_SECONDS = metrics.histogram(
+    "avbot_gpt_request_seconds", "YandexGPT request time", ["model"]
+)
+TOOL_CALL_SECONDS = metrics.histogram(
+    "avbot_tool_call_seconds", "Model tool call time", ["tool"]
+)
+STT_SECONDS = metrics.histogram("avbot_stt_seconds", "SpeechKit recognition time")
+AUDIO_CONVERT_SECONDS = metrics.histogram(
+    "avbot_audio_convert_seconds", "Audio conversion to OGG time"
+)
+ICS_REQUEST_SECONDS = metrics.histogram(
+    "avbot_ics_request_seconds", "ICS service request time", ["operation"]
+)
+ICS_ERRORS = metrics.counter(
+    "avbot_ics_errors_total", "Failed ICS service requests", ["operation"]
+)
+STORAGE_SECONDS = metrics.histogram(
+    "avbot_storage_seconds", "Dialog storage operation time", ["operation"]
+)
+STORAGE_BYTES = metrics.histogram(
+    "avbot_storage_bytes",
+    "Dialog bytes read or written",
+    ["operation"],
+    buckets=BYTES_BUCKETS,
+)
+DIALOG_LOCK_WAIT_SECONDS = metrics.histogram(
+    "avbot_dialog_lock_wait_seconds",
+    "Time waiting for a user's dialog lock",
+    ["kind"],
+    buckets=WAIT_BUCKETS,
+)
+DIALOG_LOCK_TIMEOUTS = metrics.counter(
+    "avbot_dialog_lock_timeouts_total",
+    "Dialog locks not acquired in time",
+    ["kind"],
+)
+ARCHIVED_MESSAGES = metrics.counter(
+    "avbot_archived_messages_total", "Dialog messages moved to the archive"
+)
+S3_REQUEST_SECONDS = metrics.histogram(
+    "avbot_s3_request_seconds", "Object storage request time", ["operation"]
+)
+S3_ERRORS = metrics.counter(
+    "avbot_s3_errors_total", "Failed object storage requests", ["operation"]
+)
+INDEX_LOOKUP_SECONDS = metrics.histogram(
+    "avbot_index_lookup_seconds", "Search index lookup time"
+)
+TELEGRAM_SEND_SECONDS = metrics.histogram(
+    "avbot_telegram_send_seconds", "Telegram Bot API call time", ["endpoint"]
+)
+LOOP_LAG_SECONDS = metrics.histogram(
+    "avbot_loop_lag_seconds", "Event loop heartbeat delay"
+)
+LOOP_BLOCKS = metrics.counter(
+    "avbot_loop_blocks_total", "Event loop stalls over the threshold", ["handler"]
+)
+TELEGRAM_RETRY_AFTER = metrics.counter(
+    "avbot_telegram_retry_after_total",
+    "Telegram 429 (RetryAfter) responses",
+    ["endpoint"],
+)
@@ -0,0 +1,282 @@
+import asyncio
+import collections
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+from services.config_service import Config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_DIR = os.path.join("data", "profiles")
+
+# Leaf frames of threads that are waiting, not working
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+}
+
+_DISABLED = nullcontext()
+
+# Runtime settings, as taken by SamplingProfiler.update
+SETTINGS = ("enabled", "sample_rate", "slow_threshold_ms")
+
+
+class _Session:
+    __slots__ = ("kind", "name", "task", "loop", "thread", "started", "sampled")
+
+    def __init__(self, kind: str, name: str, sampled: bool):
+        self.kind = kind
+        self.name = name
+        self.sampled = sampled
+        self.task = None
+        self.loop = None
+        self.thread = threading.get_ident()
+        self.started = time.monotonic()
+
+
+class _Profiled:
+    __slots__ = ("profiler", "session", "stacks")
+
+    def __init__(self, profiler: "SamplingProfiler", session: _Session):
+        self.profiler = profiler
+        self.session = session
+        self.stacks: Dict[str, int] = collections.Counter()
+
+    def __enter__(self):
+        try:
+            self.session.task = asyncio.current_task()
+            self.session.loop = asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        self.profiler._start(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._finish(self)
+        return False
+
+
+def _frame_name(code) -> str:
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+def _collapse(frame) -> Optional[str]:
+    """``root;...;leaf`` frame names of a stack, None for idle threads."""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+        return None
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """Statistical profiler for handler updates and API requests.
+
+    While enabled, a sampler thread records the stacks of all threads
+    every ``interval`` seconds for each request in progress; samples of
+    the event loop thread count only while the request's own task is
+    running, samples of other threads (``asyncio.to_thread`` work) while
+    the request is active. A ``sample_rate`` fraction of requests and
+    every request slower than ``slow_threshold`` seconds are written as
+    collapsed stacks (flamegraph.pl / speedscope input) to ``directory``,
+    which keeps the newest ``max_files`` profiles. Inside an event loop the
+    files are written from a thread.
+
+    Settings are per process: supervisor workers get ``update`` calls over
+    their update queue, API processes over the sender bridge.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_PROFILE_DIR,
+        sample_rate: float = 0.0,
+        slow_threshold: float = 2.0,
+        interval: float = 0.005,
+        max_files: int = 200,
+    ):
+        self.enabled = False
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.interval = interval
+        self.max_files = max_files
+        self.written = 0
+        self._active: Dict[int, _Profiled] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._writes = set()
+
+    def configure(self, config: Config) -> None:
+        """Settings from the ``profiling`` config section."""
+        self.directory = config.get("profiling", "directory", self.directory)
+        self.interval = config.get("profiling", "interval_ms", 5) / 1000
+        self.max_files = int(config.get("profiling", "max_files", self.max_files))
+        self.update(
+            enabled=bool(config.get("profiling", "enabled", False)),
+            sample_rate=config.get("profiling", "sample_rate", 0.01),
+            slow_threshold_ms=config.get("profiling", "slow_threshold_ms", 2000),
+        )
+
+    def update(
+        self,
+        enabled: Optional[bool] = None,
+        sample_rate: Optional[float] = None,
+        slow_threshold_ms: Optional[float] = None,
+    ) -> dict:
+        """Change settings at runtime; returns the resulting state."""
+        if sample_rate is not None:
+            self.sample_rate = float(sample_rate)
+        if slow_threshold_ms is not None:
+            self.slow_threshold = float(slow_threshold_ms) / 1000
+        if enabled is not None and enabled != self.enabled:
+            self.enabled = enabled
+            logger.info(f"Profiling {'enabled' if enabled else 'disabled'}")
+        return self.state()
+
+    def state(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "directory": self.directory,
+            "written": self.written,
+        }
+
+    def profile(self, kind: str, name: str):
+        """Context manager profiling one handler update or API request."""
+        if not self.enabled:
+            return _DISABLED
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        return _Profiled(self, _Session(kind, name, sampled))
+
+    # ── Sessions ───────────────────────────────────
+    def _start(self, profiled: _Profiled) -> None:
+        with self._lock:
+            self._active[id(profiled)] = profiled
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="profiler", daemon=True
+                )
+                self._thread.start()
+        self._wakeup.set()
+
+    def _finish(self, profiled: _Profiled) -> None:
+        with self._lock:
+            self._active.pop(id(profiled), None)
+        session = profiled.session
+        duration = time.monotonic() - session.started
+        slow = duration >= self.slow_threshold
+        if not (session.sampled or slow) or not profiled.stacks:
+            return
+        reason = "slow" if slow else "sampled"
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._save(profiled, duration, reason)
+            return
+        task = asyncio.create_task(
+            asyncio.to_thread(self._save, profiled, duration, reason)
+        )
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def flush(self) -> None:
+        """Wait for the profiles being written."""
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    def _save(self, profiled: _Profiled, duration: float, reason: str) -> None:
+        try:
+            self._write(profiled, duration, reason)
+        except OSError as e:
+            logger.error(f"Failed to write profile: {e}")
+
+    # ── Sampler thread ─────────────────────────────
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while True:
+            self._wakeup.clear()
+            if not self._active:
+                self._wakeup.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            with self._lock:
+                active = list(self._active.values())
+            # Stacks are collapsed without the lock, once per thread, so that
+            # requests starting and finishing never wait for the sampler
+            stacks = {}
+            for ident, frame in frames.items():
+                if ident != own:
+                    stack = _collapse(frame)
+                    if stack:
+                        stacks[ident] = f"{names.get(ident, ident)};{stack}"
+            samples = [
+                (profiled, self._sample(profiled, stacks)) for profiled in active
+            ]
+            with self._lock:
+                for profiled, keys in samples:
+                    # A finished request's stacks are being written already
+                    if id(profiled) in self._active:
+                        profiled.stacks.update(keys)
+
+    @staticmethod
+    def _sample(profiled: _Profiled, stacks: Dict[int, str]) -> List[str]:
+        session = profiled.session
+        keys = []
+        for ident, stack in stacks.items():
+            if ident == session.thread and session.loop is not None:
+                # The loop thread works for this request only while its task runs
+                try:
+                    if asyncio.current_task(session.loop) is not session.task:
+                        continue
+                except RuntimeError:
+                    continue
+            keys.append(stack)
+        return keys
+
+    def _write(self, profiled: _Profiled, duration: float, reason: str) -> None:
+        session = profiled.session
+        os.makedirs(self.directory, exist_ok=True)
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "_", session.name).strip("_") or "root"
+        filename = (
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{session.kind}-{name}-"
+            f"{int(duration * 1000)}ms-{reason}-{id(profiled) % 10000:04d}.collapsed"
+        )
+        path = os.path.join(self.directory, filename)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in profiled.stacks.items():
+                f.write(f"{stack} {count}\n")
+        self.written += 1
+        logger.info(f"Profile of {session.kind} {session.name} written to {path}")
+        self._rotate()
+
+    def _rotate(self) -> None:
+        entries = [
+            e
+            for e in os.scandir(self.directory)
+            if e.is_file() and e.name.endswith(".collapsed")
+        ]
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[: len(entries) - self.max_files]:
+            os.unlink(entry.path)
+
+
+# Process-wide profiler; configured from config and the /profiling endpoint
+profiler = SamplingProfiler()
@@ -0,0 +1,356 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from services.metrics import TELEGRAM_RETRY_AFTER, TELEGRAM_SEND_SECONDS
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BULK = "bulk"
+
+# Lower value is served first
+PRIORITIES = {PRIORITY_INTERACTIVE: 0, PRIORITY_BULK: 1}
+
+# rate_limit_args for API-originated traffic
+BULK = {"priority": PRIORITY_BULK}
+
+
+def retry_after_seconds(exc: RetryAfter) -> float:
+    """Pause requested by Telegram, in seconds."""
+    # Same as PTB's AIORateLimiter: the public attribute warns about its
+    # upcoming int -> timedelta type change
+    retry_after = getattr(exc, "_retry_after", None)
+    if retry_after is None:
+        retry_after = exc.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, up to ``capacity``."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _LaneStats:
+    __slots__ = ("sent", "wait_total", "wait_max")
+
+    def __init__(self):
+        self.sent = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class PriorityRateLimiter(BaseRateLimiter[Dict[str, Any]]):
+    """Outbound Telegram scheduler shared by bot replies and the API server.
+
+    Requests addressed to a chat wait for a token from the global bucket
+    (Telegram allows ~30 messages/s) and from the bucket of that chat
+    (private chats ~1/s, groups 20/min). Waiting requests are served by
+    priority lane first and arrival order second, so interactive replies
+    overtake bulk API traffic. A ``RetryAfter`` from Telegram pauses the
+    chat (or everything, for chat-less calls) and the request is retried.
+
+    Requests of a chat that has to wait for its own bucket are parked in a
+    per-chat queue with a timer, so a long queue for one chat costs
+    O(log n) per sent message instead of a rescan of every waiter.
+
+    ``rate_limit_args`` may carry ``{"priority": "bulk", "max_retries": n}``.
+    Requests without a ``chat_id`` are not limited.
+    """
+
+    def __init__(
+        self,
+        overall_rate: float = 30,
+        chat_rate: float = 1,
+        chat_burst: float = 3,
+        group_rate: float = 20 / 60,
+        group_burst: float = 3,
+        max_retries: int = 3,
+    ):
+        self.overall = TokenBucket(overall_rate, overall_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.max_retries = max_retries
+        self._chats: Dict[Any, TokenBucket] = {}
+        self._paused_until: Dict[Any, float] = {}
+        # Heap of (lane, seq, priority, chat_id, future, enqueued) entries
+        # whose chat is not parked, plus one entry per parked chat whose
+        # timer fired
+        self._waiters: List[list] = []
+        # chat_id -> heap of entries waiting for that chat's bucket or pause
+        self._parked: Dict[Any, List[list]] = {}
+        # Heap of (ready_at, seq, chat_id) for parked chats
+        self._timers: List[tuple] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._lanes = {name: _LaneStats() for name in PRIORITIES}
+        self._retry_after_count = 0
+
+    # ── BaseRateLimiter ────────────────────────────
+    async def initialize(self) -> None:
+        self._ensure_dispatcher()
+
+    async def shutdown(self) -> None:
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for entry in self._entries():
+            entry[4].cancel()
+        self._waiters.clear()
+        self._parked.clear()
+        self._timers.clear()
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict, List[Dict]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Dict[str, Any]],
+    ) -> Union[bool, Dict, List[Dict]]:
+        rate_limit_args = rate_limit_args or {}
+        priority = rate_limit_args.get("priority", PRIORITY_INTERACTIVE)
+        if priority not in PRIORITIES:
+            priority = PRIORITY_INTERACTIVE
+        max_retries = rate_limit_args.get("max_retries", self.max_retries)
+        chat_id = data.get("chat_id")
+
+        # The span includes time spent queued behind the rate limits
+        with tracer.span(
+            "telegram.send", endpoint=endpoint, chat_id=str(chat_id), priority=priority
+        ) as span:
+            for attempt in range(max_retries + 1):
+                if chat_id is not None:
+                    await self._acquire(priority, chat_id)
+                try:
+                    with TELEGRAM_SEND_SECONDS.time(endpoint=endpoint):
+                        return await callback(*args, **kwargs)
+                except RetryAfter as exc:
+                    self._retry_after_count += 1
+                    TELEGRAM_RETRY_AFTER.inc(endpoint=endpoint)
+                    span.set(retries=attempt + 1)
+                    if attempt == max_retries:
+                        logger.error(
+                            f"Telegram rate limit hit for chat {chat_id} "
+                            f"after {max_retries} retries"
+                        )
+                        raise
+                    pause = retry_after_seconds(exc) + 0.1
+                    logger.warning(
+                        f"Telegram rate limit hit for chat {chat_id}, "
+                        f"retrying in {pause:.1f}s"
+                    )
+                    self._paused_until[chat_id] = time.monotonic() + pause
+                    if chat_id is None:
+                        await asyncio.sleep(pause)
+
+    # ── Scheduling ─────────────────────────────────
+    def _ensure_dispatcher(self) -> None:
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def _acquire(self, priority: str, chat_id) -> None:
+        self._ensure_dispatcher()
+        future = asyncio.get_running_loop().create_future()
+        entry = [
+            PRIORITIES[priority],
+            next(self._seq),
+            priority,
+            chat_id,
+            future,
+            time.monotonic(),
+        ]
+        parked = self._parked.get(chat_id)
+        if parked is not None:
+            # Behind the chat's earlier requests; its timer wakes them
+            heapq.heappush(parked, entry)
+            return await future
+        heapq.heappush(self._waiters, entry)
+        self._wakeup.set()
+        # A cancelled entry stays queued and is skipped when it comes up
+        await future
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if self._is_group(chat_id):
+                bucket = TokenBucket(self.group_rate, self.group_burst)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    @staticmethod
+    def _is_group(chat_id) -> bool:
+        try:
+            return int(chat_id) < 0
+        except (TypeError, ValueError):
+            # @channelusername
+            return True
+
+    def _chat_wait(self, chat_id, now: float) -> float:
+        paused = self._paused_until.get(chat_id, 0.0) - now
+        return max(paused, self._chat_bucket(chat_id).wait_time(now))
+
+    async def _dispatch(self) -> None:
+        while True:
+            now = time.monotonic()
+            self._unpark(now)
+            while self._waiters and self._waiters[0][4].done():
+                chat_id = heapq.heappop(self._waiters)[3]
+                if chat_id in self._parked:
+                    # May have been the chat's unparked head: wake the rest
+                    self._schedule(chat_id, now)
+
+            if self._waiters:
+                delay = max(
+                    self.overall.wait_time(now),
+                    self._paused_until.get(None, 0.0) - now,
+                )
+                if delay <= 0:
+                    self._dispatch_next(now)
+                    continue
+            elif self._timers:
+                delay = self._timers[0][0] - now
+            else:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                self._prune()
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch_next(self, now: float) -> None:
+        """Release the first waiter in priority order, or park it if its
+        chat may not send yet."""
+        entry = heapq.heappop(self._waiters)
+        chat_id = entry[3]
+        chat_wait = self._chat_wait(chat_id, now)
+        if chat_wait > 0:
+            self._park(entry, now + chat_wait)
+            return
+        self._release(entry, now)
+        parked = self._parked.get(chat_id)
+        if parked is not None:
+            # The chat's next request waits for its bucket again
+            self._schedule(chat_id, now + self._chat_wait(chat_id, now))
+
+    def _park(self, entry: list, ready_at: float) -> None:
+        chat_id = entry[3]
+        heapq.heappush(self._parked.setdefault(chat_id, []), entry)
+        self._schedule(chat_id, ready_at)
+
+    def _schedule(self, chat_id, ready_at: float) -> None:
+        heapq.heappush(self._timers, (ready_at, next(self._seq), chat_id))
+
+    def _unpark(self, now: float) -> None:
+        """Move the first request of every chat whose timer fired back to
+        the main heap; the rest of the chat stays parked behind it."""
+        while self._timers and self._timers[0][0] <= now:
+            _, _, chat_id = heapq.heappop(self._timers)
+            parked = self._parked.get(chat_id)
+            if parked is None:
+                continue
+            while parked and parked[0][4].done():
+                heapq.heappop(parked)
+            if parked:
+                heapq.heappush(self._waiters, heapq.heappop(parked))
+            if not parked:
+                del self._parked[chat_id]
+
+    def _release(self, entry: list, now: float) -> None:
+        self.overall.take(now)
+        self._chat_bucket(entry[3]).take(now)
+        lane = self._lanes[entry[2]]
+        waited = now - entry[5]
+        lane.sent += 1
+        lane.wait_total += waited
+        lane.wait_max = max(lane.wait_max, waited)
+        entry[4].set_result(None)
+
+    def _entries(self):
+        """Every waiting (not cancelled) entry, parked or not."""
+        for entry in self._waiters:
+            if not entry[4].done():
+                yield entry
+        for parked in self._parked.values():
+            for entry in parked:
+                if not entry[4].done():
+                    yield entry
+
+    def _prune(self) -> None:
+        """Drop idle per-chat state so memory does not grow with every chat."""
+        if len(self._chats) < 10000:
+            return
+        now = time.monotonic()
+        waiting = set(self._parked)
+        waiting.update(entry[3] for entry in self._waiters)
+        for chat_id in [
+            c for c, b in self._chats.items() if c not in waiting and b.is_full(now)
+        ]:
+            del self._chats[chat_id]
+        for chat_id in [c for c, t in self._paused_until.items() if t < now]:
+            del self._paused_until[chat_id]
+
+    # ── Introspection ──────────────────────────────
+    def stats(self) -> dict:
+        """Queue depth and wait times per priority lane."""
+        now = time.monotonic()
+        depth = {name: 0 for name in PRIORITIES}
+        oldest = {name: 0.0 for name in PRIORITIES}
+        for entry in self._entries():
+            depth[entry[2]] += 1
+            oldest[entry[2]] = max(oldest[entry[2]], now - entry[5])
+        lanes = {}
+        for name, lane in self._lanes.items():
+            lanes[name] = {
+                "queued": depth[name],
+                "oldest_wait": round(oldest[name], 3),
+                "sent": lane.sent,
+                "avg_wait": round(lane.wait_total / lane.sent, 3) if lane.sent else 0.0,
+                "max_wait": round(lane.wait_max, 3),
+            }
+        return {"lanes": lanes, "retry_after": self._retry_after_count}
@@ -0,0 +1,376 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional
+from telegram import Message
+from telegram.error import (
+    BadRequest,
+    Forbidden,
+    NetworkError,
+    RetryAfter,
+    TelegramError,
+    TimedOut,
+)
+from services.rate_limiter import retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = os.path.join("data", "avbot-sender.sock")
+
+# One request or response per line; a full /sendBatch is well below this
+MAX_LINE = 16 * 1024 * 1024
+
+# Bot API calls the API process may make through the sender
+BOT_METHODS = {
+    "send_message",
+    "send_photo",
+    "send_document",
+    "send_chat_action",
+    "forward_message",
+}
+# Stateful ApiServer operations that live next to the sender
+CORE_METHODS = {
+    "calendar_event",
+    "submit_batch",
+    "batch_status",
+    "feed_update",
+    "core_health",
+    "core_metrics",
+    "set_profiling",
+    "profiling_state",
+}
+# Sent by the server to every connected API process: {"event", "data"}
+PROFILING_EVENT = "profiling"
+
+ERRORS = {
+    "RetryAfter": RetryAfter,
+    "BadRequest": BadRequest,
+    "Forbidden": Forbidden,
+    "TimedOut": TimedOut,
+    "NetworkError": NetworkError,
+}
+
+
+class BridgeError(Exception):
+    """The sender failed with an error that has no Telegram counterpart."""
+
+
+class _CallStats:
+    __slots__ = ("calls", "errors", "time_total", "time_max")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.time_total = 0.0
+        self.time_max = 0.0
+
+    def add(self, elapsed: float, failed: bool) -> None:
+        self.calls += 1
+        self.errors += failed
+        self.time_total += elapsed
+        self.time_max = max(self.time_max, elapsed)
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_time": round(self.time_total / self.calls, 3) if self.calls else 0.0,
+            "max_time": round(self.time_max, 3),
+        }
+
+
+def _encode_error(e: Exception) -> dict:
+    error = {"type": type(e).__name__, "message": str(e)}
+    if isinstance(e, RetryAfter):
+        error["retry_after"] = retry_after_seconds(e)
+    elif isinstance(e, TelegramError) and error["type"] not in ERRORS:
+        error["type"] = "NetworkError" if isinstance(e, NetworkError) else "BadRequest"
+    return error
+
+
+def _decode_error(error: dict) -> Exception:
+    kind = ERRORS.get(error.get("type"))
+    if kind is RetryAfter:
+        return RetryAfter(timedelta(seconds=error.get("retry_after", 1)))
+    if kind is not None:
+        return kind(error.get("message", ""))
+    return BridgeError(error.get("message", ""))
+
+
+class SenderBridgeServer:
+    """Unix socket endpoint of the process that owns the bot token.
+
+    Serves newline-delimited JSON requests ``{"id", "method", "kwargs"}``
+    from API server processes. Bot API calls go out through ``core.bot``
+    as bulk traffic; stateful operations (calendar delivery queue,
+    batches, webhook updates) run on the in-process ``core`` ApiServer.
+    New profiler settings are pushed to every connection as an event.
+    """
+
+    def __init__(self, core, path: str = DEFAULT_SOCKET):
+        self.core = core
+        self.path = path
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._stats: Dict[str, _CallStats] = {}
+        self._connections = 0
+        # writer -> its write lock, of every open connection
+        self._peers: Dict[Any, asyncio.Lock] = {}
+
+    async def start(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(
+            self._handle, path=self.path, limit=MAX_LINE
+        )
+        # Whoever can connect sends as the bot: owner only
+        os.chmod(self.path, 0o600)
+        logger.info(f"Sender bridge listening on {self.path}")
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _handle(self, reader, writer) -> None:
+        self._connections += 1
+        write_lock = asyncio.Lock()
+        self._peers[writer] = write_lock
+        tasks = set()
+
+        async def respond(request: dict) -> None:
+            response = await self._dispatch(request)
+            async with write_lock:
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.create_task(respond(json.loads(line)))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, json.JSONDecodeError) as e:
+            logger.warning(f"Bridge connection dropped: {e}")
+        finally:
+            self._connections -= 1
+            self._peers.pop(writer, None)
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _dispatch(self, request: dict) -> dict:
+        method = request.get("method")
+        kwargs = request.get("kwargs") or {}
+        started = time.monotonic()
+        failed = False
+        try:
+            if method in BOT_METHODS:
+                result = await getattr(self.core.bot, method)(
+                    **kwargs, **self.core.send_options
+                )
+                if hasattr(result, "to_dict"):
+                    result = result.to_dict()
+            elif method in CORE_METHODS:
+                result = await getattr(self.core, method)(**kwargs)
+                if method == "core_health":
+                    result["bridge"] = {"server": self.stats()}
+                elif method == "set_profiling":
+                    # Every API process applies them, not only the caller
+                    await self.broadcast(PROFILING_EVENT, result)
+            else:
+                raise BridgeError(f"Unknown method {method}")
+            return {"id": request.get("id"), "ok": True, "result": result}
+        except Exception as e:
+            failed = True
+            return {"id": request.get("id"), "ok": False, "error": _encode_error(e)}
+        finally:
+            stats = self._stats.setdefault(method, _CallStats())
+            stats.add(time.monotonic() - started, failed)
+
+    async def broadcast(self, event: str, data: Any) -> None:
+        """Send an event to every connected client."""
+        line = json.dumps({"event": event, "data": data}).encode("utf-8") + b"\n"
+        for writer, write_lock in list(self._peers.items()):
+            try:
+                async with write_lock:
+                    writer.write(line)
+                    await writer.drain()
+            except ConnectionError as e:
+                logger.warning(f"Bridge event {event} not delivered: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "connections": self._connections,
+            "methods": {name: s.to_dict() for name, s in self._stats.items()},
+        }
+
+
+class BridgeClient:
+    """Client side of the sender bridge, used inside API server processes.
+
+    One connection per process is shared by all requests; responses are
+    matched to requests by id. The connection is re-opened on demand
+    after a failure. Events pushed by the server go to ``on_event(event,
+    data)``.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET, timeout: float = 60.0):
+        self.path = path
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._writer = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._stats: Dict[str, _CallStats] = {}
+        self.on_event: Optional[Callable[[str, Any], None]] = None
+
+    async def _connect(self) -> None:
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._writer is not None:
+                return
+            reader, self._writer = await asyncio.open_unix_connection(
+                self.path, limit=MAX_LINE
+            )
+            self._reader_task = asyncio.create_task(self._read(reader))
+
+    async def _read(self, reader) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                if "event" in response:
+                    self._event(response["event"], response.get("data"))
+                    continue
+                future = self._pending.pop(response.get("id"), None)
+                if future and not future.done():
+                    future.set_result(response)
+        finally:
+            self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(BridgeError("Sender connection lost"))
+            self._pending.clear()
+
+    def _event(self, event: str, data: Any) -> None:
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(event, data)
+        except Exception as e:
+            logger.error(f"Failed to handle bridge event {event}: {e}")
+
+    async def call(self, method: str, **kwargs) -> Any:
+        started = time.monotonic()
+        failed = True
+        try:
+            await self._connect()
+            request_id = next(self._ids)
+            future = asyncio.get_running_loop().create_future()
+            self._pending[request_id] = future
+            line = {"id": request_id, "method": method, "kwargs": kwargs}
+            self._writer.write(json.dumps(line).encode("utf-8") + b"\n")
+            await self._writer.drain()
+            try:
+                response = await asyncio.wait_for(future, timeout=self.timeout)
+            except asyncio.TimeoutError:
+                raise BridgeError(
+                    f"Sender did not answer {method} within {self.timeout:g}s"
+                ) from None
+            finally:
+                self._pending.pop(request_id, None)
+            if not response["ok"]:
+                raise _decode_error(response["error"])
+            failed = False
+            return response["result"]
+        except (ConnectionError, FileNotFoundError) as e:
+            raise BridgeError(f"Sender unavailable: {e}")
+        finally:
+            stats = self._stats.setdefault(method, _CallStats())
+            stats.add(time.monotonic() - started, failed)
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task:
+            self._reader_task.cancel()
+
+    def stats(self) -> dict:
+        return {name: s.to_dict() for name, s in self._stats.items()}
+
+
+class BridgeBot:
+    """Bot API subset used by ApiServer, sent through the bridge."""
+
+    def __init__(self, client: BridgeClient):
+        self.client = client
+
+    async def _call(self, method: str, **kwargs):
+        result = await self.client.call(method, **kwargs)
+        if isinstance(result, dict):
+            return Message.de_json(result, None)
+        return result
+
+    async def send_message(self, **kwargs):
+        return await self._call("send_message", **kwargs)
+
+    async def send_photo(self, **kwargs):
+        return await self._call("send_photo", **kwargs)
+
+    async def send_document(self, **kwargs):
+        return await self._call("send_document", **kwargs)
+
+    async def send_chat_action(self, **kwargs):
+        return await self._call("send_chat_action", **kwargs)
+
+    async def forward_message(self, **kwargs):
+        return await self._call("forward_message", **kwargs)
+
+
+class BridgeCore:
+    """Stateful ApiServer operations executed by the sender process."""
+
+    def __init__(self, client: BridgeClient):
+        self.client = client
+
+    async def calendar_event(self, payload: dict) -> str:
+        return await self.client.call("calendar_event", payload=payload)
+
+    async def submit_batch(self, messages: list) -> dict:
+        return await self.client.call("submit_batch", messages=messages)
+
+    async def batch_status(self, batch_id: str) -> Optional[dict]:
+        return await self.client.call("batch_status", batch_id=batch_id)
+
+    async def feed_update(self, update: dict) -> None:
+        await self.client.call("feed_update", update=update)
+
+    async def core_health(self) -> dict:
+        health = await self.client.call("core_health")
+        health["bridge"] = {"client": self.client.stats(), **health.get("bridge", {})}
+        return health
+
+    async def core_metrics(self) -> list:
+        return await self.client.call("core_metrics")
+
+    async def set_profiling(self, settings: dict) -> dict:
+        return await self.client.call("set_profiling", settings=settings)
+
+    async def profiling_state(self) -> dict:
+        return await self.client.call("profiling_state")
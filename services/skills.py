@@ -0,0 +1,163 @@
+import hashlib
+import logging
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+import md2tgmd
+
+logger = logging.getLogger(__name__)
+
+SKILLS_DIR = Path(__file__).resolve().parent.parent / "skills"
+
+
+def compile_template(text: str) -> Optional[List[Tuple[str, Optional[str], str]]]:
+    """Split a ``str.format`` template into (literal, field, spec) pieces.
+
+    Returns None when the template uses conversions or attribute/index
+    lookups; those are rendered with ``str.format`` instead.
+    """
+    pieces = []
+    try:
+        for literal, field, spec, conversion in Formatter().parse(text):
+            if field is not None and (
+                conversion or not field.isidentifier() or "{" in (spec or "")
+            ):
+                return None
+            pieces.append((literal, field, spec or ""))
+    except ValueError:
+        # Not a template (e.g. a prompt with unbalanced braces)
+        return None
+    return pieces
+
+
+class Skill:
+    """One file from ``skills/``, loaded once per version."""
+
+    __slots__ = ("name", "text", "mtime", "version", "_template", "_escaped")
+
+    def __init__(self, name: str, text: str, mtime: int):
+        self.name = name
+        self.text = text
+        self.mtime = mtime
+        self.version = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+        self._template = compile_template(text)
+        self._escaped: Optional[str] = None
+
+    @property
+    def escaped(self) -> str:
+        """Text escaped for Telegram MarkdownV2, computed once."""
+        if self._escaped is None:
+            self._escaped = md2tgmd.escape(self.text)
+        return self._escaped
+
+    def format(self, **values) -> str:
+        """Same result as ``text.format(**values)`` using the parsed template."""
+        if self._template is None:
+            return self.text.format(**values)
+        parts = []
+        for literal, field, spec in self._template:
+            parts.append(literal)
+            if field is not None:
+                value = values[field]
+                parts.append(format(value, spec) if spec else str(value))
+        return "".join(parts)
+
+
+class SkillRegistry:
+    """Skill texts and templates from ``skills/``, reloaded on change.
+
+    Files are read once and kept in memory. At most every
+    ``check_interval`` seconds the directory is stat'ed and files whose
+    mtime changed are read again; the new set replaces the old one in a
+    single assignment, so readers never see a half-reloaded registry.
+    ``request_reload`` (wired to SIGHUP) forces a full re-read on the
+    next access.
+    """
+
+    def __init__(self, directory: Path = SKILLS_DIR, check_interval: float = 2.0):
+        self.directory = Path(directory)
+        self.check_interval = check_interval
+        self._skills: Dict[str, Skill] = {}
+        self._checked_at = 0.0
+        self._force = True
+        self._lock = threading.Lock()
+
+    # ── Loading ────────────────────────────────────
+    def request_reload(self, *_) -> None:
+        """Re-read every file on next access (safe to call from a signal handler)."""
+        self._force = True
+
+    def install_sighup_handler(self) -> None:
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self.request_reload)
+
+    def reload(self, force: bool = False) -> None:
+        """Re-read changed files (all files with ``force``)."""
+        with self._lock:
+            force = force or self._force
+            self._force = False
+            current = self._skills
+            skills = {}
+            try:
+                entries = list(os.scandir(self.directory))
+            except OSError as e:
+                logger.error(f"Failed to list skills in {self.directory}: {e}")
+                return
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                name = os.path.splitext(entry.name)[0]
+                known = current.get(name)
+                try:
+                    mtime = entry.stat().st_mtime_ns
+                    if not force and known and known.mtime == mtime:
+                        skills[name] = known
+                        continue
+                    with open(entry.path, "r", encoding="utf-8") as f:
+                        skills[name] = Skill(name, f.read(), mtime)
+                except OSError as e:
+                    logger.error(f"Failed to load skill {entry.name}: {e}")
+                    if known:
+                        skills[name] = known
+                    continue
+                if known and known.version != skills[name].version:
+                    logger.info(f"Skill {name} reloaded ({skills[name].version})")
+            self._skills = skills
+            self._checked_at = time.monotonic()
+
+    def _current(self) -> Dict[str, Skill]:
+        if self._force or time.monotonic() - self._checked_at >= self.check_interval:
+            self.reload()
+        return self._skills
+
+    # ── Access ─────────────────────────────────────
+    def get(self, name: str) -> Skill:
+        """Skill by file name, with or without extension. Raises KeyError."""
+        return self._current()[os.path.splitext(name)[0]]
+
+    def text(self, name: str) -> str:
+        return self.get(name).text
+
+    def escaped(self, name: str) -> str:
+        return self.get(name).escaped
+
+    def render(self, name: str, **values) -> str:
+        return self.get(name).format(**values)
+
+    def versions(self) -> Dict[str, str]:
+        """Content hash of every skill, e.g. for cache keys."""
+        return {name: skill.version for name, skill in self._current().items()}
+
+    @property
+    def version(self) -> str:
+        """Combined hash of all skills; changes when any file changes."""
+        joined = ",".join(f"{n}:{v}" for n, v in sorted(self.versions().items()))
+        return hashlib.sha1(joined.encode("utf-8")).hexdigest()[:12]
+
+
+# Process-wide registry of the bot's skills directory
+skills = SkillRegistry()
@@ -1,6 +1,13 @@
 import requests
+from services.metrics import STT_SECONDS
+from services.tracing import tracer
 
-def recognize_speech(filepath: str, api_key: str, folder_id: str, lang: str = 'ru-RU') -> str:
+STT_URL = 'https://stt.api.cloud.yandex.net/speech/v1/stt:recognize'
+
+
+@STT_SECONDS.timed()
+@tracer.traced("stt")
+def recognize_speech(filepath: str, api_key: str, folder_id: str, lang: str = 'ru-RU', url: str = STT_URL) -> str:
     with open(filepath, 'rb') as f:
         audio_data = f.read()
 
@@ -15,7 +22,7 @@ def recognize_speech(filepath: str, api_key: str, folder_id: str, lang: str = 'r
     }
 
     response = requests.post(
-        'https://stt.api.cloud.yandex.net/speech/v1/stt:recognize',
+        url,
         headers=headers,
         params=params,
         data=audio_data
@@ -3,9 +3,10 @@ import logging
 import os
 from telegram import Update
 from telegram.ext import ContextTypes
-from pydub import AudioSegment
-from services.speech import recognize_speech
+from services.speech import STT_URL, recognize_speech
 from services.config_service import Config
+from services.metrics import AUDIO_CONVERT_SECONDS
+from services.tracing import tracer
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -17,7 +18,10 @@ class SpeechService:
     def __init__(self, config: Config):
         self.config = config
         self.uploads_dir = config.getBot("uploads_dir") or tempfile.gettempdir()
+        self.stt_url = config.getCloud("stt_url") or STT_URL
 
+    @AUDIO_CONVERT_SECONDS.timed()
+    @tracer.traced("audio.convert")
     def convert_audio(self, file_name):
         uploads_path = os.path.join(self.uploads_dir, os.path.basename(file_name))
         with open(file_name, "rb") as src, open(uploads_path, "wb") as dst:
@@ -31,6 +35,9 @@ class SpeechService:
 
         logger.info(f"convert audio file from {uploads_path} to: {output_path}")
         """Convert audio file to OGG format with required specifications"""
+        # pydub is only needed for non-OGG uploads
+        from pydub import AudioSegment
+
         sound = (
             AudioSegment.from_file(uploads_path).set_frame_rate(16000).set_channels(1)
         )
@@ -55,7 +62,10 @@ class SpeechService:
             # Recognize speech using Yandex SpeechKit
             try:
                 transcript = recognize_speech(
-                    ogg_path, self.config.getCloudKey(), self.config.getCloudFolder()
+                    ogg_path,
+                    self.config.getCloudKey(),
+                    self.config.getCloudFolder(),
+                    url=self.stt_url,
                 )
             except Exception as e:
                 logger.error(f"Error recognizing speech: {str(e)}")
@@ -84,7 +94,10 @@ class SpeechService:
             # Recognize speech using Yandex SpeechKit
             try:
                 transcript = recognize_speech(
-                    ogg_path, self.config.getCloudKey(), self.config.getCloudFolder()
+                    ogg_path,
+                    self.config.getCloudKey(),
+                    self.config.getCloudFolder(),
+                    url=self.stt_url,
                 )
             except Exception as e:
                 logger.error(f"Error recognizing speech: {str(e)}")
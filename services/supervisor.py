@@ -0,0 +1,239 @@
+import asyncio
+import bisect
+import hashlib
+import itertools
+import logging
+import multiprocessing
+import queue
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from telegram import Update
+from services.metrics import with_labels
+from services.profiler import profiler
+from services.update_processor import update_owner
+
+logger = logging.getLogger(__name__)
+
+# Seconds between worker load reports and liveness checks
+REPORT_INTERVAL = 5.0
+# Control message on a worker's update queue: {PROFILING: profiler settings}
+PROFILING = "profiling"
+
+
+class HashRing:
+    """Consistent hash ring with ``replicas`` virtual points per node.
+
+    Adding a node moves only the keys that now hash to it (about
+    1/len(nodes) of them); all other keys keep their node.
+    """
+
+    def __init__(self, nodes: Iterable[Any] = (), replicas: int = 100):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, Any] = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+    def add(self, node: Any) -> None:
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}#{replica}")
+            if point not in self._owners:
+                bisect.insort(self._points, point)
+                self._owners[point] = node
+
+    def remove(self, node: Any) -> None:
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}#{replica}")
+            if self._owners.get(point) == node:
+                del self._owners[point]
+                self._points.remove(point)
+
+    def node_for(self, key: Any) -> Any:
+        if not self._points:
+            raise LookupError("Hash ring is empty")
+        index = bisect.bisect(self._points, self._hash(str(key)))
+        return self._owners[self._points[index % len(self._points)]]
+
+
+class WorkerSupervisor:
+    """Runs bot worker processes and routes updates to them by user.
+
+    ``target(index, updates, reports)`` is started in a separate process
+    for every worker. Each update goes to the worker picked by a
+    consistent hash of its user id, so one user is always served by the
+    same worker (and that worker's caches) and the updates of a user stay
+    in order. Updates without a user are spread round robin. Workers send
+    load reports as dicts over ``reports`` (with collected metric families
+    under ``"metrics"``); a worker that dies is restarted with the same
+    index and picks up its queued updates. Profiler settings changed at
+    runtime travel to the workers over the same queues.
+    """
+
+    def __init__(self, workers: int, target: Callable, replicas: int = 100):
+        self.workers = workers
+        self.target = target
+        self.ring = HashRing(range(workers), replicas=replicas)
+        self._context = multiprocessing.get_context("spawn")
+        self._updates = [self._context.Queue() for _ in range(workers)]
+        self._reports = self._context.Queue()
+        self._processes: Dict[int, Any] = {}
+        self._routed = [0] * workers
+        self._restarts = [0] * workers
+        self._load: Dict[int, dict] = {}
+        self._metrics: Dict[int, list] = {}
+        self._round_robin = itertools.cycle(range(workers))
+        # Runtime profiler settings, resent to restarted workers
+        self._profiling: Dict[str, Any] = {}
+
+    # ── Processes ──────────────────────────────────
+    def _spawn(self, index: int) -> None:
+        process = self._context.Process(
+            target=self.target,
+            args=(index, self._updates[index], self._reports),
+            name=f"bot-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[index] = process
+        logger.info(f"Started worker {index} (pid {process.pid})")
+
+    def start(self) -> None:
+        for index in range(self.workers):
+            self._spawn(index)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        for updates in self._updates:
+            updates.put(None)
+        for process in self._processes.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+    def _check_workers(self) -> None:
+        for index, process in list(self._processes.items()):
+            if not process.is_alive():
+                logger.error(
+                    f"Worker {index} exited with code {process.exitcode}, restarting"
+                )
+                self._restarts[index] += 1
+                self._spawn(index)
+                if self._profiling:
+                    self._updates[index].put({PROFILING: dict(self._profiling)})
+
+    def _collect_reports(self) -> None:
+        while True:
+            try:
+                report = self._reports.get_nowait()
+            except queue.Empty:
+                return
+            families = report.pop("metrics", None)
+            if families is not None:
+                self._metrics[report["worker"]] = families
+            self._load[report["worker"]] = report
+
+    def set_profiling(self, settings: dict) -> None:
+        """Apply runtime profiler settings in every worker."""
+        self._profiling.update(settings)
+        for updates in self._updates:
+            updates.put({PROFILING: settings})
+
+    # ── Routing ────────────────────────────────────
+    def worker_for(self, update: Update) -> int:
+        owner = update_owner(update)
+        if owner is None:
+            return next(self._round_robin)
+        return self.ring.node_for(owner)
+
+    def route(self, update: Update) -> int:
+        index = self.worker_for(update)
+        self._updates[index].put(update.to_dict())
+        self._routed[index] += 1
+        return index
+
+    async def run(self, update_queue: asyncio.Queue) -> None:
+        """Route updates from ``update_queue`` until cancelled."""
+        checked_at = time.monotonic()
+        while True:
+            try:
+                update = await asyncio.wait_for(
+                    update_queue.get(), timeout=REPORT_INTERVAL
+                )
+                if isinstance(update, Update):
+                    self.route(update)
+            except asyncio.TimeoutError:
+                pass
+            if time.monotonic() - checked_at >= REPORT_INTERVAL:
+                checked_at = time.monotonic()
+                self._collect_reports()
+                self._check_workers()
+
+    def stats(self) -> dict:
+        """Updates routed to and last load report of every worker."""
+        self._collect_reports()
+        workers = {}
+        for index in range(self.workers):
+            process = self._processes.get(index)
+            workers[index] = {
+                "pid": process.pid if process else None,
+                "alive": bool(process and process.is_alive()),
+                "routed": self._routed[index],
+                "restarts": self._restarts[index],
+                "load": self._load.get(index),
+            }
+        return workers
+
+    def metrics(self) -> list:
+        """Metric families last reported by the workers, labelled by worker."""
+        self._collect_reports()
+        families = []
+        for index, reported in sorted(self._metrics.items()):
+            families.extend(with_labels(reported, worker=index))
+        return families
+
+
+async def serve_worker(
+    application,
+    index: int,
+    updates,
+    reports,
+    report: Optional[Callable[[], dict]] = None,
+) -> None:
+    """Feed updates from the supervisor into a worker's ``application``.
+
+    Returns when the supervisor sends ``None``. Every ``REPORT_INTERVAL``
+    seconds a load report (``report()`` merged with counters) is sent back.
+    """
+    loop = asyncio.get_running_loop()
+    received = 0
+    reported_at = time.monotonic()
+    async with application:
+        await application.start()
+        try:
+            while True:
+                try:
+                    data = await loop.run_in_executor(
+                        None, updates.get, True, REPORT_INTERVAL
+                    )
+                except queue.Empty:
+                    data = False
+                if data is None:
+                    break
+                if isinstance(data, dict) and PROFILING in data:
+                    profiler.update(**data[PROFILING])
+                elif data:
+                    await application.update_queue.put(
+                        Update.de_json(data, application.bot)
+                    )
+                    received += 1
+                if time.monotonic() - reported_at >= REPORT_INTERVAL:
+                    reported_at = time.monotonic()
+                    load = {"worker": index, "received": received, "at": time.time()}
+                    if report:
+                        load.update(report())
+                    reports.put(load)
+        finally:
+            await application.stop()
@@ -1,25 +1,159 @@
 import logging
 import json
-from pathlib import Path
-from yandex_ai_studio_sdk import AIStudio
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from services.dialog_service import DialogService
-from storage.file_storage import FileDialogStorage, DEFAULT_TOPIC
+from storage.factory import get_locks, get_storage
 from services.config_service import Config
-from services.yandex_index_service import YandexIndexService
+from services.yandex_index_service import YandexIndexService, get_sdk
 from clients.icsclient import ICSClient
+from services.skills import skills
+from services.calendar_store import CalendarEventStore, parse_dt
+from services.circuit_breaker import CLOSED, CircuitOpenError, get_breaker
+from services.metrics import TOOL_CALL_SECONDS
+from services.tracing import tracer
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+EVENT_PROPERTIES = {
+    "summary": {
+        "type": "string",
+        "description": "Название события",
+    },
+    "description": {
+        "type": "string",
+        "description": "Описание события",
+    },
+    "location": {
+        "type": "string",
+        "description": "Место или ссылка",
+    },
+    "start": {
+        "type": "string",
+        "description": "Начало в ISO формате, например 2026-07-28T15:00:00+03:00",
+    },
+    "end": {
+        "type": "string",
+        "description": "Конец в ISO формате",
+    },
+    "all_day": {
+        "type": "boolean",
+        "description": "Событие на весь день",
+    },
+}
+
+SCHEDULE_TOOLS = ("get_events", "find_free_slots")
+
+# Keep schedule tool outputs small enough for the model context
+MAX_EVENTS = 50
+MAX_SLOTS = 20
+
+# Last known calendar lists served while the ICS service is down
+CALENDARS_CACHE_SIZE = 1000
+CALENDARS_CACHE_TTL = 86400
+
+EVENT_SCHEMA = {
+    "type": "object",
+    "properties": EVENT_PROPERTIES,
+    "required": ["summary"],
+}
+
 
 class ToolService:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, event_store: CalendarEventStore = None):
         self.config = config
         self.ics = ICSClient(config)
+        self.event_store = event_store
+        # Only outages count as breaker failures (ICSClient.unavailable): a
+        # 4xx for a calendar_id the model made up must not degrade every user
+        self.ics_breaker = get_breaker(
+            "ics", **(config.get("ics", "circuit_breaker", {}) or {})
+        )
+        # user_id -> (received at, last calendars list from the ICS service),
+        # least recently used first
+        self._calendars_cache: "OrderedDict[int, tuple]" = OrderedDict()
+        self._calendars_cache_size = int(
+            config.get("ics", "calendars_cache_size", CALENDARS_CACHE_SIZE)
+        )
+        self._calendars_cache_ttl = float(
+            config.get("ics", "calendars_cache_ttl", CALENDARS_CACHE_TTL)
+        )
+        self._cache_lock = threading.Lock()
+
+    def _cached_calendars(self, user_id):
+        """Last calendars list of the user unless it is older than the TTL."""
+        with self._cache_lock:
+            entry = self._calendars_cache.get(user_id)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self._calendars_cache_ttl:
+                del self._calendars_cache[user_id]
+                return None
+            self._calendars_cache.move_to_end(user_id)
+            return entry[1]
+
+    def _cache_calendars(self, user_id, calendars) -> None:
+        with self._cache_lock:
+            self._calendars_cache[user_id] = (time.monotonic(), calendars)
+            self._calendars_cache.move_to_end(user_id)
+            while len(self._calendars_cache) > self._calendars_cache_size:
+                self._calendars_cache.popitem(last=False)
 
     def call_tool(self, tool_name: str, args: dict, user_id: int = None) -> dict:
         """Route tool calls to appropriate handler."""
-        return self._call_calendar_tool(tool_name, args, user_id)
+        with TOOL_CALL_SECONDS.time(tool=tool_name), tracer.span(
+            "tool", tool=tool_name
+        ):
+            if tool_name in SCHEDULE_TOOLS and self.event_store:
+                return self._call_schedule_tool(tool_name, args, user_id)
+            return self._call_calendar_tool(tool_name, args, user_id)
+
+    def _call_schedule_tool(
+        self, tool_name: str, args: dict, user_id: int = None
+    ) -> dict:
+        """Answer schedule queries from the local calendar event store."""
+        try:
+            if not self.event_store.is_synced(user_id):
+                self.ics_breaker.call(
+                    self.event_store.sync_user,
+                    user_id,
+                    is_failure=lambda ok: not ok and self.event_store.ics.unavailable,
+                )
+                if not self.event_store.is_synced(user_id):
+                    return self._unavailable()
+            now = datetime.now(timezone.utc)
+            start = parse_dt(args.get("start")) or now
+            end = parse_dt(args.get("end")) or start + timedelta(days=7)
+            if end <= start:
+                return {"error": "end must be after start"}
+
+            if tool_name == "get_events":
+                events = self.event_store.get_events(user_id, start, end)
+                result = {"events": events[:MAX_EVENTS]}
+                if len(events) > MAX_EVENTS:
+                    result["truncated"] = len(events) - MAX_EVENTS
+            else:
+                duration = int(args.get("duration_minutes") or 60)
+                slots = self.event_store.find_free_slots(
+                    user_id, timedelta(minutes=duration), start, end
+                )
+                result = {
+                    "slots": [
+                        {"start": s.isoformat(), "end": e.isoformat()}
+                        for s, e in slots[:MAX_SLOTS]
+                    ]
+                }
+            if self.ics_breaker.state != CLOSED:
+                result["stale"] = True
+            return result
+        except CircuitOpenError as e:
+            return self._unavailable(e)
+        except Exception as e:
+            logger.error(f"Schedule tool error: {e}")
+            return {"error": str(e)}
 
     def _call_calendar_tool(
         self, tool_name: str, args: dict, user_id: int = None
@@ -27,17 +161,28 @@ class ToolService:
         """Handle calendar-related tool calls."""
         try:
             if tool_name == "get_help":
-                help_file = (
-                    Path(__file__).resolve().parent.parent / "skills" / "calendar.md"
-                )
                 try:
-                    text = help_file.read_text(encoding="utf-8")
-                    return {"help_text": text}
+                    return {"help_text": skills.text("calendar")}
                 except Exception as e:
                     logger.error(f"Error reading help file: {e}")
                     return {"help_text": "Справка временно недоступна."}
             if tool_name == "list_calendars":
-                calendars = self.ics.get_calendars(str(user_id))
+                try:
+                    calendars = self.ics_breaker.call(
+                        self.ics.get_calendars,
+                        str(user_id),
+                        is_failure=lambda r: r is None and self.ics.unavailable,
+                    )
+                except CircuitOpenError:
+                    calendars = None
+                stale = calendars is None
+                if stale:
+                    # Fall back to the last known list while the ICS service is down
+                    calendars = self._cached_calendars(user_id)
+                    if calendars is None:
+                        return self._unavailable()
+                else:
+                    self._cache_calendars(user_id, calendars)
                 all_calendars = calendars or []
                 writable = [
                     c
@@ -57,31 +202,77 @@ class ToolService:
                     )
                 elif len(writable) == 0:
                     result["note"] = "У вас нет календарей, доступных для записи."
+                if stale:
+                    result["stale"] = True
                 return result
 
             if tool_name == "add_calendar_event":
                 calendar_id = args.get("calendar_id")
                 if not calendar_id:
                     return {"error": "calendar_id is required"}
-                success = self.ics.create_event(
+                success = self.ics_breaker.call(
+                    self.ics.create_event,
                     calendar_id,
                     str(user_id),
-                    summary=args.get("summary", ""),
-                    description=args.get("description", ""),
-                    location=args.get("location", ""),
-                    start=args.get("start", ""),
-                    end=args.get("end", ""),
-                    all_day=args.get("all_day", False),
+                    is_failure=lambda ok: not ok and self.ics.unavailable,
+                    **self._event_fields(args),
                 )
                 if success:
                     return {"status": "ok", "message": "Событие создано"}
                 return {"error": "Не удалось создать событие"}
 
+            if tool_name == "add_calendar_events":
+                calendar_id = args.get("calendar_id")
+                if not calendar_id:
+                    return {"error": "calendar_id is required"}
+                events = args.get("events") or []
+                if not events:
+                    return {"error": "events is required"}
+                results = self.ics_breaker.call(
+                    self.ics.create_events,
+                    calendar_id,
+                    str(user_id),
+                    [self._event_fields(event) for event in events],
+                    is_failure=lambda rs: all(r.get("unavailable") for r in rs),
+                )
+                created = sum(1 for r in results if r["status"] == "ok")
+                return {
+                    "status": "ok" if created == len(results) else "partial",
+                    "message": f"Создано событий: {created} из {len(results)}",
+                    "results": results,
+                }
+
             return {"error": f"Unknown calendar tool: {tool_name}"}
+        except CircuitOpenError as e:
+            return self._unavailable(e)
         except Exception as e:
             logger.error(f"Calendar tool error: {e}")
             return {"error": str(e)}
 
+    @staticmethod
+    def _unavailable(error: CircuitOpenError = None) -> dict:
+        """Fast-fail answer telling the model the calendar backend is down."""
+        result = {
+            "error": "Сервис календаря временно недоступен. Не вызывай инструменты "
+            "календаря повторно, сообщи пользователю, что нужно попробовать позже.",
+            "unavailable": True,
+        }
+        if error is not None:
+            result["retry_in"] = round(error.retry_in)
+        return result
+
+    @staticmethod
+    def _event_fields(args: dict) -> dict:
+        """Extract ICS event fields from tool arguments."""
+        return {
+            "summary": args.get("summary", ""),
+            "description": args.get("description", ""),
+            "location": args.get("location", ""),
+            "start": args.get("start", ""),
+            "end": args.get("end", ""),
+            "all_day": args.get("all_day", False),
+        }
+
     def _prepare_tools(self, index_keys: list):
         """Prepare tools for YandexGPT request"""
         # Start with the base tools
@@ -133,39 +324,86 @@ class ToolService:
                                 "type": "string",
                                 "description": "ID календаря из list_calendars",
                             },
-                            "summary": {
-                                "type": "string",
-                                "description": "Название события",
-                            },
-                            "description": {
-                                "type": "string",
-                                "description": "Описание события",
-                            },
-                            "location": {
-                                "type": "string",
-                                "description": "Место или ссылка",
-                            },
-                            "start": {
-                                "type": "string",
-                                "description": "Начало в ISO формате, например 2026-07-28T15:00:00+03:00",
-                            },
-                            "end": {
+                            **EVENT_PROPERTIES,
+                        },
+                        "required": ["calendar_id", "summary"],
+                    },
+                },
+                {
+                    "type": "function",
+                    "name": "add_calendar_events",
+                    "description": "Создать сразу несколько событий в календаре (например, импорт расписания)",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "calendar_id": {
                                 "type": "string",
-                                "description": "Конец в ISO формате",
+                                "description": "ID календаря из list_calendars",
                             },
-                            "all_day": {
-                                "type": "boolean",
-                                "description": "Событие на весь день",
+                            "events": {
+                                "type": "array",
+                                "description": "Список событий",
+                                "items": EVENT_SCHEMA,
                             },
                         },
-                        "required": ["calendar_id", "summary"],
+                        "required": ["calendar_id", "events"],
                     },
                 },
             ]
         )
 
+        # Add schedule tools backed by the local event store
+        if self.event_store:
+            tools.extend(
+                [
+                    {
+                        "type": "function",
+                        "name": "get_events",
+                        "description": "Показать события пользователя за период (по умолчанию — ближайшие 7 дней)",
+                        "parameters": {
+                            "type": "object",
+                            "properties": {
+                                "start": {
+                                    "type": "string",
+                                    "description": "Начало периода в ISO формате",
+                                },
+                                "end": {
+                                    "type": "string",
+                                    "description": "Конец периода в ISO формате",
+                                },
+                            },
+                            "required": [],
+                        },
+                    },
+                    {
+                        "type": "function",
+                        "name": "find_free_slots",
+                        "description": "Найти свободные промежутки заданной длительности за период",
+                        "parameters": {
+                            "type": "object",
+                            "properties": {
+                                "duration_minutes": {
+                                    "type": "integer",
+                                    "description": "Длительность в минутах",
+                                },
+                                "start": {
+                                    "type": "string",
+                                    "description": "Начало периода в ISO формате",
+                                },
+                                "end": {
+                                    "type": "string",
+                                    "description": "Конец периода в ISO формате",
+                                },
+                            },
+                            "required": ["duration_minutes"],
+                        },
+                    },
+                ]
+            )
+
         return tools
 
+    @tracer.traced("index.lookup")
     def _get_user_index_id(self, user_id: int):
         """Get combined index IDs for a specific user.
 
@@ -175,11 +413,10 @@ class ToolService:
         Returns:
             List of unique index IDs preserving order
         """
-        storage = FileDialogStorage()
-        dialogs_service = DialogService(storage)
+        storage = get_storage(self.config)
+        dialogs_service = DialogService(storage, get_locks(self.config))
         # Получаем текущий топик пользователя
-        dialog_data = storage.load_dialog(user_id)
-        current_topic = dialog_data.get("current_topic", DEFAULT_TOPIC)
+        current_topic = storage.get_current_topic(user_id)
         logger.info(f"Current topic: {current_topic}")
 
         # Get index ID for user's default topic
@@ -187,9 +424,7 @@ class ToolService:
         index_id = self.config.getYandex("user_index").get(str(user_id), index_def)
 
         try:
-            sdk = AIStudio(
-                folder_id=self.config.getCloudFolder(), auth=self.config.getCloudKey()
-            )
+            sdk = get_sdk(self.config)
             index_service = YandexIndexService(
                 sdk, self.config.getCloudFolder(), dialogs_service
             )
@@ -0,0 +1,344 @@
+import asyncio
+import atexit
+import collections
+import functools
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+from typing import List, Optional
+import requests
+from services.config_service import Config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRACE_FILE = os.path.join("data", "traces.jsonl")
+DEFAULT_OTLP_ENDPOINT = "http://localhost:4318/v1/traces"
+
+_current: ContextVar[Optional["Span"]] = ContextVar("avbot_span", default=None)
+
+
+class Span:
+    """One timed operation of a trace; also its own context manager.
+
+    Entering the span makes it the parent of spans started in the same
+    task or thread (``asyncio.to_thread`` copies the context); a span
+    without a parent starts a new trace.
+    """
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "attributes",
+        "start",
+        "end",
+        "error",
+        "_token",
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = self.span_id = self.parent_id = None
+        self.start = self.end = 0
+        self.error: Optional[str] = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        parent = _current.get()
+        if parent is None:
+            self.trace_id = secrets.token_hex(16)
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+        self.span_id = secrets.token_hex(8)
+        self.start = time.time_ns()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end = time.time_ns()
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _current.reset(self._token)
+        self.tracer._finish(self)
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "end": self.end,
+            "duration_ms": round((self.end - self.start) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Returned by ``Tracer.span`` while tracing is disabled."""
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+# ── Exporters ──────────────────────────────────
+class JsonlExporter:
+    """Appends finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str = DEFAULT_TRACE_FILE):
+        self.path = path
+
+    def export(self, spans: List[dict]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lines = "".join(json.dumps(s, ensure_ascii=False) + "\n" for s in spans)
+        # One write per batch keeps lines of several processes apart
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+class OtlpExporter:
+    """Posts spans as OTLP/HTTP JSON to a collector (``/v1/traces``)."""
+
+    def __init__(
+        self,
+        endpoint: str = DEFAULT_OTLP_ENDPOINT,
+        service_name: str = "avbot",
+        timeout: float = 5.0,
+    ):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    @staticmethod
+    def _value(value) -> dict:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def _attributes(self, attributes: dict) -> List[dict]:
+        return [{"key": k, "value": self._value(v)} for k, v in attributes.items()]
+
+    def _span(self, span: dict) -> dict:
+        otlp = {
+            "traceId": span["trace_id"],
+            "spanId": span["span_id"],
+            "name": span["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(span["start"]),
+            "endTimeUnixNano": str(span["end"]),
+            "attributes": self._attributes(span["attributes"]),
+            "status": {"code": 1},
+        }
+        if span["parent_id"]:
+            otlp["parentSpanId"] = span["parent_id"]
+        if span["error"]:
+            otlp["status"] = {"code": 2, "message": span["error"]}
+        return otlp
+
+    def payload(self, spans: List[dict]) -> dict:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": self._attributes(
+                            {"service.name": self.service_name}
+                        )
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "avbot"},
+                            "spans": [self._span(s) for s in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def export(self, spans: List[dict]) -> None:
+        response = requests.post(
+            self.endpoint, json=self.payload(spans), timeout=self.timeout
+        )
+        response.raise_for_status()
+
+
+class BatchSpanProcessor:
+    """Hands finished spans to an exporter from a background thread.
+
+    Spans are buffered and exported every ``interval`` seconds or when
+    ``max_batch`` are waiting; beyond ``max_queue`` new spans are dropped
+    so a slow collector never holds up updates.
+    """
+
+    def __init__(
+        self,
+        exporter,
+        max_batch: int = 256,
+        interval: float = 2.0,
+        max_queue: int = 10000,
+    ):
+        self.exporter = exporter
+        self.max_batch = max_batch
+        self.interval = interval
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._queue: "collections.deque[dict]" = collections.deque()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def on_end(self, span: Span) -> None:
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._queue.append(span.to_dict())
+        if self._thread is None:
+            self._start()
+        if len(self._queue) >= self.max_batch:
+            self._wakeup.set()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="span-exporter", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            while self._queue:
+                batch = []
+                while self._queue and len(batch) < self.max_batch:
+                    batch.append(self._queue.popleft())
+                try:
+                    self.exporter.export(batch)
+                except Exception as e:
+                    logger.warning(f"Failed to export {len(batch)} spans: {e}")
+
+
+# ── Tracer ─────────────────────────────────────
+class Tracer:
+    """Creates spans; a no-op until enabled with ``configure``."""
+
+    def __init__(self):
+        self.enabled = False
+        self.processor: Optional[BatchSpanProcessor] = None
+
+    def configure(self, config: Config) -> None:
+        """Enable tracing from the ``tracing`` config section."""
+        if not config.get("tracing", "enabled", False):
+            self.enabled = False
+            return
+        if config.get("tracing", "exporter", "jsonl") == "otlp":
+            exporter = OtlpExporter(
+                endpoint=config.get("tracing", "endpoint", DEFAULT_OTLP_ENDPOINT),
+                service_name=config.get("tracing", "service_name", "avbot"),
+            )
+        else:
+            exporter = JsonlExporter(config.get("tracing", "path", DEFAULT_TRACE_FILE))
+        self.processor = BatchSpanProcessor(
+            exporter, interval=float(config.get("tracing", "export_interval", 2.0))
+        )
+        self.enabled = True
+        install_log_context()
+        atexit.register(self.flush)
+
+    def span(self, name: str, **attributes):
+        if not self.enabled:
+            return _NOOP
+        return Span(self, name, attributes)
+
+    def traced(self, name: Optional[str] = None):
+        """Decorator running every call (sync or async) in a span."""
+
+        def decorator(func):
+            span_name = name or func.__qualname__
+            if asyncio.iscoroutinefunction(func):
+
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    with self.span(span_name):
+                        return await func(*args, **kwargs)
+
+            else:
+
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    with self.span(span_name):
+                        return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def _finish(self, span: Span) -> None:
+        if self.processor:
+            self.processor.on_end(span)
+
+    def flush(self) -> None:
+        if self.processor:
+            self.processor.flush()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current.get()
+    return span.trace_id if span else None
+
+
+_log_context_installed = False
+
+
+def install_log_context() -> None:
+    """Give every log record a ``trace_id`` attribute (``-`` outside traces)."""
+    global _log_context_installed
+    if _log_context_installed:
+        return
+    _log_context_installed = True
+    previous = logging.getLogRecordFactory()
+
+    def factory(*args, **kwargs):
+        record = previous(*args, **kwargs)
+        span = _current.get()
+        record.trace_id = span.trace_id if span else "-"
+        return record
+
+    logging.setLogRecordFactory(factory)
+
+
+# Process-wide tracer; configured from config at startup
+tracer = Tracer()
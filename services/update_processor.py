@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Dict, Optional
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+def update_owner(update: object) -> Any:
+    """User id of an update, or chat id when there is no user."""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user:
+        return update.effective_user.id
+    if update.effective_chat:
+        return update.effective_chat.id
+    return None
+
+
+class _WaitStats:
+    __slots__ = ("updates", "wait_total", "wait_max", "wait_last")
+
+    def __init__(self):
+        self.updates = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_last = 0.0
+
+    def add(self, waited: float) -> None:
+        self.updates += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        self.wait_last = waited
+
+    def to_dict(self) -> dict:
+        return {
+            "updates": self.updates,
+            "avg_wait": round(self.wait_total / self.updates, 3),
+            "max_wait": round(self.wait_max, 3),
+            "last_wait": round(self.wait_last, 3),
+        }
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates of different users concurrently, one user at a time.
+
+    At most ``max_concurrent_updates`` handlers run at once. Updates from
+    the same user (or chat, for updates without a user) are handled
+    strictly one after another in arrival order, so dialog history
+    appends never interleave. Updates waiting for their user do not take
+    a handler slot; up to ``max_pending_updates`` updates may be accepted
+    in total.
+
+    The time every update waited before its handler started is recorded
+    per user and reported by ``stats``.
+    """
+
+    def __init__(
+        self,
+        max_concurrent_updates: int = 16,
+        max_pending_updates: Optional[int] = None,
+        slow_wait: float = 10.0,
+        max_tracked_users: int = 1000,
+    ):
+        super().__init__(max_pending_updates or max_concurrent_updates * 16)
+        self.concurrency = max_concurrent_updates
+        self.slow_wait = slow_wait
+        self.max_tracked_users = max_tracked_users
+        self._running: Optional[asyncio.Semaphore] = None
+        self._locks: Dict[Any, asyncio.Lock] = {}
+        self._pending: Dict[Any, int] = {}
+        self._waits: "OrderedDict[Any, _WaitStats]" = OrderedDict()
+        self._active = 0
+
+    async def initialize(self) -> None:
+        self._running = asyncio.Semaphore(self.concurrency)
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_process_update(
+        self, update: object, coroutine: "Awaitable[Any]"
+    ) -> None:
+        if self._running is None:
+            await self.initialize()
+        key = update_owner(update)
+        queued_at = time.monotonic()
+        if key is None:
+            async with self._running:
+                await self._run(key, queued_at, coroutine)
+            return
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._pending[key] = self._pending.get(key, 0) + 1
+        try:
+            async with lock:
+                async with self._running:
+                    await self._run(key, queued_at, coroutine)
+        finally:
+            self._pending[key] -= 1
+            if not self._pending[key]:
+                del self._pending[key]
+                del self._locks[key]
+
+    async def _run(self, key, queued_at: float, coroutine: "Awaitable[Any]") -> None:
+        waited = time.monotonic() - queued_at
+        self._record_wait(key, waited)
+        if waited >= self.slow_wait:
+            logger.warning(f"Update for {key} waited {waited:.1f}s before handling")
+        self._active += 1
+        try:
+            await coroutine
+        finally:
+            self._active -= 1
+
+    def _record_wait(self, key, waited: float) -> None:
+        stats = self._waits.pop(key, None) or _WaitStats()
+        stats.add(waited)
+        self._waits[key] = stats
+        if len(self._waits) > self.max_tracked_users:
+            self._waits.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Handlers running, updates waiting and queue wait per recent user."""
+        return {
+            "running": self._active,
+            "waiting": self.current_concurrent_updates - self._active,
+            "users": {key: s.to_dict() for key, s in self._waits.items()},
+        }
@@ -1,18 +1,45 @@
 import os
 import logging
+from functools import lru_cache
+from typing import TYPE_CHECKING
 from services.dialog_service import DialogService
-from yandex_ai_studio_sdk import AIStudio
-from yandex_ai_studio_sdk.search_indexes import (
-    HybridSearchIndexType,
-    StaticIndexChunkingStrategy,
-    VectorSearchIndexType,
-    ReciprocalRankFusionIndexCombinationStrategy
-)
+from services.metrics import INDEX_LOOKUP_SECONDS
+
+if TYPE_CHECKING:
+    from yandex_ai_studio_sdk import AIStudio
 
 logger = logging.getLogger(__name__)
 
+
+@lru_cache(maxsize=None)
+def _sdk(folder_id: str, api_key: str, endpoint: str, verify: bool) -> "AIStudio":
+    # The SDK takes a noticeable time to import; only on first use
+    from yandex_ai_studio_sdk import AIStudio
+
+    kwargs = {}
+    if endpoint:
+        kwargs["endpoint"] = endpoint
+        # Plain-text gRPC for local endpoints
+        kwargs["verify"] = verify
+    return AIStudio(folder_id=folder_id, auth=api_key, **kwargs)
+
+
+def get_sdk(config) -> "AIStudio":
+    """Shared AI Studio SDK client, built on first use.
+
+    Reusing it keeps endpoint discovery and gRPC channels across requests;
+    ycloud.endpoint points it at another gRPC endpoint.
+    """
+    return _sdk(
+        config.getCloudFolder(),
+        config.getCloudKey(),
+        config.getCloud("endpoint"),
+        bool(config.getCloud("verify", True)),
+    )
+
+
 class YandexIndexService:
-    def __init__(self, sdk: AIStudio, folder_id: str, dialog_service: DialogService):
+    def __init__(self, sdk: "AIStudio", folder_id: str, dialog_service: DialogService):
         self.sdk = sdk
         self.folder_id = folder_id
         self.dialog_service = dialog_service
@@ -30,6 +57,13 @@ class YandexIndexService:
         # Если индекс не найден, создаём новый
         logger.info(f"Search index '{index_name}' not found. Creating new one...")
         
+        from yandex_ai_studio_sdk.search_indexes import (
+            HybridSearchIndexType,
+            StaticIndexChunkingStrategy,
+            VectorSearchIndexType,
+            ReciprocalRankFusionIndexCombinationStrategy
+        )
+
         # Prepare parameters for index creation
         create_params = {
             "name": index_name,
@@ -100,6 +134,7 @@ class YandexIndexService:
             index_id = self._get_or_create_index(index_name, files=[yc_file])
         
         return index_id
+    @INDEX_LOOKUP_SECONDS.timed()
     def get_index_by_name(self, index_name: str) :
         """
         Get or create index ID for a specific user
@@ -1,15 +1,17 @@
 import logging
 import json
 from services.tools_service import ToolService
+from services.calendar_store import CalendarEventStore
 from clients.yandexgpt import YandexGPClient, YandexGPTError
 from services.config_service import Config
+from services.tracing import tracer
 
 
 class YandexGPTService:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, event_store: CalendarEventStore = None):
         self.config = config
         self.client = YandexGPClient(config)
-        self.tools = ToolService(config)
+        self.tools = ToolService(config, event_store)
         self.logger = logging.getLogger(__name__)
 
     def _make_yandexgpt_request(
@@ -21,25 +23,31 @@ class YandexGPTService:
             if messages is None:
                 messages = [{"role": "user", "content": prompt}]
 
-            for _ in range(5):
-                response = self.client.request(messages, tools)
-                self.logger.info(f"Success: {response!r}.")
+            for iteration in range(5):
+                with tracer.span("gpt.iteration", iteration=iteration) as span:
+                    response = self.client.request(messages, tools)
+                    self.logger.info(f"Success: {response!r}.")
 
-                tool_calls = [
-                    item for item in response.output if item.type == "function_call"
-                ]
-                if not tool_calls:
-                    return response.output_text or ""
+                    tool_calls = [
+                        item
+                        for item in response.output
+                        if item.type == "function_call"
+                    ]
+                    if not tool_calls:
+                        return response.output_text or ""
 
-                tool_call = tool_calls[0]
-                tool_name = tool_call.name
-                args = json.loads(tool_call.arguments)
+                    tool_call = tool_calls[0]
+                    tool_name = tool_call.name
+                    args = json.loads(tool_call.arguments)
+                    span.set(tool=tool_name)
 
-                self.logger.info(
-                    f"Model wants to call tool: {tool_name} with args: {args}"
-                )
+                    self.logger.info(
+                        f"Model wants to call tool: {tool_name} with args: {args}"
+                    )
 
-                tool_result = self.tools.call_tool(tool_name, args, user_id=user_id)
+                    tool_result = self.tools.call_tool(
+                        tool_name, args, user_id=user_id
+                    )
 
                 for item in response.output:
                     if item.type == "function_call":
@@ -1,11 +1,14 @@
 
-from typing import Dict
+from typing import Dict, List
 from abc import ABC, abstractmethod
 
 DEFAULT_TOPIC = "default"
 
 class DialogStorage(ABC):
     """Абстрактный класс для хранения диалогов"""
+
+    # storage.archive.DialogArchive for messages beyond the hot window
+    archive = None
     
     @abstractmethod
     def load_dialog(self, user_id: int) -> Dict:
@@ -17,3 +20,36 @@ class DialogStorage(ABC):
         """Сохранить диалог пользователя"""
         pass
 
+    # Operations below work on the whole dialog by default; backends that
+    # store topics separately override them to touch only what they need.
+
+    def get_current_topic(self, user_id: int) -> str:
+        """Текущая тема пользователя"""
+        return self.load_dialog(user_id).get("current_topic", DEFAULT_TOPIC)
+
+    def append_message(self, user_id: int, message: Dict, topic_name: str = None):
+        """Добавить сообщение в тему (по умолчанию — в текущую)"""
+        dialog = self.load_dialog(user_id)
+        current_topic = topic_name or dialog.get("current_topic", DEFAULT_TOPIC)
+
+        if current_topic not in dialog["topics"]:
+            dialog["topics"][current_topic] = {"messages": []}
+
+        topic = dialog["topics"][current_topic]
+        topic["messages"].append(message)
+        if self.archive is not None:
+            self.archive.spill(user_id, current_topic, topic)
+        self.save_dialog(user_id, dialog)
+
+    def get_last_messages(self, user_id: int, count: int = 15, topic_name: str = None) -> List[Dict]:
+        """Последние сообщения темы; неизвестная тема — сообщения темы по умолчанию"""
+        dialog = self.load_dialog(user_id)
+        current_topic = topic_name or dialog.get("current_topic", DEFAULT_TOPIC)
+
+        if current_topic not in dialog["topics"]:
+            current_topic = DEFAULT_TOPIC
+            if current_topic not in dialog["topics"]:
+                dialog["topics"][current_topic] = {"messages": []}
+
+        messages = dialog["topics"][current_topic]["messages"]
+        return messages[-count:] if len(messages) > count else messages
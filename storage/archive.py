@@ -0,0 +1,271 @@
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+from storage.serializers import DialogSerializer, get_serializer
+from services.metrics import ARCHIVED_MESSAGES, STORAGE_SECONDS
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOT_MESSAGES = 200
+DEFAULT_SEGMENT_MESSAGES = 100
+DEFAULT_FORMAT = "msgpack+zstd"
+# Threads writing segments, shared by all users
+DEFAULT_WORKERS = 4
+# Topic field: how many of the topic's oldest messages are in the archive
+ARCHIVED = "archived"
+SEGMENT_SUFFIX = ".seg"
+
+
+class LocalArchiveStore:
+    """Archive objects as files under ``directory``; keys are relative
+    paths with ``/`` separators."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, *key.split("/"))
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_file, "wb") as f:
+                f.write(data)
+            os.replace(tmp_file, path)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def list(self, prefix: str = "") -> List[str]:
+        """Keys in the "directory" ``prefix`` (ends with ``/``), sorted."""
+        try:
+            names = os.listdir(self._path(prefix.rstrip("/")))
+        except FileNotFoundError:
+            return []
+        return sorted(prefix + name for name in names if not name.endswith(".tmp"))
+
+
+class DialogArchive:
+    """Keeps the last ``hot_messages`` of every topic in the dialog and
+    moves older ones to append-only segments in ``store``
+    (LocalArchiveStore or clients.s3client.S3Client).
+
+    Once a topic holds ``hot_messages + segment_messages`` messages, its
+    oldest ones are written as segment
+    ``<user_id>/<topic>/<offset>-<count>.seg`` (``count`` messages from
+    position ``offset`` of the topic's full history) by a background thread, so an append never waits for the store (e.g. S3).
+    The first append after the write succeeded trims those messages from
+    the dialog and adds them to the topic's ``archived`` count; until then
+    they stay in the dialog. If a trimmed dialog fails to save, the next
+    write starts at the same offset again, and readers ignore what lies
+    beyond ``archived``. Segments written from the same offset with
+    different counts (e.g. by two replicas) get different keys; a reader
+    follows the chain of segments that ends exactly at ``archived``.
+    Segments are read only by export and search.
+    """
+
+    def __init__(
+        self,
+        store,
+        hot_messages: int = DEFAULT_HOT_MESSAGES,
+        segment_messages: int = DEFAULT_SEGMENT_MESSAGES,
+        serializer: Optional[DialogSerializer] = None,
+        workers: int = DEFAULT_WORKERS,
+    ):
+        self.store = store
+        self.hot_messages = hot_messages
+        self.segment_messages = max(segment_messages, 1)
+        self.serializer = serializer or get_serializer(DEFAULT_FORMAT)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="dialog-archive"
+        )
+        # (user_id, topic) -> (offset, count, future) of segments being written
+        self._writes: Dict[Tuple[int, str], Tuple[int, int, Future]] = {}
+        self._lock = threading.Lock()
+
+    def _prefix(self, user_id: int, topic_name: str) -> str:
+        return f"{user_id}/{quote(topic_name, safe='')}/"
+
+    def _key(self, user_id: int, topic_name: str, offset: int, count: int) -> str:
+        return (
+            f"{self._prefix(user_id, topic_name)}{offset:012d}-{count}{SEGMENT_SUFFIX}"
+        )
+
+    def overflow(self, count: int) -> int:
+        """Oldest messages to archive from a topic of ``count`` messages."""
+        if count < self.hot_messages + self.segment_messages:
+            return 0
+        return count - self.hot_messages
+
+    def write_segment(
+        self, user_id: int, topic_name: str, offset: int, messages: List[Dict]
+    ) -> None:
+        key = self._key(user_id, topic_name, offset, len(messages))
+        with STORAGE_SECONDS.time(operation="archive"), tracer.span(
+            "storage.archive", user_id=user_id, messages=len(messages)
+        ):
+            self.store.put(key, self.serializer.dumps({"messages": messages}))
+        ARCHIVED_MESSAGES.inc(len(messages))
+
+    def submit(
+        self, user_id: int, topic_name: str, offset: int, messages: List[Dict]
+    ) -> None:
+        """Write a segment in the background, unless one is being written
+        for the topic already."""
+        key = (user_id, topic_name)
+        with self._lock:
+            if key in self._writes:
+                return
+            future = self._executor.submit(
+                self.write_segment, user_id, topic_name, offset, messages
+            )
+            self._writes[key] = (offset, len(messages), future)
+
+    def written(self, user_id: int, topic_name: str) -> Optional[Tuple[int, int]]:
+        """(offset, count) of the topic's segment once it has been written;
+        None while it is in progress, if there is none, or if it failed
+        (the messages are still in the dialog and submitted again)."""
+        key = (user_id, topic_name)
+        with self._lock:
+            write = self._writes.get(key)
+            if write is None or not write[2].done():
+                return None
+            del self._writes[key]
+        offset, count, future = write
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Failed to archive messages of user {user_id}: {error}")
+            return None
+        return offset, count
+
+    def pending(self, user_id: int, topic_name: str) -> bool:
+        with self._lock:
+            return (user_id, topic_name) in self._writes
+
+    def flush(self) -> None:
+        """Wait for the segments being written."""
+        with self._lock:
+            futures = [write[2] for write in self._writes.values()]
+        for future in futures:
+            future.exception()
+
+    def spill(self, user_id: int, topic_name: str, topic: Dict) -> int:
+        """Trim the messages of ``topic`` whose segment has been written and
+        start writing the next one when the topic is over its window.
+        Changes ``topic`` in place; returns how many messages were trimmed."""
+        messages = topic.get("messages") or []
+        offset = topic.get(ARCHIVED, 0)
+        written = self.written(user_id, topic_name)
+        if written is not None and written[0] == offset:
+            count = written[1]
+            topic["messages"] = messages = messages[count:]
+            topic[ARCHIVED] = offset = offset + count
+        else:
+            count = 0
+        cold = self.overflow(len(messages))
+        if cold and not self.pending(user_id, topic_name):
+            self.submit(user_id, topic_name, offset, messages[:cold])
+        return count
+
+    def segments(self, user_id: int, topic_name: str, topic: Dict) -> Iterator[List]:
+        """Archived messages of a topic, one list per segment, newest
+        segment first; segments are fetched as the iterator advances."""
+        end = topic.get(ARCHIVED, 0)
+        # End position -> start of the segment; segments not on the chain
+        # were written before a dialog save that failed
+        starts = {}
+        for key in self.store.list(self._prefix(user_id, topic_name)):
+            name = key.rsplit("/", 1)[-1]
+            if not name.endswith(SEGMENT_SUFFIX):
+                continue
+            offset, _, count = name[: -len(SEGMENT_SUFFIX)].partition("-")
+            if offset.isdigit() and count.isdigit():
+                starts[int(offset) + int(count)] = int(offset)
+        while end in starts:
+            offset = starts[end]
+            raw = self.store.get(self._key(user_id, topic_name, offset, end - offset))
+            if raw is None:
+                return
+            messages = self.serializer.loads(raw)["messages"]
+            if len(messages) != end - offset:
+                logger.error(
+                    f"Archive segment {offset} of user {user_id} holds "
+                    f"{len(messages)} messages instead of {end - offset}"
+                )
+                return
+            yield messages
+            end = offset
+
+    def export(self, user_id: int, dialog: Dict) -> Dict:
+        """The dialog with every topic's full history."""
+        with STORAGE_SECONDS.time(operation="export"), tracer.span(
+            "storage.export", user_id=user_id
+        ):
+            topics = {}
+            for name, topic in dialog["topics"].items():
+                messages = []
+                for segment in reversed(list(self.segments(user_id, name, topic))):
+                    messages.extend(segment)
+                messages.extend(topic.get("messages") or [])
+                fields = {k: v for k, v in topic.items() if k != ARCHIVED}
+                topics[name] = {**fields, "messages": messages}
+        return {**dialog, "topics": topics}
+
+
+def _matches(message: Dict, query: str) -> bool:
+    text = message.get("text")
+    return isinstance(text, str) and query in text.casefold()
+
+
+def search_dialog(
+    user_id: int,
+    dialog: Dict,
+    query: str,
+    topic_name: Optional[str] = None,
+    limit: int = 20,
+    archive: Optional[DialogArchive] = None,
+) -> List[Dict]:
+    """Messages containing ``query`` (case-insensitive), newest first per
+    topic, as ``{"topic": ..., "message": ...}``. Archive segments are
+    fetched only while fewer than ``limit`` matches have been found."""
+    query = query.casefold()
+    names = [topic_name] if topic_name else list(dialog["topics"])
+    found = []
+
+    def collect(name, messages):
+        for message in reversed(messages):
+            if _matches(message, query):
+                found.append({"topic": name, "message": message})
+                if len(found) >= limit:
+                    return True
+        return False
+
+    with STORAGE_SECONDS.time(operation="search"), tracer.span(
+        "storage.search", user_id=user_id
+    ):
+        for name in names:
+            topic = dialog["topics"].get(name)
+            if topic is None:
+                continue
+            if collect(name, topic.get("messages") or []):
+                return found
+            if archive is None:
+                continue
+            for segment in archive.segments(user_id, name, topic):
+                if collect(name, segment):
+                    return found
+    return found
@@ -0,0 +1,153 @@
+import os
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+from storage.abs_storage import DialogStorage
+from storage.archive import (
+    DEFAULT_FORMAT,
+    DEFAULT_SEGMENT_MESSAGES,
+    DialogArchive,
+    LocalArchiveStore,
+)
+from storage.file_storage import DIALOGS_DIR, FLAT, FileDialogStorage
+from storage.locks import (
+    DEFAULT_LEASE,
+    DEFAULT_LOCK_PREFIX,
+    DEFAULT_TIMEOUT,
+    DialogLocks,
+    FileLocks,
+    RedisLocks,
+)
+from storage.redis_storage import (
+    DEFAULT_MAX_MESSAGES,
+    DEFAULT_PREFIX,
+    DEFAULT_URL,
+    RedisDialogStorage,
+)
+from storage.serializers import get_serializer
+
+if TYPE_CHECKING:
+    import redis
+
+
+@lru_cache(maxsize=None)
+def _redis_client(url: str) -> "redis.Redis":
+    # One client (and connection pool) per server and process
+    import redis
+
+    return redis.Redis.from_url(url, decode_responses=True)
+
+
+@lru_cache(maxsize=None)
+def _redis_storage(url, prefix, max_messages, ttl, archive) -> RedisDialogStorage:
+    return RedisDialogStorage(
+        _redis_client(url),
+        prefix=prefix,
+        max_messages=max_messages,
+        ttl=ttl,
+        archive=archive,
+    )
+
+
+def _dialogs_dir(config) -> str:
+    return config.get("storage", "dialogs_dir") or os.environ.get(
+        "DIALOGS_PATH", DIALOGS_DIR
+    )
+
+
+@lru_cache(maxsize=None)
+def _archive(hot_messages, segment_messages, spec, backend, location, s3):
+    if backend == "s3":
+        from clients.s3client import S3Client
+
+        store = S3Client(location, **dict(s3))
+    elif backend == "local":
+        store = LocalArchiveStore(location)
+    else:
+        raise ValueError(f"Unknown dialog archive backend: {backend}")
+    return DialogArchive(store, hot_messages, segment_messages, get_serializer(spec))
+
+
+def get_archive(config) -> Optional[DialogArchive]:
+    """Archive for messages beyond ``storage.archive.hot_messages`` per
+    topic (None when unset): files under ``directory`` (``local``) or
+    objects in an S3-compatible ``bucket`` (``s3``)."""
+    settings = config.get("storage", "archive", {}) or {}
+    hot_messages = int(settings.get("hot_messages") or 0)
+    if not hot_messages:
+        return None
+    backend = settings.get("backend", "local")
+    s3 = settings.get("s3", {}) or {}
+    if backend == "s3":
+        location = s3.get("bucket")
+        options = tuple(
+            sorted((k, v) for k, v in s3.items() if k != "bucket" and v is not None)
+        )
+    else:
+        location = settings.get("directory") or os.path.join(
+            _dialogs_dir(config), "archive"
+        )
+        options = ()
+    return _archive(
+        hot_messages,
+        int(settings.get("segment_messages", DEFAULT_SEGMENT_MESSAGES)),
+        settings.get("format", DEFAULT_FORMAT),
+        backend,
+        location,
+        options,
+    )
+
+
+def get_storage(config) -> DialogStorage:
+    """Dialog storage selected by ``storage.backend`` in the config."""
+    backend = config.get("storage", "backend", "file")
+    if backend == "redis":
+        settings = config.get("storage", "redis", {}) or {}
+        return _redis_storage(
+            settings.get("url", DEFAULT_URL),
+            settings.get("prefix", DEFAULT_PREFIX),
+            settings.get("max_messages", DEFAULT_MAX_MESSAGES),
+            settings.get("ttl"),
+            get_archive(config),
+        )
+    if backend != "file":
+        raise ValueError(f"Unknown dialog storage backend: {backend}")
+    return FileDialogStorage(
+        _dialogs_dir(config),
+        config.get("storage", "layout", FLAT),
+        get_serializer(config.get("storage", "format", "json")),
+        get_archive(config),
+    )
+
+
+@lru_cache(maxsize=None)
+def _locks(backend, timeout, directory, url, prefix, lease) -> DialogLocks:
+    if backend == "file":
+        return DialogLocks(FileLocks(directory), timeout)
+    if backend == "redis":
+        return DialogLocks(RedisLocks(_redis_client(url), prefix, lease), timeout)
+    if backend != "local":
+        raise ValueError(f"Unknown dialog lock backend: {backend}")
+    return DialogLocks(timeout=timeout)
+
+
+def get_locks(config) -> DialogLocks:
+    """Per-user dialog locks selected by ``storage.locks.backend``:
+    ``local`` (one process), ``file`` (processes sharing the dialogs
+    volume) or ``redis`` (any number of replicas).
+
+    Unset, it is ``redis`` for the Redis storage with an archive (replicas
+    must not archive the same messages at once) and ``local`` otherwise."""
+    settings = config.get("storage", "locks", {}) or {}
+    redis_settings = config.get("storage", "redis", {}) or {}
+    backend = settings.get("backend")
+    if not backend:
+        shared = config.get("storage", "backend", "file") == "redis"
+        backend = "redis" if shared and get_archive(config) else "local"
+    return _locks(
+        backend,
+        float(settings.get("timeout", DEFAULT_TIMEOUT)),
+        settings.get("directory") or os.path.join(_dialogs_dir(config), ".locks"),
+        settings.get("url") or redis_settings.get("url", DEFAULT_URL),
+        settings.get("prefix", DEFAULT_LOCK_PREFIX),
+        float(settings.get("lease", DEFAULT_LEASE)),
+    )
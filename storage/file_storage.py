@@ -1,31 +1,79 @@
 import os
-import json
-from typing import Dict
+import hashlib
+import threading
+from typing import Dict, Optional
 from storage.abs_storage import DialogStorage, DEFAULT_TOPIC
+from storage.archive import DialogArchive
+from storage.serializers import DialogSerializer
+from services.metrics import STORAGE_BYTES, STORAGE_SECONDS
+from services.tracing import tracer
 import logging
 
 logger = logging.getLogger(__name__)
 
 DIALOGS_DIR = "dialogs"
 
+# dialogs/<user_id>.json
+FLAT = "flat"
+# dialogs/ab/cd/<user_id>.json, ab/cd from the md5 of the user id
+SHARDED = "sharded"
+LAYOUTS = (FLAT, SHARDED)
+
+def shard_path(user_id: int) -> str:
+    """Path of a dialog in the sharded layout, relative to the dialogs dir"""
+    digest = hashlib.md5(str(user_id).encode("utf-8")).hexdigest()
+    return os.path.join(digest[:2], digest[2:4], f"{user_id}.json")
+
 class FileDialogStorage(DialogStorage):
-    """Реализация хранения диалогов в файлах"""
+    """Реализация хранения диалогов в файлах
+
+    Dialogs are written in ``layout``; a dialog not found there is read
+    from the other layout, so files can be moved (see storage.migrate)
+    while the bot runs. Saving a dialog removes its copy in the other layout.
+    Files are written with ``serializer`` (compact JSON by default) and
+    read in whatever format they were written; the .json name is kept.
+    With ``archive`` only the recent messages of each topic stay in the file.
+    """
     
-    def __init__(self, dialogs_dir: str = DIALOGS_DIR):
+    def __init__(self, dialogs_dir: str = DIALOGS_DIR, layout: str = FLAT,
+                 serializer: DialogSerializer = None, archive: DialogArchive = None):
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown dialog layout: {layout}")
         self.dialogs_dir = dialogs_dir
+        self.layout = layout
+        self.serializer = serializer or DialogSerializer()
+        self.archive = archive
+        self._shards = set()
         self.ensure_dialogs_dir()
     
     def ensure_dialogs_dir(self):
         if not os.path.exists(self.dialogs_dir):
             os.makedirs(self.dialogs_dir)
     
-    def get_user_dialog_file(self, user_id: int) -> str:
+    def get_user_dialog_file(self, user_id: int, layout: str = None) -> str:
+        """Путь к файлу диалога (в layout хранилища по умолчанию)"""
+        if (layout or self.layout) == SHARDED:
+            return os.path.join(self.dialogs_dir, shard_path(user_id))
         return os.path.join(self.dialogs_dir, f"{user_id}.json")
     
+    def get_legacy_dialog_file(self, user_id: int) -> str:
+        """Путь к файлу диалога в другом layout"""
+        return self.get_user_dialog_file(user_id, FLAT if self.layout == SHARDED else SHARDED)
+    
+    def _read_dialog_file(self, user_id: int) -> Optional[bytes]:
+        dialog_file = self.get_user_dialog_file(user_id)
+        # Our layout is looked at again after the other one, so a file the
+        # migrator moves in between is still found
+        for path in (dialog_file, self.get_legacy_dialog_file(user_id), dialog_file):
+            try:
+                with open(path, 'rb') as f:
+                    return f.read()
+            except FileNotFoundError:
+                continue
+        return None
+    
     def load_dialog(self, user_id: int) -> Dict:
         """Загрузить диалог пользователя из файла"""
-        dialog_file = self.get_user_dialog_file(user_id)
-        
         default_structure = {
             "current_topic": DEFAULT_TOPIC,
             "topics": {
@@ -35,12 +83,16 @@ class FileDialogStorage(DialogStorage):
             }
         }
         
-        if not os.path.exists(dialog_file):
-            return default_structure
-        
         try:
-            with open(dialog_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with STORAGE_SECONDS.time(operation="load"), tracer.span(
+                "storage.load", user_id=user_id
+            ) as span:
+                raw = self._read_dialog_file(user_id)
+                if raw is None:
+                    return default_structure
+                data = self.serializer.loads(raw)
+                span.set(bytes=len(raw))
+            STORAGE_BYTES.observe(len(raw), operation="load")
             
             # Преобразуем старую структуру (список сообщений) в новую
             for topic_name, content in list(data.get("topics", {}).items()):
@@ -69,8 +121,32 @@ class FileDialogStorage(DialogStorage):
         """Сохранить диалог пользователя в файл"""
         dialog_file = self.get_user_dialog_file(user_id)
         try:
-            with open(dialog_file, 'w', encoding='utf-8') as f:
-                json.dump(dialog_data, f, ensure_ascii=False, indent=2)
+            with STORAGE_SECONDS.time(operation="save"), tracer.span(
+                "storage.save", user_id=user_id
+            ) as span:
+                raw = self.serializer.dumps(dialog_data)
+                shard = os.path.dirname(dialog_file)
+                if shard not in self._shards:
+                    os.makedirs(shard, exist_ok=True)
+                    self._shards.add(shard)
+                # Write next to the dialog and rename over it: readers and
+                # crashes see the old file or the new one, never a partial one
+                tmp_file = f"{dialog_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+                try:
+                    with open(tmp_file, 'wb') as f:
+                        f.write(raw)
+                    os.replace(tmp_file, dialog_file)
+                except BaseException:
+                    if os.path.exists(tmp_file):
+                        os.remove(tmp_file)
+                    raise
+                # The copy in the other layout is now stale
+                try:
+                    os.remove(self.get_legacy_dialog_file(user_id))
+                except FileNotFoundError:
+                    pass
+                span.set(bytes=len(raw))
+            STORAGE_BYTES.observe(len(raw), operation="save")
         except Exception as e:
             logger.error(f"Error saving dialog for user {user_id}: {str(e)}")
 
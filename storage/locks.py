@@ -0,0 +1,162 @@
+import logging
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import TYPE_CHECKING, Optional
+from services.metrics import DIALOG_LOCK_TIMEOUTS, DIALOG_LOCK_WAIT_SECONDS
+
+if TYPE_CHECKING:
+    import redis
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STRIPES = 64
+# Seconds to wait for a lock before giving up
+DEFAULT_TIMEOUT = 5.0
+# Seconds a Redis lock outlives a holder that crashed without releasing it
+DEFAULT_LEASE = 30.0
+DEFAULT_LOCK_PREFIX = "avbot:lock"
+
+
+class DialogLockTimeout(TimeoutError):
+    """A user's dialog lock was not acquired in time."""
+
+
+class StripedLocks:
+    """In-process locks: user ids are spread over ``stripes`` RLocks."""
+
+    def __init__(self, stripes: int = DEFAULT_STRIPES):
+        self._locks = [threading.RLock() for _ in range(stripes)]
+
+    @contextmanager
+    def hold(self, user_id: int, timeout: float):
+        lock = self._locks[hash(user_id) % len(self._locks)]
+        if not lock.acquire(timeout=timeout):
+            raise DialogLockTimeout(f"Dialog of user {user_id} is locked")
+        try:
+            yield
+        finally:
+            lock.release()
+
+
+class FileLocks:
+    """``flock`` on ``<directory>/<user_id>.lock``: processes sharing a
+    host or a volume. Closing the file releases the lock, also when the
+    process dies."""
+
+    def __init__(self, directory: str, poll_interval: float = 0.005):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def hold(self, user_id: int, timeout: float):
+        import fcntl
+
+        fd = os.open(
+            os.path.join(self.directory, f"{user_id}.lock"), os.O_RDWR | os.O_CREAT
+        )
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise DialogLockTimeout(f"Dialog of user {user_id} is locked")
+                    time.sleep(self.poll_interval)
+            yield
+        finally:
+            os.close(fd)
+
+
+class RedisLocks:
+    """Redis locks (``SET NX PX`` with a token) shared by all replicas.
+
+    A lock expires after ``lease`` seconds, so a crashed replica blocks the
+    user for at most that long.
+    """
+
+    def __init__(
+        self,
+        client: "redis.Redis",
+        prefix: str = DEFAULT_LOCK_PREFIX,
+        lease: float = DEFAULT_LEASE,
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.lease = lease
+
+    @contextmanager
+    def hold(self, user_id: int, timeout: float):
+        from redis.exceptions import LockError
+
+        # Same hash tag as the dialog keys: one Redis Cluster slot per user
+        lock = self.client.lock(
+            f"{self.prefix}:{{{user_id}}}",
+            timeout=self.lease,
+            blocking_timeout=timeout,
+            thread_local=False,
+        )
+        if not lock.acquire():
+            raise DialogLockTimeout(f"Dialog of user {user_id} is locked")
+        try:
+            yield
+        finally:
+            try:
+                lock.release()
+            except LockError as e:
+                logger.warning(f"Dialog lock of user {user_id} expired: {e}")
+
+
+# Process-wide stripes; every DialogLocks of the process shares them
+local_locks = StripedLocks()
+
+
+class DialogLocks:
+    """Per-user lock around a dialog read-modify-write.
+
+    The in-process striped lock orders the threads of this process;
+    ``remote`` (FileLocks or RedisLocks) then orders processes and
+    replicas. Locks are reentrant per thread. Waits are recorded in
+    ``avbot_dialog_lock_wait_seconds`` by kind (local/remote).
+    """
+
+    def __init__(
+        self,
+        remote=None,
+        timeout: float = DEFAULT_TIMEOUT,
+        local: Optional[StripedLocks] = None,
+    ):
+        self.local = local or local_locks
+        self.remote = remote
+        self.timeout = timeout
+        self._held = threading.local()
+
+    @contextmanager
+    def lock(self, user_id: int):
+        held = self._held.__dict__.setdefault("users", set())
+        if user_id in held:
+            yield
+            return
+        with ExitStack() as stack:
+            self._acquire(stack, "local", self.local, user_id)
+            if self.remote is not None:
+                self._acquire(stack, "remote", self.remote, user_id)
+            held.add(user_id)
+            try:
+                yield
+            finally:
+                held.discard(user_id)
+
+    def _acquire(self, stack: ExitStack, kind: str, backend, user_id: int) -> None:
+        started = time.perf_counter()
+        try:
+            stack.enter_context(backend.hold(user_id, self.timeout))
+        except DialogLockTimeout:
+            DIALOG_LOCK_TIMEOUTS.inc(kind=kind)
+            raise
+        finally:
+            DIALOG_LOCK_WAIT_SECONDS.observe(time.perf_counter() - started, kind=kind)
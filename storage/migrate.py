@@ -0,0 +1,259 @@
+import argparse
+import asyncio
+import logging
+import os
+import re
+import sys
+import time
+from typing import Callable, Iterator, List, Optional, Tuple
+from storage.file_storage import (
+    DIALOGS_DIR,
+    FLAT,
+    LAYOUTS,
+    SHARDED,
+    FileDialogStorage,
+)
+from storage.locks import DialogLocks
+from storage.serializers import DialogSerializer, detect, get_serializer
+
+logger = logging.getLogger(__name__)
+
+_DIALOG_FILE = re.compile(r"^(-?\d+)\.json$")
+_SHARD_DIR = re.compile(r"^[0-9a-f]{2}$")
+
+
+def _flat_files(root: str) -> Iterator[Tuple[int, str]]:
+    with os.scandir(root) as entries:
+        for entry in entries:
+            match = _DIALOG_FILE.match(entry.name)
+            if match and entry.is_file():
+                yield int(match.group(1)), entry.path
+
+
+def _sharded_files(root: str) -> Iterator[Tuple[int, str]]:
+    for first in sorted(os.listdir(root)):
+        if not _SHARD_DIR.match(first) or not os.path.isdir(os.path.join(root, first)):
+            continue
+        for second in sorted(os.listdir(os.path.join(root, first))):
+            shard = os.path.join(root, first, second)
+            if not _SHARD_DIR.match(second) or not os.path.isdir(shard):
+                continue
+            for name in os.listdir(shard):
+                match = _DIALOG_FILE.match(name)
+                if match:
+                    yield int(match.group(1)), os.path.join(shard, name)
+
+
+def dialog_files(root: str, layout: str) -> Iterator[Tuple[int, str]]:
+    """(user id, path) of every dialog file in ``layout`` under ``root``."""
+    return _sharded_files(root) if layout == SHARDED else _flat_files(root)
+
+
+class DialogMigrator:
+    """Moves dialog files into the storage's layout, ``batch_size`` at a time.
+
+    A file is hard-linked to its new path and then unlinked from the old
+    one, so a reader always finds it under one of the two paths and a
+    dialog the bot saved in the meantime is never overwritten (the link
+    fails and the stale copy is dropped). Safe to run next to the bot,
+    also from another process.
+    """
+
+    def __init__(
+        self, storage: FileDialogStorage, batch_size: int = 500, interval: float = 1.0
+    ):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.interval = interval
+        self.moved = 0
+        # Paths that failed to move; skipped until the next run
+        self.failed = set()
+
+    def pending(self) -> Iterator[Tuple[int, str]]:
+        """(user id, path) of dialogs still in the other layout."""
+        other = FLAT if self.storage.layout == SHARDED else SHARDED
+        return dialog_files(self.storage.dialogs_dir, other)
+
+    def move(self, user_id: int, source: str) -> bool:
+        """Move one dialog; False when a newer copy already existed."""
+        target = self.storage.get_user_dialog_file(user_id)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(source, target)
+            moved = True
+        except FileExistsError:
+            # Saved in the new layout since: the old copy is stale
+            moved = False
+        except FileNotFoundError:
+            return False
+        try:
+            os.remove(source)
+        except FileNotFoundError:
+            pass
+        return moved
+
+    def migrate_batch(self) -> int:
+        """Move up to ``batch_size`` dialogs; returns how many were handled."""
+        handled = 0
+        for user_id, source in self.pending():
+            if handled >= self.batch_size:
+                break
+            if source in self.failed:
+                continue
+            try:
+                if self.move(user_id, source):
+                    self.moved += 1
+            except OSError as e:
+                logger.error(f"Failed to migrate dialog of user {user_id}: {e}")
+                self.failed.add(source)
+                continue
+            handled += 1
+        return handled
+
+    def migrate_all(self) -> int:
+        while self.migrate_batch():
+            pass
+        return self.moved
+
+    async def run(self) -> None:
+        """Migrate in the background, one batch per ``interval`` seconds."""
+        while await asyncio.to_thread(self.migrate_batch):
+            logger.info(f"Dialog migration: {self.moved} moved")
+            await asyncio.sleep(self.interval)
+        if self.moved:
+            logger.info(
+                f"Dialog migration to {self.storage.layout} layout done "
+                f"({self.moved} moved)"
+            )
+
+
+class DialogCompactor:
+    """Rewrites dialogs not saved for ``cold_after`` seconds with
+    ``serializer`` (e.g. msgpack+zstd). A cold dialog goes back to the
+    storage's own format on its next save.
+
+    ``locks`` only keep out savers in the same lock domain: with the
+    default in-process locks the compactor must run in the process that
+    saves the dialogs, and ``owns(user_id)`` limits it to that process's
+    users (e.g. one bot worker's share). A file that changed since it was
+    read is left alone rather than replaced with the stale copy.
+    """
+
+    def __init__(
+        self,
+        storage: FileDialogStorage,
+        serializer: DialogSerializer,
+        cold_after: float,
+        locks: Optional[DialogLocks] = None,
+        interval: float = 3600.0,
+        owns: Optional[Callable[[int], bool]] = None,
+    ):
+        self.storage = storage
+        self.serializer = serializer
+        self.cold_after = cold_after
+        self.locks = locks or DialogLocks()
+        self.interval = interval
+        self.owns = owns
+        self.saved_bytes = 0
+
+    @staticmethod
+    def _version(stat: os.stat_result) -> Tuple[int, int, int]:
+        # Saves replace the file, so a new save changes at least the inode
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def compact_file(self, user_id: int, path: str, now: float) -> bool:
+        """Rewrite one dialog if it is cold and not in the cold format yet."""
+        with self.locks.lock(user_id):
+            try:
+                if now - os.stat(path).st_mtime < self.cold_after:
+                    return False
+                with open(path, "rb") as f:
+                    raw = f.read()
+                    version = self._version(os.fstat(f.fileno()))
+            except FileNotFoundError:
+                return False
+            if detect(raw) == self.serializer.format:
+                return False
+            packed = self.serializer.dumps(self.storage.serializer.loads(raw))
+            tmp_file = f"{path}.{os.getpid()}.compact.tmp"
+            try:
+                with open(tmp_file, "wb") as f:
+                    f.write(packed)
+                try:
+                    current = self._version(os.stat(path))
+                except FileNotFoundError:
+                    current = None
+                if current != version:
+                    # Saved by a process outside our lock domain meanwhile
+                    os.remove(tmp_file)
+                    return False
+                os.replace(tmp_file, path)
+            except BaseException:
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+                raise
+        self.saved_bytes += len(raw) - len(packed)
+        return True
+
+    def compact_all(self) -> int:
+        """Rewrite every cold dialog; returns how many were rewritten."""
+        compacted = 0
+        now = time.time()
+        for user_id, path in dialog_files(
+            self.storage.dialogs_dir, self.storage.layout
+        ):
+            if self.owns is not None and not self.owns(user_id):
+                continue
+            try:
+                compacted += self.compact_file(user_id, path, now)
+            except Exception as e:
+                logger.error(f"Failed to compact dialog of user {user_id}: {e}")
+        return compacted
+
+    async def run(self) -> None:
+        """Compact cold dialogs every ``interval`` seconds."""
+        while True:
+            compacted = await asyncio.to_thread(self.compact_all)
+            if compacted:
+                logger.info(
+                    f"Compacted {compacted} cold dialogs to "
+                    f"{self.serializer.name} ({self.saved_bytes} bytes saved)"
+                )
+            await asyncio.sleep(self.interval)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m storage.migrate",
+        description="Move dialog files into the flat or sharded layout",
+    )
+    parser.add_argument("layout", choices=LAYOUTS)
+    parser.add_argument("--dialogs-dir", default=DIALOGS_DIR)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument(
+        "--compact",
+        metavar="FORMAT",
+        help="also rewrite idle dialogs, e.g. msgpack+zstd",
+    )
+    parser.add_argument(
+        "--idle-days", type=float, default=30, help="with --compact (default: 30)"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    storage = FileDialogStorage(args.dialogs_dir, args.layout)
+    migrator = DialogMigrator(storage, args.batch_size)
+    print(f"{migrator.migrate_all()} dialogs moved to the {args.layout} layout")
+    if args.compact:
+        compactor = DialogCompactor(
+            storage, get_serializer(args.compact), args.idle_days * 86400
+        )
+        print(
+            f"{compactor.compact_all()} dialogs compacted to {args.compact} "
+            f"({compactor.saved_bytes} bytes saved)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
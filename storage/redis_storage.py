@@ -0,0 +1,241 @@
+import json
+import logging
+from typing import TYPE_CHECKING, Dict, List, Optional
+from storage.abs_storage import DEFAULT_TOPIC, DialogStorage
+from storage.archive import ARCHIVED, DialogArchive
+from services.metrics import STORAGE_SECONDS
+from services.tracing import tracer
+
+if TYPE_CHECKING:
+    import redis
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_URL = "redis://localhost:6379/0"
+DEFAULT_PREFIX = "avbot:dialog"
+# Messages kept per topic; older ones are trimmed on append
+DEFAULT_MAX_MESSAGES = 1000
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+class RedisDialogStorage(DialogStorage):
+    """Dialogs in Redis, shared by every bot replica.
+
+    Per user (``{user_id}`` is a hash tag, so all keys of one user live in
+    the same Redis Cluster slot):
+
+    * ``<prefix>:{<user_id>}:meta`` — hash with ``current_topic``;
+    * ``<prefix>:{<user_id>}:topics`` — hash topic name → JSON of the
+      topic's fields except messages (e.g. ``index_id``);
+    * ``<prefix>:{<user_id>}:messages:<topic>`` — list of JSON messages,
+      capped at ``max_messages``.
+
+    ``get_last_messages`` is an ``LRANGE`` of the topic list and
+    ``append_message`` an ``RPUSH`` + ``LTRIM``; multi-key updates go in one
+    pipeline. With ``ttl`` (seconds) a user's keys expire together after
+    that long without writes: every write refreshes all of them, so an
+    active topic does not keep a dialog whose other topics are gone. With ``archive``, messages beyond its hot window
+    are moved to the archive on append (keep ``max_messages`` above
+    ``hot_messages + segment_messages``, or they are trimmed first).
+    """
+
+    def __init__(
+        self,
+        client: Optional["redis.Redis"] = None,
+        url: str = DEFAULT_URL,
+        prefix: str = DEFAULT_PREFIX,
+        max_messages: Optional[int] = DEFAULT_MAX_MESSAGES,
+        ttl: Optional[int] = None,
+        archive: Optional[DialogArchive] = None,
+    ):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url, decode_responses=True)
+        # Responses must be str (decode_responses=True)
+        self.client = client
+        self.prefix = prefix
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self.archive = archive
+
+    # ── Keys ───────────────────────────────────────
+    def _key(self, user_id: int, name: str) -> str:
+        return f"{self.prefix}:{{{user_id}}}:{name}"
+
+    def _messages_key(self, user_id: int, topic_name: str) -> str:
+        return self._key(user_id, f"messages:{topic_name}")
+
+    def _expire(self, pipe, *keys: str) -> None:
+        if self.ttl:
+            for key in keys:
+                pipe.expire(key, self.ttl)
+
+    # ── Whole dialog ───────────────────────────────
+    def load_dialog(self, user_id: int) -> Dict:
+        """Загрузить диалог пользователя из Redis
+
+        Read errors are raised: an empty dialog returned instead would be
+        saved back over the user's history by the next topic change.
+        """
+        try:
+            with STORAGE_SECONDS.time(operation="load"), tracer.span(
+                "storage.load", user_id=user_id, backend="redis"
+            ):
+                pipe = self.client.pipeline(transaction=False)
+                pipe.hget(self._key(user_id, "meta"), "current_topic")
+                pipe.hgetall(self._key(user_id, "topics"))
+                current_topic, topics = pipe.execute()
+
+                pipe = self.client.pipeline(transaction=False)
+                for name in topics:
+                    pipe.lrange(self._messages_key(user_id, name), 0, -1)
+                messages = pipe.execute() if topics else []
+        except Exception as e:
+            logger.error(f"Error loading dialog for user {user_id}: {str(e)}")
+            raise
+
+        dialog = {"current_topic": current_topic or DEFAULT_TOPIC, "topics": {}}
+        for (name, fields), raw in zip(topics.items(), messages):
+            topic = json.loads(fields or "{}")
+            topic["messages"] = [json.loads(m) for m in raw]
+            dialog["topics"][name] = topic
+        for name in (dialog["current_topic"], DEFAULT_TOPIC):
+            dialog["topics"].setdefault(name, {"messages": []})
+        return dialog
+
+    def save_dialog(self, user_id: int, dialog_data: Dict):
+        """Сохранить диалог пользователя в Redis"""
+        meta_key = self._key(user_id, "meta")
+        topics_key = self._key(user_id, "topics")
+
+        def replace(pipe):
+            # Lists of topics that are gone must be dropped with the rest
+            stale = [self._messages_key(user_id, n) for n in pipe.hkeys(topics_key)]
+            pipe.multi()
+            pipe.delete(meta_key, topics_key, *stale)
+            pipe.hset(
+                meta_key,
+                "current_topic",
+                dialog_data.get("current_topic", DEFAULT_TOPIC),
+            )
+            keys = [meta_key, topics_key]
+            for name, topic in dialog_data.get("topics", {}).items():
+                fields = {k: v for k, v in topic.items() if k != "messages"}
+                pipe.hset(topics_key, name, _dumps(fields))
+                messages = topic.get("messages") or []
+                if self.max_messages:
+                    messages = messages[-self.max_messages :]
+                if messages:
+                    key = self._messages_key(user_id, name)
+                    pipe.rpush(key, *[_dumps(m) for m in messages])
+                    keys.append(key)
+            self._expire(pipe, *keys)
+
+        try:
+            with STORAGE_SECONDS.time(operation="save"), tracer.span(
+                "storage.save", user_id=user_id, backend="redis"
+            ):
+                self.client.transaction(replace, topics_key)
+        except Exception as e:
+            logger.error(f"Error saving dialog for user {user_id}: {str(e)}")
+
+    # ── Single topic ───────────────────────────────
+    def get_current_topic(self, user_id: int) -> str:
+        """Текущая тема пользователя"""
+        try:
+            current_topic = self.client.hget(
+                self._key(user_id, "meta"), "current_topic"
+            )
+        except Exception as e:
+            logger.error(f"Error loading topic for user {user_id}: {str(e)}")
+            current_topic = None
+        return current_topic or DEFAULT_TOPIC
+
+    def append_message(self, user_id: int, message: Dict, topic_name: str = None):
+        """Добавить сообщение в тему: RPUSH + LTRIM в одном pipeline"""
+        try:
+            with STORAGE_SECONDS.time(operation="append"), tracer.span(
+                "storage.append", user_id=user_id, backend="redis"
+            ):
+                topic_name = topic_name or self.get_current_topic(user_id)
+                meta_key = self._key(user_id, "meta")
+                topics_key = self._key(user_id, "topics")
+                key = self._messages_key(user_id, topic_name)
+                keys = [meta_key, topics_key, key]
+                if self.ttl:
+                    keys += [
+                        self._messages_key(user_id, name)
+                        for name in self.client.hkeys(topics_key)
+                        if name != topic_name
+                    ]
+
+                pipe = self.client.pipeline(transaction=True)
+                pipe.rpush(key, _dumps(message))
+                if self.max_messages:
+                    pipe.ltrim(key, -self.max_messages, -1)
+                pipe.hsetnx(topics_key, topic_name, "{}")
+                pipe.hsetnx(meta_key, "current_topic", DEFAULT_TOPIC)
+                self._expire(pipe, *keys)
+                count = pipe.execute()[0]
+        except Exception as e:
+            logger.error(f"Error saving message for user {user_id}: {str(e)}")
+            return
+        if self.archive is not None:
+            self._spill(user_id, topic_name, count)
+
+    def _spill(self, user_id: int, topic_name: str, count: int) -> None:
+        """Trim messages whose archive segment has been written, and start
+        writing the next segment when the topic is over the hot window
+        (see DialogArchive). Runs under the user's dialog lock, like every
+        append."""
+        written = self.archive.written(user_id, topic_name)
+        cold = self.archive.overflow(count)
+        if written is None and (not cold or self.archive.pending(user_id, topic_name)):
+            return
+        topics_key = self._key(user_id, "topics")
+        key = self._messages_key(user_id, topic_name)
+        try:
+            fields = json.loads(self.client.hget(topics_key, topic_name) or "{}")
+            offset = fields.get(ARCHIVED, 0)
+            if written is not None and written[0] == offset:
+                fields[ARCHIVED] = offset = offset + written[1]
+                pipe = self.client.pipeline(transaction=True)
+                pipe.ltrim(key, written[1], -1)
+                pipe.hset(topics_key, topic_name, _dumps(fields))
+                pipe.execute()
+                cold = self.archive.overflow(count - written[1])
+            if cold and not self.archive.pending(user_id, topic_name):
+                raw = self.client.lrange(key, 0, cold - 1)
+                self.archive.submit(
+                    user_id, topic_name, offset, [json.loads(m) for m in raw]
+                )
+        except Exception as e:
+            logger.error(f"Failed to archive messages of user {user_id}: {e}")
+
+    def get_last_messages(
+        self, user_id: int, count: int = 15, topic_name: str = None
+    ) -> List[Dict]:
+        """Последние ``count`` сообщений темы одним LRANGE"""
+        try:
+            with STORAGE_SECONDS.time(operation="last"), tracer.span(
+                "storage.last", user_id=user_id, backend="redis"
+            ):
+                topic_name = topic_name or self.get_current_topic(user_id)
+                start = -count if count > 0 else 0
+                pipe = self.client.pipeline(transaction=False)
+                pipe.hexists(self._key(user_id, "topics"), topic_name)
+                pipe.lrange(self._messages_key(user_id, topic_name), start, -1)
+                if topic_name != DEFAULT_TOPIC:
+                    pipe.lrange(self._messages_key(user_id, DEFAULT_TOPIC), start, -1)
+                exists, raw, *default = pipe.execute()
+        except Exception as e:
+            logger.error(f"Error loading messages for user {user_id}: {str(e)}")
+            return []
+        # Unknown topics fall back to the default one, as in load_dialog
+        if not exists and default:
+            raw = default[0]
+        return [json.loads(m) for m in raw]
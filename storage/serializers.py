@@ -0,0 +1,157 @@
+import gzip
+import json
+from typing import Dict, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - plain json fallback
+    orjson = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+UTF8_BOM = b"\xef\xbb\xbf"
+# A dialog is a map: msgpack fixmap (0x80-0x8f), map16 (0xde) or map32 (0xdf)
+_MSGPACK_MAP = frozenset(range(0x80, 0x90)) | {0xDE, 0xDF}
+
+
+class JsonCodec:
+    """UTF-8 JSON; compact (orjson when installed) unless ``pretty``."""
+
+    kind = "json"
+
+    def __init__(self, pretty: bool = False):
+        self.pretty = pretty
+        self.name = "json-pretty" if pretty else "json"
+
+    def dumps(self, data: Dict) -> bytes:
+        if self.pretty:
+            return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+        if orjson is not None:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf-8"
+        )
+
+    def loads(self, raw: bytes) -> Dict:
+        if raw.startswith(UTF8_BOM):
+            raw = raw[len(UTF8_BOM) :]
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw)
+
+
+class MsgpackCodec:
+    """msgpack: smaller than JSON and faster to parse for long histories."""
+
+    name = kind = "msgpack"
+
+    def __init__(self):
+        import msgpack
+
+        self._msgpack = msgpack
+
+    def dumps(self, data: Dict) -> bytes:
+        return self._msgpack.packb(data, use_bin_type=True)
+
+    def loads(self, raw: bytes) -> Dict:
+        return self._msgpack.unpackb(raw, raw=False, strict_map_key=False)
+
+
+class GzipCompression:
+    name = "gzip"
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def compress(self, raw: bytes) -> bytes:
+        # mtime=0: equal dialogs give equal files
+        return gzip.compress(raw, compresslevel=self.level, mtime=0)
+
+    def decompress(self, raw: bytes) -> bytes:
+        return gzip.decompress(raw)
+
+
+class ZstdCompression:
+    name = "zstd"
+
+    def __init__(self, level: int = 3):
+        import zstandard
+
+        self.level = level
+        self._zstd = zstandard
+
+    # zstandard (de)compressors must not be shared between threads
+    def compress(self, raw: bytes) -> bytes:
+        return self._zstd.ZstdCompressor(level=self.level).compress(raw)
+
+    def decompress(self, raw: bytes) -> bytes:
+        return self._zstd.ZstdDecompressor().decompress(raw)
+
+
+CODECS = {
+    "json": lambda: JsonCodec(),
+    "json-pretty": lambda: JsonCodec(pretty=True),
+    "msgpack": MsgpackCodec,
+}
+COMPRESSIONS = {"gzip": GzipCompression, "zstd": ZstdCompression}
+
+# Decoders for formats met on disk, created on first use
+_decoders: Dict[str, object] = {}
+
+
+def _decoder(name: str):
+    decoder = _decoders.get(name)
+    if decoder is None:
+        decoder = _decoders[name] = {**CODECS, **COMPRESSIONS}[name]()
+    return decoder
+
+
+def detect(raw: bytes) -> str:
+    """Outer format of an encoded dialog: gzip, zstd, msgpack or json."""
+    if raw.startswith(GZIP_MAGIC):
+        return "gzip"
+    if raw.startswith(ZSTD_MAGIC):
+        return "zstd"
+    if raw[:1] and raw[0] in _MSGPACK_MAP:
+        return "msgpack"
+    return "json"
+
+
+class DialogSerializer:
+    """Writes dialogs with ``codec`` and optional ``compression``; reads
+    every supported format, recognised by its first bytes, so files written
+    with other settings keep working."""
+
+    def __init__(self, codec=None, compression=None):
+        self.codec = codec or JsonCodec()
+        self.compression = compression
+        self.name = self.codec.name + (f"+{compression.name}" if compression else "")
+        # What detect() returns for our own output
+        self.format = compression.name if compression else self.codec.kind
+
+    def dumps(self, data: Dict) -> bytes:
+        raw = self.codec.dumps(data)
+        if self.compression:
+            raw = self.compression.compress(raw)
+        return raw
+
+    def loads(self, raw: bytes) -> Dict:
+        kind = detect(raw)
+        if kind in COMPRESSIONS:
+            if self.compression and self.compression.name == kind:
+                return self.loads(self.compression.decompress(raw))
+            return self.loads(_decoder(kind).decompress(raw))
+        codec = self.codec if self.codec.kind == kind else _decoder(kind)
+        return codec.loads(raw)
+
+
+def get_serializer(spec: Optional[str] = None) -> DialogSerializer:
+    """Serializer from a spec like ``json``, ``msgpack`` or ``msgpack+zstd``."""
+    name, _, compression = (spec or "json").partition("+")
+    if name not in CODECS:
+        raise ValueError(f"Unknown dialog format: {name}")
+    if compression and compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown dialog compression: {compression}")
+    return DialogSerializer(
+        CODECS[name](), COMPRESSIONS[compression]() if compression else None
+    )
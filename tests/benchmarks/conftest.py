@@ -0,0 +1,97 @@
+import json
+import os
+import time
+import pytest
+
+BASELINES_FILE = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+# "" skips the benchmarks, "1" compares with the baselines, "update"
+# records new baselines (after an intended change or on new hardware)
+MODE = os.environ.get("AVBOT_BENCHMARKS", "")
+# Allowed slowdown against the baseline before a benchmark fails
+THRESHOLD = float(os.environ.get("AVBOT_BENCH_THRESHOLD", 0.25))
+# Differences below this many seconds are timer noise, never a regression
+MIN_DELTA = float(os.environ.get("AVBOT_BENCH_MIN_DELTA", 0.0005))
+
+# Extra lines (e.g. payload sizes) printed after the test session
+NOTES = []
+
+
+class Bench:
+    """Times a callable and compares the fastest run with its saved baseline.
+
+    Every benchmark needs a baseline. Interference (other processes, GC
+    pauses) only ever makes runs slower, so the fastest of ``repeat`` runs
+    is the stable figure; a result over the allowed slowdown is measured
+    once more before the benchmark fails.
+    """
+
+    def __init__(self, baselines: dict, results: dict):
+        self.baselines = baselines
+        self.results = results
+
+    @staticmethod
+    def _fastest(func, repeat: int, setup) -> float:
+        timings = []
+        for _ in range(repeat):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    def measure(self, name: str, func, repeat: int = 5, setup=None) -> float:
+        fastest = self._fastest(func, repeat, setup)
+        if MODE != "update" and self.regressed(name, fastest):
+            fastest = min(fastest, self._fastest(func, repeat, setup))
+        self.results[name] = fastest
+        self.check(name, fastest)
+        return fastest
+
+    def note(self, line: str) -> None:
+        NOTES.append(line)
+
+    def regressed(self, name: str, value: float) -> bool:
+        baseline = self.baselines.get(name)
+        if baseline is None:
+            return False
+        return value > baseline * (1 + THRESHOLD) and value - baseline > MIN_DELTA
+
+    def check(self, name: str, value: float) -> None:
+        if MODE == "update":
+            return
+        baseline = self.baselines.get(name)
+        if baseline is None:
+            pytest.fail(
+                f"{name}: no baseline in baselines.json, record it with "
+                f"AVBOT_BENCHMARKS=update"
+            )
+        if self.regressed(name, value):
+            pytest.fail(
+                f"{name}: {value * 1000:.3f} ms, baseline {baseline * 1000:.3f} ms "
+                f"(+{(value / baseline - 1) * 100:.0f}%, allowed "
+                f"+{THRESHOLD * 100:.0f}%)"
+            )
+
+
+@pytest.fixture(scope="session")
+def bench():
+    baselines = {}
+    if os.path.exists(BASELINES_FILE):
+        with open(BASELINES_FILE, encoding="utf-8") as f:
+            baselines = json.load(f)
+    results = {}
+    yield Bench(baselines, results)
+    if MODE == "update" and results:
+        baselines.update({k: round(v, 6) for k, v in results.items()})
+        with open(BASELINES_FILE, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(baselines.items())), f, indent=2)
+            f.write("\n")
+
+
+def pytest_terminal_summary(terminalreporter):
+    if NOTES:
+        terminalreporter.section("benchmark notes")
+        for line in NOTES:
+            terminalreporter.write_line(line)
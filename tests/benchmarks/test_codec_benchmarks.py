@@ -0,0 +1,40 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import pytest
+from storage.serializers import get_serializer
+from test_dialog_benchmarks import make_dialog, repeats
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("AVBOT_BENCHMARKS"),
+    reason="benchmarks run with AVBOT_BENCHMARKS=1 (or =update)",
+)
+
+# Every dialog file format; json-pretty is what older versions wrote
+CODECS = ["json-pretty", "json", "msgpack", "json+gzip", "json+zstd", "msgpack+zstd"]
+HISTORY_SIZES = [100, 10000, 100000]
+
+
+@pytest.mark.parametrize("messages", HISTORY_SIZES)
+@pytest.mark.parametrize("spec", CODECS)
+def test_codec(bench, spec, messages):
+    serializer = get_serializer(spec)
+    dialog = make_dialog(messages)
+    raw = serializer.dumps(dialog)
+
+    encode = bench.measure(
+        f"codec/{spec}/dumps/messages={messages}",
+        lambda: serializer.dumps(dialog),
+        repeat=repeats(messages),
+    )
+    decode = bench.measure(
+        f"codec/{spec}/loads/messages={messages}",
+        lambda: serializer.loads(raw),
+        repeat=repeats(messages),
+    )
+    bench.note(
+        f"{spec:<14} messages={messages:<7} {len(raw):>11,} bytes  "
+        f"dumps {encode * 1000:8.2f} ms  loads {decode * 1000:8.2f} ms"
+    )
@@ -0,0 +1,154 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from concurrent.futures import ThreadPoolExecutor
+import fakeredis
+import pytest
+from services.dialog_service import DialogService
+from storage.abs_storage import DEFAULT_TOPIC, DialogStorage
+from storage.archive import DialogArchive, LocalArchiveStore
+from storage.file_storage import SHARDED, FileDialogStorage
+from storage.redis_storage import RedisDialogStorage
+from storage.ydb_storage import YDBDialogStorage
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("AVBOT_BENCHMARKS"),
+    reason="benchmarks run with AVBOT_BENCHMARKS=1 (or =update)",
+)
+
+# Every DialogStorage implementation, built inside a temporary directory
+BACKENDS = {
+    "FileDialogStorage": lambda tmp_path: FileDialogStorage(str(tmp_path / "dialogs")),
+    "FileDialogStorage[sharded]": lambda tmp_path: FileDialogStorage(
+        str(tmp_path / "dialogs"), SHARDED
+    ),
+    # Hot window of 200 messages: the first append starts archiving the rest
+    "FileDialogStorage[archive]": lambda tmp_path: FileDialogStorage(
+        str(tmp_path / "dialogs"),
+        archive=DialogArchive(LocalArchiveStore(str(tmp_path / "archive"))),
+    ),
+    # In-process fakeredis: measures the storage code, not the network
+    "RedisDialogStorage": lambda tmp_path: RedisDialogStorage(
+        fakeredis.FakeRedis(decode_responses=True)
+    ),
+}
+
+# Implementations that are not timed, and why
+UNTIMED = {
+    # A stub that stores nothing: its timings are microseconds of noise
+    YDBDialogStorage.__name__: "no-op stub",
+}
+
+HISTORY_SIZES = [10, 100, 1000, 10000, 100000]
+TOPIC_COUNTS = [1, 10, 50]
+CONCURRENT_USERS = [1, 8, 32]
+
+USER_ID = 1000
+
+
+def make_dialog(messages: int, topics: int = 1) -> dict:
+    """Dialog with ``messages`` messages spread over ``topics`` topics."""
+    names = [DEFAULT_TOPIC] + [f"topic-{i}" for i in range(1, topics)]
+    dialog = {"current_topic": DEFAULT_TOPIC, "topics": {}}
+    for t, name in enumerate(names):
+        count = messages // topics + (1 if t < messages % topics else 0)
+        dialog["topics"][name] = {
+            "messages": [
+                {
+                    "role": "user" if i % 2 == 0 else "assistant",
+                    "text": f"Сообщение {i} в теме {name}: как дела с планами?",
+                }
+                for i in range(count)
+            ]
+        }
+    return dialog
+
+
+def repeats(messages: int) -> int:
+    return 3 if messages >= 10000 else 7
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request, tmp_path):
+    return request.param, BACKENDS[request.param](tmp_path)
+
+
+def test_every_backend_is_benchmarked():
+    implementations = {cls.__name__ for cls in DialogStorage.__subclasses__()}
+    assert implementations <= set(BACKENDS) | set(UNTIMED)
+
+
+@pytest.mark.parametrize("messages", HISTORY_SIZES)
+def test_load_save_by_history_size(bench, backend, messages):
+    name, storage = backend
+    dialog = make_dialog(messages)
+    storage.save_dialog(USER_ID, dialog)
+
+    bench.measure(
+        f"{name}/save_dialog/messages={messages}",
+        lambda: storage.save_dialog(USER_ID, dialog),
+        repeat=repeats(messages),
+    )
+    bench.measure(
+        f"{name}/load_dialog/messages={messages}",
+        lambda: storage.load_dialog(USER_ID),
+        repeat=repeats(messages),
+    )
+
+
+@pytest.mark.parametrize("messages", HISTORY_SIZES)
+def test_dialog_service_by_history_size(bench, backend, messages):
+    name, storage = backend
+    service = DialogService(storage)
+    storage.save_dialog(USER_ID, make_dialog(messages))
+    message = {"role": "user", "text": "Что у меня завтра?"}
+
+    bench.measure(
+        f"{name}/add_message_to_topic/messages={messages}",
+        lambda: service.add_message_to_topic(USER_ID, message),
+        repeat=repeats(messages),
+    )
+    bench.measure(
+        f"{name}/get_last_messages/messages={messages}",
+        lambda: service.get_last_messages(USER_ID, 15),
+        repeat=repeats(messages),
+    )
+
+
+@pytest.mark.parametrize("topics", TOPIC_COUNTS)
+def test_dialog_service_by_topic_count(bench, backend, topics):
+    name, storage = backend
+    service = DialogService(storage)
+    storage.save_dialog(USER_ID, make_dialog(5000, topics))
+    message = {"role": "user", "text": "Новая тема"}
+
+    bench.measure(
+        f"{name}/add_message_to_topic/topics={topics}",
+        lambda: service.add_message_to_topic(USER_ID, message, "topic-1"),
+    )
+    bench.measure(
+        f"{name}/get_last_messages/topics={topics}",
+        lambda: service.get_last_messages(USER_ID, 15),
+    )
+
+
+@pytest.mark.parametrize("users", CONCURRENT_USERS)
+def test_concurrent_users(bench, backend, users):
+    """Total time for every user to append and read back 20 messages."""
+    name, storage = backend
+    service = DialogService(storage)
+    for user_id in range(users):
+        storage.save_dialog(user_id, make_dialog(1000))
+
+    def conversation(user_id):
+        for i in range(20):
+            service.add_message_to_topic(user_id, {"role": "user", "text": str(i)})
+            service.get_last_messages(user_id, 15)
+
+    def run():
+        with ThreadPoolExecutor(max_workers=users) as executor:
+            list(executor.map(conversation, range(users)))
+
+    bench.measure(f"{name}/conversation/users={users}", run, repeat=3)
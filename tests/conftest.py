@@ -50,8 +50,46 @@ def mock_config():
         })
     yield config
 
+# Debug mode: AVBOT_LOOP_BLOCK_MS=50 pytest tests/ fails every test in which
+# a handler blocks the event loop for longer than that
+LOOP_BLOCK_MS = float(os.environ.get("AVBOT_LOOP_BLOCK_MS", 0))
+_loop_blocks = []
+
+
+def _monitored(policy_class):
+    from services.loop_monitor import LoopLagMonitor
+
+    class MonitoredPolicy(policy_class):
+        def new_event_loop(self):
+            loop = super().new_event_loop()
+            LoopLagMonitor(LOOP_BLOCK_MS / 1000, on_block=_loop_blocks.append).start(loop)
+            return loop
+
+    return MonitoredPolicy()
+
+
 # Configure asyncio mode
 @pytest.fixture(scope="session")
 def event_loop_policy():
     import asyncio
-    return asyncio.WindowsSelectorEventLoopPolicy() if sys.platform == "win32" else asyncio.DefaultEventLoopPolicy()
\ No newline at end of file
+    policy_class = asyncio.WindowsSelectorEventLoopPolicy if sys.platform == "win32" else asyncio.DefaultEventLoopPolicy
+    return _monitored(policy_class) if LOOP_BLOCK_MS else policy_class()
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "allow_loop_block: test blocks the event loop on purpose")
+
+
+@pytest.fixture(autouse=True)
+def loop_block_guard(request):
+    """Fail the test when a handler blocked the event loop (debug mode)."""
+    _loop_blocks.clear()
+    yield
+    if request.node.get_closest_marker("allow_loop_block"):
+        return
+    blocking = [b for b in _loop_blocks if b["handler"]]
+    if blocking:
+        pytest.fail("Event loop blocked by handlers:\n" + "\n".join(
+            f"{b['handler']} (user {b['user_id']}) for {b['blocked_for']}s+ at {b['frame']}"
+            for b in blocking
+        ))
\ No newline at end of file
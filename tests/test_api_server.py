@@ -0,0 +1,80 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from telegram import Bot, Update
+from services.api_server import ApiServer
+from services.config_service import Config
+
+UPDATE = {
+    "update_id": 1001,
+    "message": {
+        "message_id": 5,
+        "date": 1767225600,
+        "chat": {"id": 42, "type": "private"},
+        "from": {"id": 42, "is_bot": False, "first_name": "Test"},
+        "text": "привет",
+    },
+}
+
+
+class TestTelegramWebhook:
+    """Webhook route feeding updates to the bot application"""
+
+    @pytest.fixture
+    def queue(self):
+        return asyncio.Queue()
+
+    @pytest.fixture
+    def client(self, queue, tmp_path):
+        config = Config(
+            {
+                "yandex": {"key": "test"},
+                "api": {"delivery_queue_file": str(tmp_path / "queue.json")},
+            }
+        )
+        server = ApiServer(
+            api_key="api-key",
+            bot=Bot("123:TEST"),
+            port=5200,
+            config=config,
+            update_queue=queue,
+            webhook_secret="s3cret",
+        )
+        return TestClient(server.app)
+
+    def test_update_is_queued(self, client, queue):
+        response = client.post(
+            "/telegram/webhook",
+            json=UPDATE,
+            headers={"X-Telegram-Bot-Api-Secret-Token": "s3cret"},
+        )
+
+        assert response.status_code == 200
+        update = queue.get_nowait()
+        assert isinstance(update, Update)
+        assert update.update_id == 1001
+        assert update.effective_message.text == "привет"
+
+    @pytest.mark.parametrize("headers", [{}, {"X-Telegram-Bot-Api-Secret-Token": "x"}])
+    def test_wrong_secret_is_rejected(self, client, queue, headers):
+        response = client.post("/telegram/webhook", json=UPDATE, headers=headers)
+
+        assert response.status_code == 403
+        assert queue.empty()
+
+    def test_api_key_does_not_open_webhook(self, client, queue):
+        response = client.post(
+            "/telegram/webhook", json=UPDATE, headers={"x-api-key": "api-key"}
+        )
+        assert response.status_code == 403
+
+    def test_route_absent_in_polling_mode(self):
+        config = Config({"yandex": {"key": "test"}})
+        server = ApiServer("api-key", Bot("123:TEST"), 5200, config)
+        response = TestClient(server.app).post("/telegram/webhook", json=UPDATE)
+        assert response.status_code == 404
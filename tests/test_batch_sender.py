@@ -0,0 +1,75 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from services.batch_sender import BatchSender
+
+
+def _requests(n):
+    return [SimpleNamespace(chat_id=100 + i) for i in range(n)]
+
+
+class TestBatchSender:
+    """Test suite for BatchSender"""
+
+    @pytest.mark.asyncio
+    async def test_reports_per_item_status(self):
+        sender = BatchSender(concurrency=2)
+
+        async def send(req):
+            if req.chat_id == 102:
+                raise RuntimeError("Forbidden: bot was blocked by the user")
+            return SimpleNamespace(message_id=req.chat_id * 10)
+
+        batch = sender.submit(_requests(4), send)
+        assert sender.get(batch.batch_id).to_dict()["pending"] == 4
+        await asyncio.gather(*sender._tasks)
+
+        status = batch.to_dict()
+        assert status["status"] == "done"
+        assert (status["sent"], status["failed"], status["pending"]) == (3, 1, 0)
+        assert status["items"][0] == {
+            "index": 0,
+            "chat_id": 100,
+            "status": "sent",
+            "message_id": 1000,
+            "error": None,
+        }
+        assert status["items"][2]["status"] == "failed"
+        assert "blocked" in status["items"][2]["error"]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        sender = BatchSender(concurrency=3)
+        in_flight = 0
+        peak = 0
+
+        async def send(req):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+        sender.submit(_requests(10), send)
+        await asyncio.gather(*sender._tasks)
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_finished_batches_expire(self):
+        sender = BatchSender(retention=0)
+        first = sender.submit(_requests(1), AsyncMock())
+        await asyncio.gather(*sender._tasks)
+        first.finished_at -= 1
+
+        sender.submit(_requests(1), AsyncMock())
+        assert sender.get(first.batch_id) is None
+        await asyncio.gather(*sender._tasks)
+
+    def test_unknown_batch(self):
+        assert BatchSender().get("missing") is None
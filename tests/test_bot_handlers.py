@@ -29,6 +29,12 @@ config = Config(mock_config_data)
 class TestBotHandlers:
     """Test suite for bot handlers"""
 
+    @pytest.fixture(autouse=True)
+    def dialogs_dir(self, tmp_path, monkeypatch):
+        """Dialogs written by handlers go to a temporary directory"""
+        monkeypatch.setenv("DIALOGS_PATH", str(tmp_path))
+        return tmp_path
+
     @pytest.fixture
     def mock_message(self):
         """Create a mock Telegram message"""
@@ -172,7 +178,7 @@ class TestBotHandlers:
             # mock_update.message.reply_text.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_topic_handler_success(self, mock_update, mock_context):
+    async def test_topic_handler_success(self, mock_update, mock_context, dialogs_dir):
         """Test topic handler with successful execution"""
         # Mock message text with topic
         mock_update.message.text = "/topic Test topic"
@@ -180,7 +186,7 @@ class TestBotHandlers:
         with patch("storage.file_storage.DIALOGS_DIR", "dialogs"):
             from handlers.topic_handler import TopicHandler
 
-            dialogs = DialogService(FileDialogStorage())
+            dialogs = DialogService(FileDialogStorage(str(dialogs_dir)))
             handler = TopicHandler(config, dialogs)
             mock_update.message.reply_text = AsyncMock()
 
@@ -188,3 +194,23 @@ class TestBotHandlers:
 
             # Verify success message was sent
             mock_update.message.reply_text.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_calendar_events_reply_escapes_summaries(
+        self, mock_update, mock_context
+    ):
+        """Event summaries can't break the Markdown of the reply"""
+        from handlers.calendars_handler import CalendarsHandler
+
+        mock_update.message.text = "/calendars events cal1\nmy_event *draft*"
+        mock_update.message.reply_text = AsyncMock()
+        mock_context.args = ["events", "cal1"]
+        handler = CalendarsHandler(config)
+        handler.ics_client.create_events = Mock(
+            return_value=[{"index": 0, "status": "error", "error": "400"}]
+        )
+
+        await handler.handle_authorized(mock_update, mock_context)
+
+        text = mock_update.message.reply_text.call_args[0][0]
+        assert "«my\\_event \\*draft\\*»" in text
@@ -0,0 +1,155 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
+from services.calendar_store import CalendarEventStore, expand_recurrence
+
+UTC = timezone.utc
+
+
+def dt(day, hour=0, minute=0):
+    return datetime(2026, 7, day, hour, minute, tzinfo=UTC)
+
+
+class TestExpandRecurrence:
+    """Test suite for RRULE expansion"""
+
+    def test_weekly_byday_with_count(self):
+        start = datetime(2026, 1, 5, 10, tzinfo=UTC)  # Monday
+        result = expand_recurrence(
+            start, "FREQ=WEEKLY;BYDAY=MO,WE;COUNT=5", start, start + timedelta(days=60)
+        )
+        assert [d.day for d in result] == [5, 7, 12, 14, 19]
+
+    def test_monthly_skips_missing_days(self):
+        start = datetime(2026, 1, 31, tzinfo=UTC)
+        result = expand_recurrence(
+            start, "FREQ=MONTHLY;COUNT=3", start, start + timedelta(days=365)
+        )
+        assert [d.month for d in result] == [1, 3, 5]
+
+    def test_until_and_exdate(self):
+        start = dt(1, 9)
+        result = expand_recurrence(
+            start,
+            "FREQ=DAILY;UNTIL=20260705T235959Z",
+            start,
+            start + timedelta(days=30),
+            exdates=["2026-07-03T09:00:00+00:00"],
+        )
+        assert [d.day for d in result] == [1, 2, 4, 5]
+
+    def test_window_clips_infinite_rule(self):
+        start = dt(1, 9)
+        result = expand_recurrence(start, "FREQ=DAILY", dt(10), dt(20))
+        assert len(result) == 10
+        assert result[0] == dt(10, 9)
+
+    def test_old_open_ended_series(self):
+        """Series started decades ago still show up in the current window"""
+        daily = expand_recurrence(
+            datetime(2000, 3, 1, 9, tzinfo=UTC), "FREQ=DAILY", dt(10), dt(13)
+        )
+        assert daily == [dt(10, 9), dt(11, 9), dt(12, 9)]
+
+        workdays = expand_recurrence(
+            datetime(1990, 1, 1, 9, tzinfo=UTC),  # Monday
+            "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+            dt(10),
+            dt(17),
+        )
+        assert [d.day for d in workdays] == [10, 13, 14, 15, 16]
+
+        monthly = expand_recurrence(
+            datetime(1980, 1, 31, tzinfo=UTC), "FREQ=MONTHLY", dt(1), dt(31, 23)
+        )
+        assert monthly == [dt(31)]
+        yearly = expand_recurrence(
+            datetime(1950, 7, 15, tzinfo=UTC), "FREQ=YEARLY;INTERVAL=2", dt(1), dt(31)
+        )
+        assert yearly == [dt(15)]
+
+
+class TestCalendarEventStore:
+    """Test suite for CalendarEventStore"""
+
+    @pytest.fixture
+    def ics(self):
+        ics = Mock()
+        ics.get_calendars.return_value = [{"id": "cal1"}]
+        ics.get_events.return_value = {
+            "events": [
+                {
+                    "uid": "standup",
+                    "summary": "Standup",
+                    "start": "2026-07-06T10:00:00+00:00",
+                    "end": "2026-07-06T10:30:00+00:00",
+                    "rrule": "FREQ=DAILY;COUNT=5",
+                },
+                {
+                    "uid": "lunch",
+                    "summary": "Lunch",
+                    "start": "2026-07-07T12:00:00+00:00",
+                    "end": "2026-07-07T13:00:00+00:00",
+                },
+                {
+                    "uid": "holiday",
+                    "summary": "Holiday",
+                    "start": "2026-07-08",
+                    "all_day": True,
+                },
+            ],
+            "synced_at": "cursor-1",
+        }
+        return ics
+
+    @pytest.fixture
+    def store(self, ics):
+        store = CalendarEventStore(ics)
+        # Pin the index window around the test data
+        store._default_window = lambda: (dt(1), dt(31))
+        store.sync_user(42)
+        return store
+
+    def test_get_events_expands_recurrence(self, store):
+        events = store.get_events(42, dt(7), dt(8))
+        assert [e["summary"] for e in events] == ["Standup", "Lunch"]
+        assert events[0]["start"] == "2026-07-07T10:00:00+00:00"
+
+    def test_get_events_includes_overlapping(self, store):
+        events = store.get_events(42, dt(7, 12, 30), dt(7, 12, 45))
+        assert [e["summary"] for e in events] == ["Lunch"]
+
+    def test_find_free_slots_ignores_all_day(self, store):
+        slots = store.find_free_slots(42, timedelta(hours=1), dt(8, 9), dt(8, 12))
+        assert slots == [(dt(8, 9), dt(8, 10)), (dt(8, 10, 30), dt(8, 12))]
+
+    def test_incremental_sync_applies_changes(self, store, ics):
+        ics.get_events.return_value = {
+            "events": [{"uid": "lunch", "status": "cancelled"}],
+            "synced_at": "cursor-2",
+        }
+        store.sync_user(42)
+
+        ics.get_events.assert_called_with("cal1", "42", since="cursor-1")
+        assert [e["summary"] for e in store.get_events(42, dt(7), dt(8))] == ["Standup"]
+
+    def test_removed_calendar_drops_events(self, store, ics):
+        ics.get_calendars.return_value = []
+        store.sync_user(42)
+        assert store.get_events(42, dt(1), dt(31)) == []
+
+    def test_failed_sync_keeps_previous_data(self, store, ics):
+        ics.get_calendars.return_value = None
+        assert store.sync_user(42) is False
+        assert len(store.get_events(42, dt(1), dt(31))) == 7
+
+    def test_query_outside_window(self, store):
+        events = store.get_events(
+            42, datetime(2026, 8, 1, tzinfo=UTC), datetime(2026, 8, 2, tzinfo=UTC)
+        )
+        assert events == []
@@ -0,0 +1,158 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from unittest.mock import Mock, patch
+from services import circuit_breaker
+from services.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+from services.config_service import Config
+
+
+class TestCircuitBreaker:
+    """Test suite for CircuitBreaker"""
+
+    @pytest.fixture
+    def clock(self):
+        with patch("services.circuit_breaker.time.monotonic") as monotonic:
+            monotonic.return_value = 1000.0
+            yield monotonic
+
+    @pytest.fixture
+    def breaker(self, clock):
+        return CircuitBreaker(
+            "test", window=4, min_calls=4, failure_rate=0.5, open_seconds=10
+        )
+
+    def test_opens_on_failure_rate(self, breaker):
+        for ok in (True, True, False):
+            breaker.record_success() if ok else breaker.record_failure()
+        assert breaker.state == CLOSED
+
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.allow() is False
+
+    def test_fast_fail_does_not_call_backend(self, breaker):
+        for _ in range(4):
+            breaker.record_failure()
+        backend = Mock()
+
+        with pytest.raises(CircuitOpenError) as exc:
+            breaker.call(backend)
+        backend.assert_not_called()
+        assert exc.value.retry_in == 10
+
+    def test_half_open_probe_success_closes(self, breaker, clock):
+        for _ in range(4):
+            breaker.record_failure()
+        clock.return_value += 10
+
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow() is True
+        # Only one probe at a time
+        assert breaker.allow() is False
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        assert breaker.snapshot()["failure_rate"] == 0.0
+
+    def test_half_open_probe_failure_reopens(self, breaker, clock):
+        for _ in range(4):
+            breaker.record_failure()
+        clock.return_value += 10
+
+        with pytest.raises(RuntimeError):
+            breaker.call(Mock(side_effect=RuntimeError("down")))
+        assert breaker.state == OPEN
+
+    def test_result_predicate_counts_failures(self, breaker):
+        for _ in range(4):
+            breaker.call(lambda: None, is_failure=lambda r: r is None)
+        assert breaker.state == OPEN
+
+
+class TestToolServiceDegradedMode:
+    """ToolService calendar tools behind the ICS circuit breaker"""
+
+    @pytest.fixture(autouse=True)
+    def isolated_registry(self):
+        with patch.object(circuit_breaker, "_breakers", {}):
+            yield
+
+    @pytest.fixture
+    def tools(self):
+        from services.tools_service import ToolService
+
+        config = Config(
+            {
+                "ics": {
+                    "api_key": "k",
+                    "url": "http://ics.test",
+                    "circuit_breaker": {"window": 2, "min_calls": 2},
+                }
+            }
+        )
+        service = ToolService(config)
+        service.ics = Mock()
+        return service
+
+    def test_list_calendars_serves_last_known(self, tools):
+        tools.ics.get_calendars.return_value = [{"id": "c1", "name": "Work"}]
+        assert tools.call_tool("list_calendars", {}, user_id=1)["calendars"]
+
+        tools.ics.get_calendars.return_value = None
+        result = tools.call_tool("list_calendars", {}, user_id=1)
+        assert result["calendars"] == [{"id": "c1", "name": "Work"}]
+        assert result["stale"] is True
+
+    def test_calendars_cache_is_bounded(self, tools):
+        tools._calendars_cache_size = 2
+        tools.ics.get_calendars.return_value = [{"id": "c1", "name": "Work"}]
+        for user_id in (1, 2, 1, 3):
+            tools.call_tool("list_calendars", {}, user_id=user_id)
+        # User 2 was the least recently used
+        assert list(tools._calendars_cache) == [1, 3]
+
+        tools.ics.get_calendars.return_value = None
+        assert tools.call_tool("list_calendars", {}, user_id=2)["unavailable"] is True
+        with patch("services.tools_service.time.monotonic", return_value=1e12):
+            result = tools.call_tool("list_calendars", {}, user_id=1)
+        assert result["unavailable"] is True
+        assert 1 not in tools._calendars_cache
+
+    def test_open_breaker_fails_fast(self, tools):
+        tools.ics.create_event.return_value = False
+        tools.call_tool("add_calendar_event", {"calendar_id": "c1"}, user_id=1)
+        tools.call_tool("add_calendar_event", {"calendar_id": "c1"}, user_id=1)
+        tools.ics.create_event.reset_mock()
+
+        result = tools.call_tool("add_calendar_event", {"calendar_id": "c1"}, user_id=1)
+        assert result["unavailable"] is True
+        tools.ics.create_event.assert_not_called()
+        assert circuit_breaker.breaker_states()["ics"]["state"] == OPEN
+
+    def test_client_errors_do_not_open_breaker(self, tools):
+        # 4xx: e.g. a calendar_id the model made up
+        tools.ics.create_event.return_value = False
+        tools.ics.unavailable = False
+        for _ in range(3):
+            result = tools.call_tool("add_calendar_event", {"calendar_id": "x"}, 1)
+            assert result == {"error": "Не удалось создать событие"}
+
+        tools.ics.create_events.return_value = [
+            {"index": 0, "status": "error", "error": "404 not found"}
+        ]
+        for _ in range(3):
+            tools.call_tool(
+                "add_calendar_events", {"calendar_id": "x", "events": [{}]}, 1
+            )
+
+        assert circuit_breaker.breaker_states()["ics"]["state"] == CLOSED
+        assert tools.ics.create_event.call_count == 3
@@ -0,0 +1,115 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+import yaml
+from unittest.mock import MagicMock
+from services.auth import AuthService
+from services.config_service import Config, ConfigSnapshot
+
+DATA = {
+    "bot": {"token": "1:T", "whitelist": [42, "7", "x", None], "rate_limit": {}},
+    "ycloud": {"api_key": "k", "folder_id": "b1g"},
+    "yandex": {"model": "yandexgpt/latest", "tools": ["calendar"]},
+}
+
+
+def write(path, data, mtime_ns=None):
+    path.write_text(yaml.safe_dump(data), encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def update(user_id):
+    update = MagicMock()
+    update.effective_user.id = user_id
+    return update
+
+
+class TestConfigSnapshot:
+    """Test suite for the precompiled config snapshot"""
+
+    def test_derived_values(self):
+        snapshot = ConfigSnapshot(DATA)
+        assert snapshot.whitelist == frozenset({42, 7})
+        assert snapshot.model_uri == "gpt://b1g/yandexgpt/latest"
+        assert snapshot.bot_token == "1:T"
+
+    def test_snapshot_is_read_only(self):
+        snapshot = ConfigSnapshot(DATA)
+        with pytest.raises(AttributeError):
+            snapshot.whitelist = frozenset()
+        with pytest.raises(TypeError):
+            snapshot.sections["bot"]["token"] = "2:T"
+        assert snapshot.sections["yandex"]["tools"] == ("calendar",)
+
+    def test_source_data_is_copied(self):
+        data = {"bot": {"whitelist": [1]}}
+        config = Config(data)
+        data["bot"]["whitelist"].append(2)
+        assert config.getBotWhitelist() == {1}
+        assert config.getBot("whitelist") == (1,)
+
+    def test_get_defaults(self):
+        config = Config({"bot": None})
+        assert config.getBot("token") is None
+        assert config.get("api", "port", 5200) == 5200
+        assert config.getBotWhitelist() == frozenset()
+
+
+class TestConfigReload:
+    """Test suite for reloading the config file"""
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        path = tmp_path / "config.yml"
+        write(path, DATA, 1_000_000_000)
+        return path
+
+    def test_reloads_on_mtime_change(self, path):
+        config = Config.load(str(path), check_interval=0)
+        before = config.snapshot
+
+        assert config.snapshot is before
+        write(path, dict(DATA, bot={"token": "1:T", "whitelist": [5]}), 2_000_000_000)
+        assert config.getBotWhitelist() == {5}
+
+    def test_no_reload_between_checks(self, path):
+        config = Config.load(str(path), check_interval=3600)
+        write(path, dict(DATA, bot={"token": "1:T", "whitelist": [5]}), 2_000_000_000)
+
+        assert config.getBotWhitelist() == {42, 7}
+        config.request_reload()
+        assert config.getBotWhitelist() == {5}
+
+    def test_broken_file_keeps_previous_snapshot(self, path):
+        config = Config.load(str(path), check_interval=0)
+        path.write_text("bot: [", encoding="utf-8")
+        os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+
+        assert config.getBotToken() == "1:T"
+
+    @pytest.mark.parametrize(
+        "text",
+        ["", "bot:\n", "ycloud:\n  api_key: k\n", "bot:\n  token: 1:T\n"],
+    )
+    def test_partially_written_file_keeps_previous_snapshot(self, path, text):
+        config = Config.load(str(path), check_interval=0)
+        # Empty, no token, no bot section, whitelist cut off
+        path.write_text(text, encoding="utf-8")
+        os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+
+        assert config.getBotToken() == "1:T"
+        assert config.getBotWhitelist() == {42, 7}
+
+    @pytest.mark.asyncio
+    async def test_whitelist_edit_applies_to_auth(self, path):
+        auth = AuthService(Config.load(str(path), check_interval=0))
+        assert await auth.is_authorized(update(42))
+        assert not await auth.is_authorized(update(5))
+
+        write(path, dict(DATA, bot={"token": "1:T", "whitelist": [5]}), 2_000_000_000)
+        assert await auth.is_authorized(update(5))
+        assert not await auth.is_authorized(update(42))
@@ -0,0 +1,215 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import logging
+import threading
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from telegram.error import BadRequest, Forbidden, NetworkError
+from services.api_server import ApiServer, CalendarEventRequest
+from services.delivery_queue import DeliveryQueue
+
+
+async def _drain(queue, send, timeout=1.0):
+    worker = asyncio.create_task(queue.run(send))
+    try:
+        for _ in range(int(timeout / 0.01)):
+            await asyncio.sleep(0.01)
+            if not len(queue):
+                break
+    finally:
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+
+
+class TestDeliveryQueue:
+    """Test suite for the persisted calendar delivery queue"""
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        return str(tmp_path / "queue.json")
+
+    def test_duplicates_within_window_are_dropped(self, path):
+        queue = DeliveryQueue(path)
+        assert queue.enqueue(1, {"summary": "A"}, key="1:uid:2026-01-01") is True
+        assert queue.enqueue(1, {"summary": "A"}, key="1:uid:2026-01-01") is False
+        assert queue.enqueue(2, {"summary": "A"}, key="2:uid:2026-01-01") is True
+        assert len(queue) == 2
+
+    def test_pending_items_and_keys_survive_restart(self, path):
+        DeliveryQueue(path).enqueue(1, {"summary": "A"}, key="k")
+
+        restored = DeliveryQueue(path)
+        assert len(restored) == 1
+        assert restored.enqueue(1, {"summary": "A"}, key="k") is False
+
+    @pytest.mark.asyncio
+    async def test_failed_delivery_is_retried(self, path):
+        queue = DeliveryQueue(path, retry_delay=0.01)
+        queue.enqueue(1, {"summary": "A"})
+        send = AsyncMock(side_effect=[NetworkError("timeout"), None])
+
+        await _drain(queue, send)
+
+        assert send.await_count == 2
+        assert len(queue) == 0
+        assert len(DeliveryQueue(path)) == 0
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_attempts(self, path):
+        queue = DeliveryQueue(path, max_attempts=2, retry_delay=0.01)
+        queue.enqueue(1, {"summary": "A"})
+        send = AsyncMock(side_effect=NetworkError("timeout"))
+
+        await _drain(queue, send)
+
+        assert send.await_count == 2
+        assert len(queue) == 0
+
+    @pytest.mark.asyncio
+    async def test_permanent_errors_are_not_retried(self, path):
+        queue = DeliveryQueue(path, retry_delay=0.01)
+        queue.enqueue(1, {"summary": "A"})
+        send = AsyncMock(side_effect=Forbidden("bot was blocked by the user"))
+
+        await _drain(queue, send)
+
+        assert send.await_count == 1
+        assert len(queue) == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_chat_does_not_hold_up_others(self, path):
+        queue = DeliveryQueue(path, retry_delay=0.01)
+        queue.enqueue(1, {"summary": "A"})
+        queue.enqueue(1, {"summary": "B"})
+        queue.enqueue(2, {"summary": "C"})
+        release = asyncio.Event()
+        sent = []
+
+        async def send(item):
+            if item["chat_id"] == 1:
+                # E.g. group chat pacing or a RetryAfter wait
+                await release.wait()
+            sent.append(item["payloads"][0]["summary"])
+
+        worker = asyncio.create_task(queue.run(send))
+        await asyncio.sleep(0.05)
+        assert sent == ["C"]
+
+        release.set()
+        await asyncio.sleep(0.05)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        # One delivery at a time per chat, in order
+        assert sent == ["C", "A", "B"]
+        assert len(DeliveryQueue(path)) == 0
+
+    @pytest.mark.asyncio
+    async def test_saves_are_batched_off_the_loop(self, path):
+        queue = DeliveryQueue(path)
+        writes = []
+        write = queue._write
+
+        def record(data):
+            writes.append(threading.get_ident())
+            write(data)
+
+        queue._write = record
+        for i in range(50):
+            queue.enqueue(i, {"summary": str(i)})
+        await queue.flush()
+
+        assert 1 <= len(writes) <= 2
+        assert threading.get_ident() not in writes
+        assert len(DeliveryQueue(path)) == 50
+
+    def test_digest_window_groups_events_per_chat(self, path):
+        queue = DeliveryQueue(path)
+        queue.enqueue(1, {"summary": "A"}, window=60)
+        queue.enqueue(1, {"summary": "B"}, window=60)
+        queue.enqueue(2, {"summary": "C"}, window=60)
+        queue.enqueue(1, {"summary": "D"})
+
+        assert len(queue) == 3
+        digest = queue._items[0]
+        assert [p["summary"] for p in digest["payloads"]] == ["A", "B"]
+        assert digest["next_at"] > queue._items[2]["next_at"]
+
+    def test_digest_is_joined_only_within_own_window(self, path):
+        queue = DeliveryQueue(path)
+        queue.enqueue(1, {"summary": "A"}, window=300)
+        # Joining the 300 s digest would hold B back past its 30 s
+        queue.enqueue(1, {"summary": "B"}, window=30)
+        queue.enqueue(1, {"summary": "C"}, window=60)
+
+        assert [[p["summary"] for p in i["payloads"]] for i in queue._items] == [
+            ["A"],
+            ["B", "C"],
+        ]
+
+
+class TestCalendarDigest:
+    """Digest settings and rendering in ApiServer"""
+
+    @pytest.fixture
+    def server(self):
+        server = SimpleNamespace(
+            digest={"window": 10, "chats": {1: 0}, "calendars": {"work": 30}}
+        )
+        server._digest_window = ApiServer._digest_window.__get__(server)
+        return server
+
+    def test_digest_window_precedence(self, server):
+        req = CalendarEventRequest(chat_id=1, calendar_id="work")
+        assert server._digest_window(req) == 0
+        req = CalendarEventRequest(chat_id=2, calendar_id="work")
+        assert server._digest_window(req) == 30
+        req = CalendarEventRequest(chat_id=2, calendar_id="home")
+        assert server._digest_window(req) == 10
+
+    def test_split_message_respects_limit(self):
+        parts = ["a" * 40, "b" * 40, "c" * 40, "d" * 150]
+        messages = ApiServer._split_message(parts, limit=100)
+
+        assert messages == [
+            "a" * 40 + "\n\n" + "b" * 40,
+            "c" * 40,
+            "d" * 100,
+            "d" * 50,
+        ]
+        assert all(len(m) <= 100 for m in messages)
+
+    def test_split_message_keeps_lines_whole(self):
+        event = "\n".join(f"*line {i}* " + "x" * 20 for i in range(10))
+        messages = ApiServer._split_message(["short", event], limit=100)
+
+        assert messages[0] == "short"
+        assert "\n".join(messages[1:]) == event
+        assert all(len(m) <= 100 for m in messages)
+        assert all(m.count("*") % 2 == 0 for m in messages)
+
+    @pytest.mark.asyncio
+    async def test_digest_falls_back_to_plain_text(self):
+        bot = SimpleNamespace(
+            send_message=AsyncMock(
+                side_effect=[BadRequest("Can't parse entities: can't find end"), None]
+            )
+        )
+        server = SimpleNamespace(
+            bot=bot,
+            send_options={},
+            logger=logging.getLogger(__name__),
+            _format_event=lambda e: e.summary,
+            _split_message=ApiServer._split_message,
+        )
+        item = {"chat_id": 1, "payloads": [{"chat_id": 1, "summary": "a_b"}]}
+
+        await ApiServer._deliver_event(server, item)
+
+        assert "parse_mode" not in bot.send_message.call_args.kwargs
+        assert bot.send_message.call_args.kwargs["text"] == "a_b"
+        assert item["sent"] == 1
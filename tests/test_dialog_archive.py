@@ -0,0 +1,221 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+import pytest
+from services.config_service import Config
+from services.dialog_service import DialogService
+from storage.archive import ARCHIVED, DialogArchive, LocalArchiveStore
+from storage.factory import get_archive
+from storage.file_storage import FileDialogStorage
+
+
+def message(i):
+    return {"role": "user", "text": f"Сообщение {i}"}
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return DialogArchive(LocalArchiveStore(str(tmp_path / "archive")), 5, 3)
+
+
+@pytest.fixture
+def service(tmp_path, archive):
+    return DialogService(FileDialogStorage(str(tmp_path / "dialogs"), archive=archive))
+
+
+def fill(service, count, topic_name=None):
+    """Append messages, letting each background segment write finish."""
+    for i in range(count):
+        service.add_message_to_topic(1, message(i), topic_name)
+        service.storage.archive.flush()
+
+
+class TestDialogArchive:
+    """Test suite for the bounded hot history and its archive"""
+
+    def test_hot_window_is_bounded(self, service, archive):
+        fill(service, 20)
+
+        topic = service.storage.load_dialog(1)["topics"]["default"]
+        # Written at 8 messages, trimmed to 6 at the next append
+        assert 5 <= len(topic["messages"]) <= 8
+        assert topic[ARCHIVED] == 20 - len(topic["messages"])
+        assert service.get_last_messages(1, 3) == [
+            message(17),
+            message(18),
+            message(19),
+        ]
+        assert len(archive.store.list("1/default/")) == 5
+
+    def test_export_returns_full_history(self, service):
+        fill(service, 20)
+        fill(service, 9, "работа")
+        service.set_topic_index(1, "работа", "idx-1")
+
+        dialog = service.export_dialog(1)
+
+        assert dialog["topics"]["default"]["messages"] == [
+            message(i) for i in range(20)
+        ]
+        work = dialog["topics"]["работа"]
+        assert work == {"messages": [message(i) for i in range(9)], "index_id": "idx-1"}
+
+    def test_search_reads_archive_newest_first(self, service):
+        fill(service, 20)
+
+        found = service.search_messages(1, "СООБЩЕНИЕ 1", limit=3)
+        assert [f["message"] for f in found] == [message(19), message(18), message(17)]
+        assert service.search_messages(1, "Сообщение 2") == [
+            {"topic": "default", "message": message(2)}
+        ]
+        assert service.search_messages(1, "нет такого") == []
+
+    def test_failed_segment_write_keeps_messages(self, service, archive):
+        with patch.object(archive.store, "put", side_effect=OSError("disk")):
+            fill(service, 10)
+        assert len(service.get_last_messages(1, 100)) == 10
+
+        fill(service, 2)
+        assert len(service.get_last_messages(1, 100)) == 6
+        assert len(service.export_dialog(1)["topics"]["default"]["messages"]) == 12
+
+    def test_append_does_not_wait_for_segment_write(self, service, archive):
+        written = threading.Event()
+        put = archive.store.put
+
+        def slow_put(key, data):
+            written.wait(5)
+            put(key, data)
+
+        with patch.object(archive.store, "put", side_effect=slow_put):
+            for i in range(10):
+                service.add_message_to_topic(1, message(i))
+            # Nothing is trimmed before its segment is written
+            assert len(service.get_last_messages(1, 100)) == 10
+            written.set()
+            archive.flush()
+
+        # The 3 messages written at 8 are trimmed; the next segment starts
+        service.add_message_to_topic(1, message(10))
+        assert len(service.get_last_messages(1, 100)) == 8
+        archive.flush()
+        exported = service.export_dialog(1)["topics"]["default"]["messages"]
+        assert exported == [message(i) for i in range(11)]
+
+    def test_segment_of_failed_save_is_ignored(self, service, archive):
+        fill(service, 7)
+        # Written, but the trimmed dialog was never saved
+        archive.write_segment(1, "default", 0, [message(0), message(1)])
+        fill(service, 2)
+        archive.write_segment(1, "default", 3, [{"text": "orphan"}])
+
+        exported = service.export_dialog(1)["topics"]["default"]["messages"]
+        assert exported == [message(i) for i in range(7)] + [message(0), message(1)]
+
+    def test_segments_from_the_same_offset_do_not_collide(self, service, archive):
+        fill(service, 9)
+        # Another replica archived from offset 0 with a longer dialog
+        archive.write_segment(1, "default", 0, [{"text": "other"}] * 4)
+
+        assert len(archive.store.list("1/default/")) == 2
+        exported = service.export_dialog(1)["topics"]["default"]["messages"]
+        assert exported == [message(i) for i in range(9)]
+
+    def test_segment_of_wrong_length_is_not_trimmed(self, service, archive, caplog):
+        fill(service, 9)
+        archive.store.put(
+            "1/default/000000000000-3.seg",
+            archive.serializer.dumps({"messages": [message(0)]}),
+        )
+
+        exported = service.export_dialog(1)["topics"]["default"]["messages"]
+        assert exported == [message(i) for i in range(3, 9)]
+        assert "holds 1 messages instead of 3" in caplog.text
+
+    def test_redis_storage(self, archive):
+        fakeredis = pytest.importorskip("fakeredis")
+        from storage.redis_storage import RedisDialogStorage
+
+        storage = RedisDialogStorage(
+            fakeredis.FakeRedis(decode_responses=True), archive=archive
+        )
+        service = DialogService(storage)
+        fill(service, 20)
+
+        assert (
+            len(storage.client.lrange(storage._messages_key(1, "default"), 0, -1)) <= 8
+        )
+        assert service.get_last_messages(1, 2) == [message(18), message(19)]
+        exported = service.export_dialog(1)["topics"]["default"]["messages"]
+        assert exported == [message(i) for i in range(20)]
+
+    @pytest.mark.asyncio
+    async def test_search_command(self, service):
+        from handlers.history_handler import HistoryHandler
+
+        fill(service, 20)
+        update = MagicMock()
+        update.effective_user.id = 1
+        update.message.text = "/search Сообщение 2"
+        update.message.reply_text = AsyncMock()
+
+        await HistoryHandler(Config({}), service).handle_authorized(update, None)
+
+        update.message.reply_text.assert_called_once_with("[default] user: Сообщение 2")
+
+
+class TestS3Archive:
+    """Test suite for archive segments in S3-compatible storage"""
+
+    @pytest.fixture
+    def s3(self):
+        moto = pytest.importorskip("moto")
+        import boto3
+        from clients.s3client import S3Client
+
+        with moto.mock_aws():
+            client = boto3.client("s3", region_name="us-east-1")
+            client.create_bucket(Bucket="avbot")
+            yield S3Client("avbot", "dialogs/", client=client)
+
+    def test_client(self, s3):
+        s3.put("1/default/a.seg", b"a")
+        s3.put("10/default/b.seg", b"b")
+
+        assert s3.get("1/default/a.seg") == b"a"
+        assert s3.get("missing") is None
+        assert s3.list("1/") == ["1/default/a.seg"]
+        assert s3.client.list_objects_v2(Bucket="avbot")["KeyCount"] == 2
+
+    def test_archive_in_s3(self, tmp_path, s3):
+        storage = FileDialogStorage(str(tmp_path), archive=DialogArchive(s3, 5, 3))
+        service = DialogService(storage)
+        fill(service, 20)
+
+        exported = service.export_dialog(1)["topics"]["default"]["messages"]
+        assert exported == [message(i) for i in range(20)]
+
+
+class TestArchiveConfig:
+    """Test suite for archive settings"""
+
+    def test_archive_from_config(self, tmp_path):
+        config = Config(
+            {
+                "storage": {
+                    "dialogs_dir": str(tmp_path),
+                    "archive": {"hot_messages": 50, "format": "json+gzip"},
+                }
+            }
+        )
+        archive = get_archive(config)
+
+        assert archive.hot_messages == 50
+        assert archive.serializer.name == "json+gzip"
+        assert archive.store.directory == os.path.join(str(tmp_path), "archive")
+        assert get_archive(config) is archive
+        assert get_archive(Config({})) is None
@@ -0,0 +1,109 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from services.dialog_service import DialogService
+from storage.file_storage import FLAT, SHARDED, FileDialogStorage, shard_path
+from storage.migrate import DialogMigrator, main
+
+
+def message(text):
+    return {"role": "user", "text": text}
+
+
+def files(root):
+    return sorted(
+        os.path.relpath(os.path.join(path, name), root)
+        for path, _, names in os.walk(root)
+        for name in names
+    )
+
+
+@pytest.fixture
+def flat(tmp_path):
+    """Three users' dialogs in the flat layout."""
+    service = DialogService(FileDialogStorage(str(tmp_path), FLAT))
+    for user_id in (1, 2, 3):
+        service.add_message_to_topic(user_id, message(f"flat {user_id}"))
+    return tmp_path
+
+
+class TestShardedLayout:
+    """Test suite for the sharded dialog layout"""
+
+    def test_shard_path(self):
+        path = shard_path(123456789)
+        first, second, name = path.split(os.sep)
+        assert len(first) == len(second) == 2
+        assert name == "123456789.json"
+        assert shard_path(123456789) == path
+
+    def test_reads_flat_files_and_moves_them_on_save(self, flat):
+        storage = FileDialogStorage(str(flat), SHARDED)
+        service = DialogService(storage)
+
+        assert service.get_last_messages(1) == [message("flat 1")]
+        service.add_message_to_topic(1, message("sharded 1"))
+
+        assert not os.path.exists(flat / "1.json")
+        assert os.path.exists(storage.get_user_dialog_file(1))
+        assert len(service.get_last_messages(1)) == 2
+
+    def test_unknown_layout(self, tmp_path):
+        with pytest.raises(ValueError):
+            FileDialogStorage(str(tmp_path), "nested")
+
+
+class TestDialogMigrator:
+    """Test suite for moving dialogs between layouts"""
+
+    def test_moves_in_batches(self, flat):
+        storage = FileDialogStorage(str(flat), SHARDED)
+        migrator = DialogMigrator(storage, batch_size=2)
+
+        assert migrator.migrate_batch() == 2
+        # Half-migrated: every dialog is still readable
+        for user_id in (1, 2, 3):
+            assert storage.get_last_messages(user_id) == [message(f"flat {user_id}")]
+        assert migrator.migrate_batch() == 1
+        assert migrator.migrate_batch() == 0
+
+        assert files(flat) == sorted(shard_path(u) for u in (1, 2, 3))
+
+    def test_newer_copy_is_not_overwritten(self, flat):
+        storage = FileDialogStorage(str(flat), SHARDED)
+        sharded = storage.get_user_dialog_file(1)
+        os.makedirs(os.path.dirname(sharded))
+        # The bot saved user 1 in the new layout, the flat copy is stale
+        os.link(flat / "1.json", flat / "stale.json")
+        DialogService(storage).add_message_to_topic(1, message("new"))
+        os.rename(flat / "stale.json", flat / "1.json")
+
+        assert not DialogMigrator(storage).move(1, str(flat / "1.json"))
+        assert not os.path.exists(flat / "1.json")
+        assert storage.get_last_messages(1)[-1] == message("new")
+
+    def test_back_to_flat(self, flat):
+        DialogMigrator(FileDialogStorage(str(flat), SHARDED)).migrate_all()
+        moved = DialogMigrator(FileDialogStorage(str(flat), FLAT)).migrate_all()
+
+        assert moved == 3
+        assert [f for f in files(flat) if f.endswith(".json")] == [
+            "1.json",
+            "2.json",
+            "3.json",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_background_run(self, flat):
+        migrator = DialogMigrator(
+            FileDialogStorage(str(flat), SHARDED), batch_size=1, interval=0
+        )
+        await migrator.run()
+        assert migrator.moved == 3
+
+    def test_command_line(self, flat, capsys):
+        assert main(["sharded", "--dialogs-dir", str(flat)]) == 0
+        assert "3 dialogs moved" in capsys.readouterr().out
@@ -0,0 +1,195 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock, patch
+import pytest
+from services.config_service import Config
+from services.dialog_service import DialogService
+from services.metrics import DIALOG_LOCK_TIMEOUTS, DIALOG_LOCK_WAIT_SECONDS, metrics
+from storage.abs_storage import DEFAULT_TOPIC
+from storage.factory import get_locks
+from storage.file_storage import FileDialogStorage
+from storage.locks import (
+    DialogLocks,
+    DialogLockTimeout,
+    FileLocks,
+    RedisLocks,
+    StripedLocks,
+)
+
+
+@pytest.fixture
+def enabled():
+    metrics.enabled = True
+    DIALOG_LOCK_TIMEOUTS.reset()
+    DIALOG_LOCK_WAIT_SECONDS.reset()
+    yield
+    metrics.enabled = False
+
+
+def other_process(remote):
+    """Locks of another process: own stripes, same remote backend."""
+    return DialogLocks(remote, timeout=0.05, local=StripedLocks())
+
+
+class TestDialogLocks:
+    """Test suite for per-user dialog locks"""
+
+    def test_concurrent_appends_lose_nothing(self, tmp_path):
+        service = DialogService(FileDialogStorage(str(tmp_path)))
+
+        def append(worker):
+            for i in range(25):
+                service.add_message_to_topic(1, {"text": f"{worker}-{i}"})
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(append, range(8)))
+
+        assert len(service.get_last_messages(1, 1000)) == 200
+
+    def test_topic_change_keeps_concurrent_messages(self, tmp_path):
+        service = DialogService(FileDialogStorage(str(tmp_path)))
+        start = threading.Barrier(2)
+
+        def write():
+            start.wait()
+            for i in range(50):
+                service.add_message_to_topic(1, {"text": str(i)}, DEFAULT_TOPIC)
+
+        def switch():
+            start.wait()
+            for i in range(50):
+                service.set_current_topic(1, f"topic-{i % 3}")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(lambda f: f(), [write, switch]))
+
+        messages = service.get_last_messages(1, 1000, DEFAULT_TOPIC)
+        assert len(messages) == 50
+
+    def test_lock_is_reentrant(self, tmp_path):
+        locks = DialogLocks(FileLocks(str(tmp_path)), timeout=0.05)
+        with locks.lock(1):
+            with locks.lock(1):
+                pass
+        with other_process(locks.remote).lock(1):
+            pass
+
+    def test_file_lock_excludes_other_processes(self, tmp_path, enabled):
+        remote = FileLocks(str(tmp_path))
+        with DialogLocks(remote).lock(1):
+            with pytest.raises(DialogLockTimeout):
+                with other_process(remote).lock(1):
+                    pass
+            with other_process(remote).lock(2):
+                pass
+
+        assert DIALOG_LOCK_TIMEOUTS.samples() == [
+            ["avbot_dialog_lock_timeouts_total", {"kind": "remote"}, 1]
+        ]
+        observed = {s[1]["kind"] for s in DIALOG_LOCK_WAIT_SECONDS.samples()}
+        assert observed == {"local", "remote"}
+
+    def test_redis_lock_excludes_other_replicas(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")  # redis-py releases locks with a Lua script
+        remote = RedisLocks(fakeredis.FakeRedis(), lease=5)
+
+        with DialogLocks(remote).lock(1):
+            with pytest.raises(DialogLockTimeout):
+                with other_process(remote).lock(1):
+                    pass
+        with other_process(remote).lock(1):
+            pass
+
+    def test_locks_are_shared_per_config(self, tmp_path):
+        config = Config(
+            {"storage": {"dialogs_dir": str(tmp_path), "locks": {"backend": "file"}}}
+        )
+        locks = get_locks(config)
+        assert get_locks(config) is locks
+        assert locks.remote.directory == os.path.join(str(tmp_path), ".locks")
+        assert get_locks(Config({})).remote is None
+
+    def test_redis_archive_defaults_to_redis_locks(self, tmp_path):
+        pytest.importorskip("redis")
+        storage = {
+            "backend": "redis",
+            "archive": {"hot_messages": 5, "directory": str(tmp_path)},
+        }
+
+        assert isinstance(get_locks(Config({"storage": storage})).remote, RedisLocks)
+        storage["locks"] = {"backend": "local"}
+        assert get_locks(Config({"storage": storage})).remote is None
+        del storage["archive"], storage["locks"]
+        assert get_locks(Config({"storage": storage})).remote is None
+
+
+class TestAtomicWrite:
+    """Test suite for atomic dialog file writes"""
+
+    def test_failed_write_keeps_previous_file(self, tmp_path):
+        storage = FileDialogStorage(str(tmp_path))
+        service = DialogService(storage)
+        service.add_message_to_topic(1, {"text": "first"})
+
+        with patch("storage.file_storage.os.replace", side_effect=OSError("disk")):
+            service.add_message_to_topic(1, {"text": "second"})
+
+        assert service.get_last_messages(1) == [{"text": "first"}]
+        assert os.listdir(tmp_path) == ["1.json"]
+
+
+class TestHandlersAndLocks:
+    """Test suite for handlers waiting on a busy dialog lock"""
+
+    @pytest.mark.asyncio
+    async def test_busy_lock_does_not_block_the_loop(self, tmp_path):
+        from handlers.text_handler import TextHandler
+
+        locks = DialogLocks(timeout=0.3)
+        service = DialogService(FileDialogStorage(str(tmp_path)), locks)
+        handler = TextHandler(Config({}), MagicMock(), service)
+        update = MagicMock()
+        update.effective_user.id = 1
+        update.message.text = "hello"
+        update.effective_message.reply_text = AsyncMock()
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        held, release = threading.Event(), threading.Event()
+
+        def hold():
+            with locks.lock(1):
+                held.set()
+                release.wait()
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        held.wait()
+        task = asyncio.create_task(ticker())
+        try:
+            await handler.handle(update, None)
+        finally:
+            release.set()
+            holder.join()
+            task.cancel()
+
+        # The loop kept running while the handler waited for the lock
+        assert ticks >= 10
+        update.effective_message.reply_text.assert_called_once()
+        assert (
+            "попробуйте ещё раз" in update.effective_message.reply_text.call_args[0][0]
+        )
+        handler.gpt.ask_yandexgpt_with_context.assert_not_called()
@@ -0,0 +1,125 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+import pytest
+from unittest.mock import Mock, patch
+from services.config_service import Config
+from clients.icsclient import ICSClient
+
+config = Config(
+    {
+        "ics": {
+            "api_key": "test_ics_key",
+            "url": "http://ics.test",
+            "batch_concurrency": 3,
+        }
+    }
+)
+
+
+class TestICSClient:
+    """Test suite for ICSClient"""
+
+    @pytest.fixture
+    def client(self):
+        return ICSClient(config)
+
+    @staticmethod
+    def _response(status_code, text=""):
+        response = Mock()
+        response.status_code = status_code
+        response.text = text
+        return response
+
+    def test_create_event_success(self, client):
+        """create_event returns True on 201"""
+        with patch("clients.icsclient.requests.post") as mock_post:
+            mock_post.return_value = self._response(201)
+            assert client.create_event("cal1", "42", summary="Meeting") is True
+
+        _, kwargs = mock_post.call_args
+        assert kwargs["json"] == {"summary": "Meeting"}
+        assert kwargs["params"] == {"api_key": "test_ics_key", "user_id": "42"}
+        assert kwargs["timeout"] == 5
+
+    def test_create_event_failure(self, client):
+        """create_event returns False on error status"""
+        with patch("clients.icsclient.requests.post") as mock_post:
+            mock_post.return_value = self._response(400, "bad request")
+            assert client.create_event("cal1", "42", summary="Meeting") is False
+        assert client.unavailable is False
+
+        with patch("clients.icsclient.requests.post") as mock_post:
+            mock_post.return_value = self._response(503)
+            assert client.create_event("cal1", "42", summary="Meeting") is False
+        assert client.unavailable is True
+
+    def test_create_events_reports_per_item_results(self, client):
+        """create_events keeps input order and reports failures per item"""
+        events = [{"summary": f"Event {i}"} for i in range(5)]
+
+        def post(url, params=None, json=None, timeout=None):
+            if json["summary"] == "Event 3":
+                return self._response(500, "boom")
+            return self._response(201)
+
+        session = Mock()
+        session.post.side_effect = post
+        session.__enter__ = Mock(return_value=session)
+        session.__exit__ = Mock(return_value=False)
+        with patch("clients.icsclient.requests.Session", return_value=session):
+            results = client.create_events("cal1", "42", events)
+
+        assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+        assert [r["status"] for r in results] == ["ok", "ok", "ok", "error", "ok"]
+        assert results[3]["error"] == "500 boom"
+        assert results[3]["unavailable"] is True
+        assert "unavailable" not in results[0]
+        assert session.post.call_count == 5
+
+    def test_create_events_network_error(self, client):
+        """Exceptions are reported as item errors instead of being raised"""
+        session = Mock()
+        session.post.side_effect = ConnectionError("unreachable")
+        session.__enter__ = Mock(return_value=session)
+        session.__exit__ = Mock(return_value=False)
+        with patch("clients.icsclient.requests.Session", return_value=session):
+            results = client.create_events("cal1", "42", [{"summary": "A"}])
+
+        assert results == [
+            {"index": 0, "status": "error", "error": "unreachable", "unavailable": True}
+        ]
+
+    def test_create_events_session_per_thread(self, client):
+        """Worker threads never share a requests.Session"""
+        users = {}
+
+        def make_session():
+            session = Mock()
+
+            def post(url, **kwargs):
+                users.setdefault(id(session), set()).add(threading.get_ident())
+                return self._response(201)
+
+            session.post.side_effect = post
+            made.append(session)
+            return session
+
+        made = []
+        events = [{"summary": str(i)} for i in range(20)]
+        with patch("clients.icsclient.requests.Session", side_effect=make_session):
+            results = client.create_events("cal1", "42", events)
+
+        assert all(r["status"] == "ok" for r in results)
+        assert 1 <= len(made) <= 3
+        assert all(len(threads) == 1 for threads in users.values())
+        assert all(session.close.called for session in made)
+
+    def test_create_events_empty(self, client):
+        """Empty batch makes no requests"""
+        with patch("clients.icsclient.requests.Session") as mock_session:
+            assert client.create_events("cal1", "42", []) == []
+        mock_session.assert_not_called()
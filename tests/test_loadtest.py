@@ -0,0 +1,150 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import random
+import tempfile
+import pytest
+from fastapi.testclient import TestClient
+from telegram import Bot, Update
+from loadtest.harness import Sample, classify, make_update, percentile, summarize
+from loadtest.index_stub import AIStudioStub
+from loadtest.stubs import StubSettings, create_stub_app, model_response
+from services.config_service import Config
+from services.yandex_index_service import YandexIndexService, get_sdk
+
+
+def sample(kind, update_id, user_id, started, finished, injected=None):
+    s = Sample(kind, update_id, user_id)
+    s.injected = started if injected is None else injected
+    s.started = started
+    s.finished = finished
+    return s
+
+
+class TestStubs:
+    """HTTP and gRPC stand-ins of the external services"""
+
+    @pytest.fixture
+    def client(self):
+        settings = StubSettings(gpt_latency=0, stt_latency=0, ics_latency=0)
+        return TestClient(create_stub_app(settings))
+
+    def test_tool_script_steps_through_conversation(self):
+        script = [{"tool": "list_calendars", "arguments": {}}, {"text": "Готово"}]
+        body = {"input": [{"role": "user", "content": "Календари?"}]}
+
+        first = model_response(body, script)
+        call = first["output"][0]
+        assert call["type"] == "function_call"
+        assert call["name"] == "list_calendars"
+
+        body["input"] += [call, {"type": "function_call_output", "output": "{}"}]
+        second = model_response(body, script)
+        assert second["output"][0]["content"][0]["text"] == "Готово"
+
+    def test_sent_messages_are_recorded(self, client):
+        response = client.post(
+            "/telegram/bot1:T/sendMessage", data={"chat_id": "42", "text": "Привет"}
+        )
+        assert response.json()["result"]["chat"]["id"] == 42
+
+        sent = client.get("/_loadtest/sent").json()["sent"]
+        assert [(m["chat_id"], m["text"]) for m in sent] == [(42, "Привет")]
+
+    def test_voice_file_download(self, client):
+        result = client.post(
+            "/telegram/bot1:T/getFile", data={"file_id": "voice-7"}
+        ).json()["result"]
+        content = client.get(f"/telegram/file/bot1:T/{result['file_path']}").content
+        assert result["file_path"].endswith(".oga")
+        assert len(content) == result["file_size"]
+
+    def test_ics_calendars(self, client):
+        calendars = client.get("/ics/calendars", params={"user_id": "5"}).json()
+        assert calendars["calendars"][0]["id"] == "cal-5"
+        response = client.post("/ics/calendars/cal-5/events", json={"summary": "A"})
+        assert response.status_code == 201
+
+    def test_search_indexes_through_sdk(self):
+        stub = AIStudioStub()
+        config = Config(
+            {
+                "ycloud": {
+                    "api_key": "k",
+                    "folder_id": "f",
+                    "endpoint": stub.start(),
+                    "verify": False,
+                }
+            }
+        )
+        try:
+            service = YandexIndexService(get_sdk(config), "f", None)
+            with tempfile.NamedTemporaryFile("w", suffix=".txt") as f:
+                f.write("notes")
+                f.flush()
+                first = service.upload_file_to_index(f.name, "a.txt", "index_a")
+                second = service.upload_file_to_index(f.name, "b.txt", "index_b")
+                again = service.upload_file_to_index(f.name, "c.txt", "index_a")
+            found = service.get_index_by_name("index_b")
+        finally:
+            stub.stop()
+
+        assert first != second
+        assert again == first
+        assert found.id == second
+
+
+class TestReport:
+    """Synthetic updates, reply matching and latency statistics"""
+
+    @pytest.mark.parametrize("kind", ["text", "voice", "document", "calendar"])
+    def test_updates_parse(self, kind):
+        data = make_update(kind, 1, 500, random.Random(1))
+        update = Update.de_json(data, Bot("1:T"))
+        assert update.effective_user.id == 500
+        if kind == "calendar":
+            assert update.message.text.startswith("/calendars")
+            assert update.message.entities[0].type == "bot_command"
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50.5
+        assert percentile(values, 99) == pytest.approx(99.01)
+        assert percentile([], 95) is None
+
+    def test_replies_are_matched_by_chat_and_time(self):
+        samples = [
+            sample("text", 1, 7, started=10.0, finished=11.0),
+            sample("text", 2, 7, started=11.0, finished=12.0),
+            sample("voice", 3, 8, started=10.0, finished=13.0),
+            sample("document", 4, 9, started=10.0, finished=None),
+            sample("calendar", 5, 9, started=9.0, finished=9.5),
+        ]
+        sent = [
+            {"chat_id": 7, "text": "Ответ", "time": 10.5},
+            {"chat_id": 7, "text": "Ошибка: timeout", "time": 11.5},
+            {"chat_id": 8, "text": "Не удалось обработать аудиофайл.", "time": 12.0},
+            {"chat_id": 9, "text": "У вас нет добавленных календарей.", "time": 9.2},
+        ]
+
+        errors = classify(samples, sent, failed=set())
+
+        assert errors == {2: "error reply", 3: "error reply", 4: "timeout"}
+
+    def test_summary_per_type(self):
+        samples = [
+            sample("text", i, 1, started=0.0, finished=(i + 1) / 10) for i in range(10)
+        ]
+        samples.append(sample("voice", 10, 2, started=0.0, finished=None))
+
+        report = summarize(samples, {10: "timeout"}, elapsed=2.0)
+
+        assert report["text"]["completed"] == 10
+        assert report["text"]["throughput"] == 5.0
+        assert report["text"]["p50_ms"] == pytest.approx(550)
+        assert report["voice"]["error_rate"] == 1.0
+        assert report["voice"]["p99_ms"] is None
+        assert report["all"]["count"] == 11
+        assert report["all"]["errors"] == {"timeout": 1}
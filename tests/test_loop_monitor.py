@@ -0,0 +1,69 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import time
+import pytest
+from services.loop_monitor import LoopLagMonitor, handler_context
+
+
+def blocking_call():
+    time.sleep(0.3)
+
+
+class TestLoopLagMonitor:
+    """Detection of event loop stalls and their source"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.allow_loop_block
+    async def test_block_is_reported_with_handler_and_frame(self):
+        reported = []
+        monitor = LoopLagMonitor(threshold=0.05, on_block=reported.append)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            with handler_context(handler="TextHandler", user_id=42):
+                blocking_call()
+            await asyncio.sleep(0.1)
+        finally:
+            monitor.stop()
+
+        assert len(reported) == 1
+        [block] = monitor.blocks
+        assert block is reported[0]
+        assert block["handler"] == "TextHandler"
+        assert block["user_id"] == 42
+        assert "test_loop_monitor.py" in block["frame"]
+        assert block["frame"].endswith("in blocking_call")
+        assert block["duration"] >= 0.25
+        assert "stack" not in monitor.stats()[0]
+
+    @pytest.mark.asyncio
+    async def test_short_pauses_are_not_reported(self):
+        monitor = LoopLagMonitor(threshold=0.2)
+        monitor.start()
+        try:
+            for _ in range(5):
+                time.sleep(0.02)
+                await asyncio.sleep(0.02)
+        finally:
+            monitor.stop()
+
+        assert not monitor.blocks
+
+    @pytest.mark.asyncio
+    async def test_context_is_removed_after_handler(self):
+        monitor = LoopLagMonitor(threshold=0.05)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            with handler_context(handler="AudioHandler", user_id=1):
+                pass
+            blocking_call()
+            await asyncio.sleep(0.1)
+        finally:
+            monitor.stop()
+
+        assert monitor.blocks[0]["handler"] is None
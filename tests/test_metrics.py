@@ -0,0 +1,143 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from fastapi.testclient import TestClient
+from telegram import Bot
+from services.api_server import ApiServer
+from services.config_service import Config
+from services.metrics import (
+    HANDLER_SECONDS,
+    MetricsRegistry,
+    metrics,
+    render,
+    with_labels,
+)
+
+
+class TestMetricsRegistry:
+    """Histograms, counters and the Prometheus text format"""
+
+    @pytest.fixture
+    def registry(self):
+        return MetricsRegistry(enabled=True)
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        histogram = registry.histogram("op_seconds", "Op time", ["op"], [0.1, 1])
+        histogram.observe(0.05, op="a")
+        histogram.observe(0.5, op="a")
+        histogram.observe(5, op="a")
+
+        text = render(registry.collect())
+
+        assert "# TYPE op_seconds histogram" in text
+        assert 'op_seconds_bucket{op="a",le="0.1"} 1' in text
+        assert 'op_seconds_bucket{op="a",le="1"} 2' in text
+        assert 'op_seconds_bucket{op="a",le="+Inf"} 3' in text
+        assert 'op_seconds_count{op="a"} 3' in text
+        assert 'op_seconds_sum{op="a"} 5.55' in text
+
+    def test_disabled_registry_records_nothing(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("op_seconds", "Op time")
+        counter = registry.counter("errors_total", "Errors")
+
+        with histogram.time():
+            pass
+        counter.inc()
+
+        assert all(not family["samples"] for family in registry.collect())
+
+    def test_timed_decorator(self, registry):
+        histogram = registry.histogram("call_seconds", "Call time", ["name"])
+
+        @histogram.timed(name="sync")
+        def work():
+            return 42
+
+        assert work() == 42
+        assert 'call_seconds_count{name="sync"} 1' in render(registry.collect())
+
+    @pytest.mark.asyncio
+    async def test_timed_decorator_async(self, registry):
+        histogram = registry.histogram("call_seconds", "Call time", ["name"])
+
+        @histogram.timed(name="async")
+        async def work():
+            return 42
+
+        assert await work() == 42
+        assert 'call_seconds_count{name="async"} 1' in render(registry.collect())
+
+    def test_families_from_processes_are_merged(self, registry):
+        counter = registry.counter("sent_total", "Sent", ["endpoint"])
+        counter.inc(endpoint="sendMessage")
+        families = registry.collect() + with_labels(registry.collect(), worker=1)
+
+        text = render(families)
+
+        assert text.count("# TYPE sent_total counter") == 1
+        assert 'sent_total{endpoint="sendMessage"} 1' in text
+        assert 'sent_total{worker="1",endpoint="sendMessage"} 1' in text
+
+    def test_label_values_are_escaped(self, registry):
+        registry.counter("x_total", "X", ["v"]).inc(v='a"b\\c')
+        assert 'x_total{v="a\\"b\\\\c"} 1' in render(registry.collect())
+
+    def test_duplicate_name_rejected(self, registry):
+        registry.counter("x_total", "X")
+        with pytest.raises(ValueError):
+            registry.counter("x_total", "X")
+
+
+class TestMetricsEndpoint:
+    """GET /metrics on the API server"""
+
+    @pytest.fixture
+    def make_client(self, tmp_path):
+        def make(enabled):
+            config = Config(
+                {
+                    "yandex": {"key": "test"},
+                    "api": {
+                        "delivery_queue_file": str(tmp_path / "queue.json"),
+                        "metrics": enabled,
+                    },
+                }
+            )
+            server = ApiServer(
+                api_key="api-key", bot=Bot("123:TEST"), port=5200, config=config
+            )
+            return TestClient(server.app)
+
+        return make
+
+    @pytest.fixture
+    def enabled(self):
+        metrics.enabled = True
+        yield
+        metrics.enabled = False
+        metrics.reset()
+
+    def test_metrics_are_exported(self, make_client, enabled):
+        HANDLER_SECONDS.observe(0.2, handler="TextHandler")
+
+        response = make_client(True).get(
+            "/metrics", headers={"Authorization": "Bearer api-key"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'avbot_handler_seconds_count{handler="TextHandler"} 1' in response.text
+
+    def test_metrics_need_api_key(self, make_client, enabled):
+        client = make_client(True)
+
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"x-api-key": "wrong"}).status_code == 401
+        assert client.get("/metrics", headers={"x-api-key": "api-key"}).status_code == 200
+
+    def test_endpoint_off_by_default(self, make_client):
+        assert make_client(False).get("/metrics").status_code == 404
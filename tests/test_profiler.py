@@ -0,0 +1,189 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock, Mock
+from fastapi.testclient import TestClient
+from telegram import Bot
+from services.api_server import ApiServer
+from services.config_service import Config
+from services.profiler import SamplingProfiler, profiler
+from services.sender_bridge import BridgeClient
+
+
+def busy_work(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+def profiles(directory):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.listdir(directory))
+
+
+class TestSamplingProfiler:
+    """Sampled and slow-request profiles written as collapsed stacks"""
+
+    @pytest.fixture
+    def make_profiler(self, tmp_path):
+        def make(**settings):
+            sampler = SamplingProfiler(
+                directory=str(tmp_path / "profiles"), interval=0.002, **settings
+            )
+            sampler.update(enabled=True)
+            return sampler
+
+        return make
+
+    @pytest.mark.asyncio
+    async def test_slow_request_is_written(self, make_profiler):
+        sampler = make_profiler(sample_rate=0, slow_threshold=0.05)
+
+        with sampler.profile("handler", "TextHandler"):
+            busy_work(0.1)
+        # Written from a thread, not on the event loop
+        assert profiles(sampler.directory) == []
+        await sampler.flush()
+
+        [name] = profiles(sampler.directory)
+        assert "-handler-TextHandler-" in name and "-slow-" in name
+        with open(os.path.join(sampler.directory, name), encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) > 0
+        assert any("busy_work (test_profiler.py:" in line for line in lines)
+
+    @pytest.mark.asyncio
+    async def test_thread_work_is_attributed(self, make_profiler):
+        sampler = make_profiler(sample_rate=1, slow_threshold=10)
+
+        with sampler.profile("handler", "AudioHandler"):
+            await asyncio.to_thread(busy_work, 0.05)
+        await sampler.flush()
+
+        [name] = profiles(sampler.directory)
+        assert "-sampled-" in name
+        with open(os.path.join(sampler.directory, name), encoding="utf-8") as f:
+            assert "busy_work" in f.read()
+
+    def test_fast_unsampled_request_is_not_written(self, make_profiler):
+        sampler = make_profiler(sample_rate=0, slow_threshold=10)
+
+        with sampler.profile("api", "/send"):
+            busy_work(0.01)
+
+        assert profiles(sampler.directory) == []
+
+    def test_disabled_profiler_is_noop(self, make_profiler):
+        sampler = make_profiler(sample_rate=1)
+        sampler.update(enabled=False)
+
+        with sampler.profile("api", "/send"):
+            busy_work(0.01)
+
+        assert sampler._thread is None
+
+    def test_directory_is_rotated(self, make_profiler):
+        sampler = make_profiler(sample_rate=1, slow_threshold=10)
+        sampler.max_files = 2
+
+        for _ in range(4):
+            with sampler.profile("api", "/send"):
+                busy_work(0.02)
+
+        assert len(profiles(sampler.directory)) == 2
+        assert sampler.written == 4
+
+
+class TestProfilingEndpoint:
+    """Runtime toggle of the profiler through the API"""
+
+    @pytest.fixture
+    def client(self, tmp_path):
+        config = Config(
+            {
+                "yandex": {"key": "test"},
+                "api": {"delivery_queue_file": str(tmp_path / "queue.json")},
+            }
+        )
+        server = ApiServer(
+            api_key="api-key", bot=Bot("123:TEST"), port=5200, config=config
+        )
+        directory = profiler.directory
+        profiler.directory = str(tmp_path / "profiles")
+        yield TestClient(server.app)
+        profiler.update(enabled=False)
+        profiler.directory = directory
+
+    def test_requires_api_key(self, client):
+        assert client.post("/profiling", json={"enabled": True}).status_code == 401
+        assert profiler.enabled is False
+
+    def test_toggle(self, client):
+        response = client.post(
+            "/profiling",
+            json={"enabled": True, "sample_rate": 1},
+            headers={"x-api-key": "api-key"},
+        )
+
+        assert response.status_code == 200
+        assert response.json()["enabled"] is True
+        assert profiler.sample_rate == 1
+
+        state = client.get("/profiling", headers={"x-api-key": "api-key"}).json()
+        assert state["enabled"] is True
+        assert state["slow_threshold_ms"] == profiler.slow_threshold * 1000
+
+    @pytest.mark.asyncio
+    async def test_toggle_reaches_workers(self, tmp_path):
+        config = Config({"api": {"delivery_queue_file": str(tmp_path / "q.json")}})
+        sent = []
+        server = ApiServer(
+            api_key="api-key",
+            bot=Bot("123:TEST"),
+            port=5200,
+            config=config,
+            worker_profiling=sent.append,
+        )
+        try:
+            state = await server.set_profiling({"sample_rate": 0.5})
+        finally:
+            profiler.update(sample_rate=0.01)
+
+        assert state["sample_rate"] == 0.5
+        assert sent == [{"sample_rate": 0.5}]
+
+    @pytest.mark.asyncio
+    async def test_api_process_takes_over_sender_settings(self, tmp_path):
+        config = Config({"api": {"delivery_queue_file": str(tmp_path / "q.json")}})
+        server = ApiServer(
+            api_key="api-key",
+            bot=None,
+            port=5200,
+            config=config,
+            bridge=BridgeClient(str(tmp_path / "sender.sock")),
+        )
+        server.core = Mock()
+        server.core.profiling_state = AsyncMock(
+            return_value={"enabled": False, "sample_rate": 0.25, "written": 3}
+        )
+        try:
+            await server._sync_profiling()
+            assert profiler.sample_rate == 0.25
+            # Pushed by the sender after a change made in another API process
+            server.bridge.on_event("profiling", {"sample_rate": 0.75})
+            assert profiler.sample_rate == 0.75
+        finally:
+            profiler.update(sample_rate=0.01)
+
+    def test_invalid_sample_rate(self, client):
+        response = client.post(
+            "/profiling", json={"sample_rate": 2}, headers={"x-api-key": "api-key"}
+        )
+        assert response.status_code == 422
@@ -0,0 +1,130 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock
+from telegram.error import RetryAfter
+from services.rate_limiter import BULK, PriorityRateLimiter
+
+
+async def _send(limiter, chat_id, log, name, rate_limit_args=None):
+    async def callback():
+        log.append(name)
+        return True
+
+    return await limiter.process_request(
+        callback, (), {}, "sendMessage", {"chat_id": chat_id}, rate_limit_args
+    )
+
+
+class TestPriorityRateLimiter:
+    """Test suite for the outbound Telegram scheduler"""
+
+    @pytest.mark.asyncio
+    async def test_interactive_overtakes_bulk(self):
+        # Global bucket allows one message per 50 ms
+        limiter = PriorityRateLimiter(overall_rate=20, chat_rate=100, chat_burst=100)
+        limiter.overall.tokens = 0
+        log = []
+
+        bulk = [
+            asyncio.create_task(_send(limiter, i, log, f"bulk{i}", BULK))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(_send(limiter, 99, log, "reply"))
+        await asyncio.gather(*bulk, interactive)
+
+        assert log[0] == "reply"
+        await limiter.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_per_chat_limit_does_not_block_other_chats(self):
+        limiter = PriorityRateLimiter(overall_rate=1000, chat_rate=5, chat_burst=1)
+        log = []
+
+        started = time.monotonic()
+        await asyncio.gather(
+            _send(limiter, 1, log, "a1"),
+            _send(limiter, 1, log, "a2"),
+            _send(limiter, 2, log, "b1"),
+        )
+        elapsed = time.monotonic() - started
+
+        # Second message to chat 1 waits ~200 ms, chat 2 goes right away
+        assert log.index("b1") < log.index("a2")
+        assert 0.15 < elapsed < 1.0
+        await limiter.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_parked_chat_keeps_order_and_survives_cancel(self):
+        limiter = PriorityRateLimiter(overall_rate=1000, chat_rate=50, chat_burst=1)
+        log = []
+
+        # A long batch for one chat waits in that chat's queue
+        batch = [
+            asyncio.create_task(_send(limiter, 1, log, f"m{i}", BULK))
+            for i in range(20)
+        ]
+        await asyncio.sleep(0.03)
+        batch[5].cancel()
+        await _send(limiter, 2, log, "other")
+        await asyncio.gather(*batch, return_exceptions=True)
+
+        sent = [name for name in log if name != "other"]
+        assert sent == [f"m{i}" for i in range(20) if i != 5]
+        assert log.index("other") < log.index("m6")
+        assert not limiter._parked and limiter.stats()["lanes"]["bulk"]["queued"] == 0
+        await limiter.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_retry_after_is_retried(self):
+        limiter = PriorityRateLimiter(overall_rate=1000, chat_rate=1000, chat_burst=10)
+        callback = AsyncMock(side_effect=[RetryAfter(0), {"ok": True}])
+
+        result = await limiter.process_request(
+            callback, (), {}, "sendMessage", {"chat_id": 1}, None
+        )
+
+        assert result == {"ok": True}
+        assert callback.await_count == 2
+        assert limiter.stats()["retry_after"] == 1
+        await limiter.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_retry_after_gives_up(self):
+        limiter = PriorityRateLimiter(overall_rate=1000, chat_rate=1000, chat_burst=10)
+        callback = AsyncMock(side_effect=RetryAfter(0))
+
+        with pytest.raises(RetryAfter):
+            await limiter.process_request(
+                callback, (), {}, "sendMessage", {"chat_id": 1}, {"max_retries": 1}
+            )
+        assert callback.await_count == 2
+        await limiter.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_requests_without_chat_are_not_queued(self):
+        limiter = PriorityRateLimiter(overall_rate=1)
+        limiter.overall.tokens = 0
+        callback = AsyncMock(return_value=True)
+
+        await asyncio.wait_for(
+            limiter.process_request(callback, (), {}, "getMe", {}, None), timeout=0.5
+        )
+        assert limiter.stats()["lanes"]["interactive"]["sent"] == 0
+
+    @pytest.mark.asyncio
+    async def test_stats_report_lanes(self):
+        limiter = PriorityRateLimiter()
+        await _send(limiter, 1, [], "x", BULK)
+
+        stats = limiter.stats()
+        assert stats["lanes"]["bulk"]["sent"] == 1
+        assert stats["lanes"]["bulk"]["queued"] == 0
+        assert stats["lanes"]["interactive"]["sent"] == 0
+        await limiter.shutdown()
@@ -0,0 +1,180 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from unittest.mock import Mock, patch
+import pytest
+from services.config_service import Config
+from services.dialog_service import DialogService
+from storage.abs_storage import DEFAULT_TOPIC
+from storage.factory import get_storage
+from storage.file_storage import FileDialogStorage
+from storage.redis_storage import RedisDialogStorage
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def client():
+    # AVBOT_REDIS_URL runs the tests against a real (scratch!) database
+    url = os.environ.get("AVBOT_REDIS_URL")
+    if not url:
+        return fakeredis.FakeRedis(decode_responses=True)
+    import redis
+
+    client = redis.Redis.from_url(url, decode_responses=True)
+    client.flushdb()
+    return client
+
+
+@pytest.fixture
+def storage(client):
+    return RedisDialogStorage(client, max_messages=5)
+
+
+def message(i, role="user"):
+    return {"role": role, "text": f"Сообщение {i}"}
+
+
+class TestRedisDialogStorage:
+    """Test suite for the Redis dialog storage"""
+
+    def test_new_user_gets_default_dialog(self, storage):
+        assert storage.load_dialog(1) == {
+            "current_topic": DEFAULT_TOPIC,
+            "topics": {DEFAULT_TOPIC: {"messages": []}},
+        }
+        assert storage.get_last_messages(1) == []
+
+    def test_save_and_load_round_trip(self, storage):
+        dialog = {
+            "current_topic": "work",
+            "topics": {
+                DEFAULT_TOPIC: {"messages": [message(1)]},
+                "work": {"messages": [message(2), message(3)], "index_id": "idx"},
+            },
+        }
+        storage.save_dialog(1, dialog)
+
+        assert storage.load_dialog(1) == dialog
+        assert storage.get_current_topic(1) == "work"
+
+    def test_save_drops_removed_topics(self, storage, client):
+        storage.save_dialog(1, {"topics": {"old": {"messages": [message(1)]}}})
+        storage.save_dialog(1, {"topics": {DEFAULT_TOPIC: {"messages": []}}})
+
+        assert "old" not in storage.load_dialog(1)["topics"]
+        assert client.keys("*messages:old") == []
+
+    def test_messages_are_capped_lists(self, storage, client):
+        for i in range(8):
+            storage.append_message(1, message(i))
+
+        key = "avbot:dialog:{1}:messages:default"
+        assert client.type(key) == "list"
+        assert client.llen(key) == 5
+        assert storage.get_last_messages(1, 3) == [message(5), message(6), message(7)]
+
+    def test_append_goes_to_current_topic(self, storage):
+        service = DialogService(storage)
+        service.set_current_topic(1, "work")
+        service.add_message_to_topic(1, message(1))
+        service.add_message_to_topic(1, message(2), DEFAULT_TOPIC)
+
+        assert storage.get_last_messages(1) == [message(1)]
+        assert storage.get_last_messages(1, topic_name=DEFAULT_TOPIC) == [message(2)]
+
+    def test_unknown_topic_falls_back_to_default(self, storage):
+        storage.append_message(1, message(1))
+        assert storage.get_last_messages(1, topic_name="missing") == [message(1)]
+
+    def test_ttl_is_set_on_written_keys(self, client):
+        storage = RedisDialogStorage(client, ttl=60)
+        storage.append_message(1, message(1))
+
+        keys = client.keys("avbot:dialog:{1}:*")
+        assert len(keys) == 3
+        assert all(0 < client.ttl(key) <= 60 for key in keys)
+
+    def test_append_refreshes_ttl_of_other_topics(self, client):
+        storage = RedisDialogStorage(client, ttl=60)
+        storage.append_message(1, message(1), topic_name="a")
+        storage.append_message(1, message(2), topic_name="b")
+        client.expire("avbot:dialog:{1}:messages:a", 5)
+
+        storage.append_message(1, message(3), topic_name="b")
+
+        assert client.ttl("avbot:dialog:{1}:messages:a") > 5
+        assert storage.load_dialog(1)["topics"]["a"]["messages"] == [message(1)]
+
+    def test_unavailable_redis_is_logged(self, caplog):
+        storage = RedisDialogStorage(url="redis://127.0.0.1:1/0")
+
+        assert storage.get_last_messages(1) == []
+        storage.append_message(1, message(1))
+        assert "Error saving message for user 1" in caplog.text
+
+    def test_failed_load_is_never_saved_back(self, storage, client):
+        service = DialogService(storage)
+        service.add_message_to_topic(1, message(1))
+        pipeline = client.pipeline
+
+        def broken(*args, **kwargs):
+            pipe = pipeline(*args, **kwargs)
+            pipe.execute = Mock(side_effect=ConnectionError("connection lost"))
+            return pipe
+
+        # The first pipeline of load_dialog fails during /topic work
+        with patch.object(client, "pipeline", side_effect=broken):
+            with pytest.raises(ConnectionError):
+                service.set_current_topic(1, "work")
+            with pytest.raises(ConnectionError):
+                service.set_topic_index(1, "work", "idx")
+
+        assert storage.get_last_messages(1) == [message(1)]
+        assert storage.get_current_topic(1) == DEFAULT_TOPIC
+
+
+class TestDialogStorageParity:
+    """The Redis backend behaves like the file backend through DialogService"""
+
+    def run(self, storage):
+        service = DialogService(storage)
+        service.add_message_to_topic(7, message(1))
+        service.set_current_topic(7, "plans")
+        service.add_message_to_topic(7, message(2, "assistant"))
+        service.set_topic_index(7, "plans", "idx-1")
+        service.add_message_to_topic(7, message(3))
+        return (
+            service.get_last_messages(7, 2),
+            service.get_last_messages(7, 15, DEFAULT_TOPIC),
+            storage.load_dialog(7),
+        )
+
+    def test_same_results(self, tmp_path, client):
+        assert self.run(RedisDialogStorage(client)) == self.run(
+            FileDialogStorage(str(tmp_path))
+        )
+
+
+class TestGetStorage:
+    """Test suite for choosing the storage backend from the config"""
+
+    def test_file_backend_by_default(self, tmp_path):
+        storage = get_storage(Config({"storage": {"dialogs_dir": str(tmp_path)}}))
+        assert isinstance(storage, FileDialogStorage)
+        assert storage.dialogs_dir == str(tmp_path)
+
+    def test_redis_backend_is_shared(self):
+        config = Config(
+            {"storage": {"backend": "redis", "redis": {"prefix": "t", "ttl": 5}}}
+        )
+        storage = get_storage(config)
+        assert isinstance(storage, RedisDialogStorage)
+        assert (storage.prefix, storage.ttl) == ("t", 5)
+        assert get_storage(config) is storage
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            get_storage(Config({"storage": {"backend": "ydb"}}))
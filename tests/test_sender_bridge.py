@@ -0,0 +1,184 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from telegram import Chat, Message
+from telegram.error import BadRequest, RetryAfter
+from services.rate_limiter import retry_after_seconds
+from services.sender_bridge import (
+    BridgeBot,
+    BridgeClient,
+    BridgeCore,
+    BridgeError,
+    SenderBridgeServer,
+)
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.error = None
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.error:
+            raise self.error
+        self.sent.append((chat_id, text, kwargs))
+        return Message(
+            message_id=len(self.sent),
+            date=datetime(2026, 1, 1, tzinfo=timezone.utc),
+            chat=Chat(id=chat_id, type="private"),
+            text=text,
+        )
+
+
+class FakeCore:
+    def __init__(self):
+        self.bot = FakeBot()
+        self.send_options = {"rate_limit_args": "bulk"}
+        self.events = []
+
+    async def calendar_event(self, payload):
+        self.events.append(payload)
+        return "duplicate" if len(self.events) > 1 else "queued"
+
+    async def core_health(self):
+        return {"outbound": None, "workers": None}
+
+
+class TestSenderBridge:
+    """API process calls reaching the sender process over the Unix socket"""
+
+    @pytest.fixture
+    def core(self):
+        return FakeCore()
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        return str(tmp_path / "sender.sock")
+
+    @pytest.mark.asyncio
+    async def test_send_message_round_trip(self, core, path):
+        server = SenderBridgeServer(core, path)
+        await server.start()
+        client = BridgeClient(path)
+        try:
+            message = await BridgeBot(client).send_message(chat_id=42, text="hi")
+        finally:
+            await client.close()
+            await server.stop()
+
+        assert isinstance(message, Message)
+        assert message.chat.id == 42
+        assert message.text == "hi"
+        # Bridged sends go out with the sender's bulk rate limit options
+        assert core.bot.sent == [(42, "hi", {"rate_limit_args": "bulk"})]
+        assert not os.path.exists(path)
+
+    @pytest.mark.asyncio
+    async def test_telegram_errors_keep_their_type(self, core, path):
+        server = SenderBridgeServer(core, path)
+        await server.start()
+        client = BridgeClient(path)
+        bot = BridgeBot(client)
+        try:
+            core.bot.error = RetryAfter(timedelta(seconds=7))
+            with pytest.raises(RetryAfter) as excinfo:
+                await bot.send_message(chat_id=1, text="x")
+            assert retry_after_seconds(excinfo.value) == 7
+
+            core.bot.error = BadRequest("Chat not found")
+            with pytest.raises(BadRequest, match="Chat not found"):
+                await bot.send_message(chat_id=1, text="x")
+        finally:
+            await client.close()
+            await server.stop()
+
+    @pytest.mark.asyncio
+    async def test_core_calls_and_stats(self, core, path):
+        server = SenderBridgeServer(core, path)
+        await server.start()
+        client = BridgeClient(path)
+        bridged = BridgeCore(client)
+        try:
+            assert await bridged.calendar_event({"summary": "a"}) == "queued"
+            assert await bridged.calendar_event({"summary": "a"}) == "duplicate"
+            health = await bridged.core_health()
+        finally:
+            await client.close()
+            await server.stop()
+
+        assert core.events == [{"summary": "a"}, {"summary": "a"}]
+        assert health["bridge"]["client"]["calendar_event"]["calls"] == 2
+        assert health["bridge"]["server"]["methods"]["calendar_event"]["errors"] == 0
+
+    @pytest.mark.asyncio
+    async def test_unknown_method_rejected(self, core, path):
+        server = SenderBridgeServer(core, path)
+        await server.start()
+        client = BridgeClient(path)
+        try:
+            with pytest.raises(BridgeError, match="Unknown method"):
+                await client.call("set_webhook", url="http://example.com")
+        finally:
+            await client.close()
+            await server.stop()
+
+    @pytest.mark.asyncio
+    async def test_sender_unavailable(self, path):
+        client = BridgeClient(path)
+        with pytest.raises(BridgeError, match="Sender unavailable"):
+            await client.call("send_message", chat_id=1, text="x")
+
+    @pytest.mark.asyncio
+    async def test_socket_is_private(self, core, path):
+        server = SenderBridgeServer(core, path)
+        await server.start()
+        try:
+            assert os.stat(path).st_mode & 0o777 == 0o600
+        finally:
+            await server.stop()
+
+    @pytest.mark.asyncio
+    async def test_timeout_is_a_bridge_error(self, core, path):
+        async def calendar_event(payload):
+            await asyncio.sleep(1)
+
+        core.calendar_event = calendar_event
+        server = SenderBridgeServer(core, path)
+        await server.start()
+        client = BridgeClient(path, timeout=0.05)
+        try:
+            with pytest.raises(BridgeError, match="did not answer calendar_event"):
+                await BridgeCore(client).calendar_event({"summary": "a"})
+        finally:
+            await client.close()
+            await server.stop()
+
+    @pytest.mark.asyncio
+    async def test_profiling_settings_pushed_to_all_clients(self, core, path):
+        async def set_profiling(settings):
+            return {"enabled": True, "sample_rate": settings["sample_rate"]}
+
+        core.set_profiling = set_profiling
+        server = SenderBridgeServer(core, path)
+        await server.start()
+        caller, other = BridgeClient(path), BridgeClient(path)
+        events = []
+        other.on_event = lambda event, data: events.append((event, data))
+        try:
+            await other.call("core_health")
+            await BridgeCore(caller).set_profiling({"sample_rate": 0.5})
+            for _ in range(50):
+                if events:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await caller.close()
+            await other.close()
+            await server.stop()
+
+        assert events == [("profiling", {"enabled": True, "sample_rate": 0.5})]
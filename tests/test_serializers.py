@@ -0,0 +1,132 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import time
+import pytest
+from services.dialog_service import DialogService
+from storage.file_storage import FileDialogStorage
+from storage.locks import DialogLocks
+from storage.migrate import DialogCompactor
+from storage.serializers import DialogSerializer, detect, get_serializer
+
+SPECS = ["json", "json-pretty", "msgpack", "json+gzip", "msgpack+zstd"]
+
+DIALOG = {
+    "current_topic": "default",
+    "topics": {
+        "default": {
+            "messages": [
+                {"role": "user", "text": "Что у меня завтра?"},
+                {"role": "assistant", "text": "Встреча в 10:00 ✅"},
+            ]
+        },
+        "work": {"messages": [], "index_id": "idx-1"},
+    },
+}
+
+
+class TestSerializers:
+    """Test suite for dialog codecs and format detection"""
+
+    @pytest.mark.parametrize("spec", SPECS)
+    def test_any_format_is_read_back(self, spec):
+        raw = get_serializer(spec).dumps(DIALOG)
+
+        assert detect(raw) == get_serializer(spec).format
+        # Read by a serializer configured for a different format
+        assert DialogSerializer().loads(raw) == DIALOG
+        assert get_serializer("msgpack+zstd").loads(raw) == DIALOG
+
+    def test_legacy_pretty_json_files(self):
+        legacy = json.dumps(DIALOG, ensure_ascii=False, indent=2).encode("utf-8")
+        assert get_serializer("msgpack").loads(legacy) == DIALOG
+        assert get_serializer().loads(b"\xef\xbb\xbf" + legacy) == DIALOG
+
+    def test_compact_json_is_smaller(self):
+        compact = get_serializer("json").dumps(DIALOG)
+        assert json.loads(compact) == DIALOG
+        assert len(compact) < len(get_serializer("json-pretty").dumps(DIALOG))
+
+    def test_unknown_spec(self):
+        with pytest.raises(ValueError):
+            get_serializer("yaml")
+        with pytest.raises(ValueError):
+            get_serializer("json+lzma")
+
+
+class TestFileFormats:
+    """Test suite for dialog files in several formats"""
+
+    def test_storage_reads_files_written_in_another_format(self, tmp_path):
+        old = DialogService(FileDialogStorage(str(tmp_path)))
+        old.add_message_to_topic(1, {"text": "json"})
+
+        storage = FileDialogStorage(str(tmp_path), serializer=get_serializer("msgpack"))
+        DialogService(storage).add_message_to_topic(1, {"text": "msgpack"})
+
+        with open(tmp_path / "1.json", "rb") as f:
+            assert detect(f.read()) == "msgpack"
+        assert old.get_last_messages(1) == [{"text": "json"}, {"text": "msgpack"}]
+
+    def test_cold_dialogs_are_compacted(self, tmp_path):
+        storage = FileDialogStorage(str(tmp_path))
+        service = DialogService(storage)
+        for user_id in (1, 2):
+            service.add_message_to_topic(user_id, {"text": "x" * 500})
+        idle = time.time() - 3600
+        os.utime(tmp_path / "1.json", (idle, idle))
+
+        compactor = DialogCompactor(storage, get_serializer("msgpack+zstd"), 600)
+
+        assert compactor.compact_all() == 1
+        assert compactor.saved_bytes > 0
+        with open(tmp_path / "1.json", "rb") as f:
+            assert detect(f.read()) == "zstd"
+        assert service.get_last_messages(1) == [{"text": "x" * 500}]
+        # Already compacted, and user 2 is not idle
+        assert compactor.compact_all() == 0
+
+        # Next save writes the storage's own format again
+        service.add_message_to_topic(1, {"text": "back"})
+        with open(tmp_path / "1.json", "rb") as f:
+            assert detect(f.read()) == "json"
+
+    def test_save_from_another_lock_domain_is_not_overwritten(self, tmp_path):
+        storage = FileDialogStorage(str(tmp_path))
+        DialogService(storage).add_message_to_topic(1, {"text": "old"})
+        idle = time.time() - 3600
+        os.utime(tmp_path / "1.json", (idle, idle))
+        # Another worker process: same files, its own in-process locks
+        other = DialogService(FileDialogStorage(str(tmp_path)), DialogLocks())
+        cold = get_serializer("msgpack+zstd")
+        dumps = cold.dumps
+
+        def save_meanwhile(dialog):
+            other.add_message_to_topic(1, {"text": "new"})
+            return dumps(dialog)
+
+        cold.dumps = save_meanwhile
+        compactor = DialogCompactor(storage, cold, 600, DialogLocks())
+
+        assert compactor.compact_all() == 0
+        assert other.get_last_messages(1) == [{"text": "old"}, {"text": "new"}]
+        assert not [p for p in os.listdir(tmp_path) if p.endswith(".tmp")]
+
+    def test_compactor_only_rewrites_owned_users(self, tmp_path):
+        storage = FileDialogStorage(str(tmp_path))
+        service = DialogService(storage)
+        idle = time.time() - 3600
+        for user_id in (1, 2):
+            service.add_message_to_topic(user_id, {"text": "x"})
+            os.utime(tmp_path / f"{user_id}.json", (idle, idle))
+
+        compactor = DialogCompactor(
+            storage, get_serializer("msgpack+zstd"), 600, owns=lambda u: u == 2
+        )
+
+        assert compactor.compact_all() == 1
+        with open(tmp_path / "1.json", "rb") as f:
+            assert detect(f.read()) == "json"
@@ -0,0 +1,71 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from services.skills import SkillRegistry, compile_template, skills
+
+
+class TestSkillRegistry:
+    """Test suite for the skills registry"""
+
+    @pytest.fixture
+    def directory(self, tmp_path):
+        (tmp_path / "prompt.md").write_text("Ты помощник.", encoding="utf-8")
+        (tmp_path / "template.md").write_text(
+            "*{title}* — {count:03d}\n`{uid}`", encoding="utf-8"
+        )
+        return tmp_path
+
+    @pytest.fixture
+    def registry(self, directory):
+        return SkillRegistry(directory, check_interval=0)
+
+    def test_loads_files_by_name(self, registry):
+        assert registry.text("prompt") == "Ты помощник."
+        assert registry.get("prompt.md").name == "prompt"
+        with pytest.raises(KeyError):
+            registry.get("missing")
+
+    def test_render_matches_str_format(self, registry, directory):
+        values = {"title": "Встреча", "count": 7, "uid": "abc"}
+        expected = (directory / "template.md").read_text(encoding="utf-8")
+        assert registry.render("template", **values) == expected.format(**values)
+
+    def test_reloads_only_changed_files(self, registry, directory):
+        prompt = registry.get("prompt")
+        template = registry.get("template")
+        version = registry.version
+
+        path = directory / "prompt.md"
+        path.write_text("Ты календарный помощник.", encoding="utf-8")
+        os.utime(path, ns=(0, prompt.mtime + 1_000_000_000))
+
+        assert registry.text("prompt") == "Ты календарный помощник."
+        assert registry.get("template") is template
+        assert registry.versions()["prompt"] != prompt.version
+        assert registry.version != version
+
+    def test_no_reload_between_checks(self, directory):
+        registry = SkillRegistry(directory, check_interval=3600)
+        registry.get("prompt")
+        (directory / "new.md").write_text("x", encoding="utf-8")
+
+        with pytest.raises(KeyError):
+            registry.get("new")
+        registry.request_reload()
+        assert registry.text("new") == "x"
+
+    def test_escaped_variant_is_cached(self, registry):
+        skill = registry.get("template")
+        assert skill.escaped is skill.escaped
+
+    def test_non_template_falls_back_to_format(self):
+        assert compile_template("{a.b}") is None
+        assert compile_template("unbalanced {") is None
+        assert compile_template("{a!r}") is None
+
+    def test_bundled_skills(self):
+        assert "system_prompt" in skills.versions()
+        assert "{summary}" in skills.text("event_template")
@@ -0,0 +1,56 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from clients.yandexgpt import YandexGPClient
+from services.config_service import Config
+from services.import_profile import format_report, import_times, total_ms
+from services.yandex_index_service import get_sdk
+
+# Maximum time `import bot` may take in a fresh interpreter
+BUDGET_MS = float(os.environ.get("AVBOT_IMPORT_BUDGET_MS", 700))
+
+# Imported on first use only, never when the bot module loads
+LAZY_PACKAGES = {"openai", "yandex_ai_studio_sdk", "pydub", "fastapi", "uvicorn"}
+
+
+@pytest.fixture(scope="module")
+def bot_imports(tmp_path_factory):
+    path = tmp_path_factory.mktemp("startup") / "config.yml"
+    path.write_text('bot: {token: "1:TEST"}\nyandex: {key: test}\n', encoding="utf-8")
+    return import_times("bot", env={"CONFIG_PATH": str(path)})
+
+
+class TestStartup:
+    """Import cost of the bot module"""
+
+    def test_import_budget(self, bot_imports):
+        elapsed = total_ms(bot_imports)
+        assert elapsed <= BUDGET_MS, (
+            f"import bot took {elapsed:.0f} ms (budget {BUDGET_MS:.0f} ms)\n"
+            + format_report(bot_imports, top=15)
+        )
+
+    def test_heavy_dependencies_are_lazy(self, bot_imports):
+        imported = {entry.module.split(".")[0] for entry in bot_imports}
+        assert not imported & LAZY_PACKAGES
+
+
+class TestLazyClients:
+    """Clients are built on first use and shared"""
+
+    def test_gpt_client_is_shared(self):
+        config = Config({"yandex": {"key": "test"}, "ycloud": {"folder_id": "f"}})
+        first, second = YandexGPClient(config), YandexGPClient(config)
+
+        assert first._client is None
+        assert first.client is second.client
+
+    def test_sdk_is_shared(self):
+        config = Config({"ycloud": {"api_key": "test", "folder_id": "f"}})
+        other = Config({"ycloud": {"api_key": "other", "folder_id": "f"}})
+
+        assert get_sdk(config) is get_sdk(config)
+        assert get_sdk(config) is not get_sdk(other)
@@ -0,0 +1,146 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import queue
+import pytest
+from collections import Counter
+from unittest.mock import AsyncMock, MagicMock, patch
+from telegram import Update
+from services.profiler import profiler
+from services.supervisor import PROFILING, HashRing, WorkerSupervisor, serve_worker
+
+
+def _update(update_id, user_id):
+    return Update.de_json(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 1767225600,
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": "Test"},
+                "text": "hi",
+            },
+        },
+        None,
+    )
+
+
+class TestHashRing:
+    """Test suite for the consistent hash ring"""
+
+    def test_keys_are_spread_over_nodes(self):
+        ring = HashRing(range(4))
+        counts = Counter(ring.node_for(user) for user in range(4000))
+        assert set(counts) == {0, 1, 2, 3}
+        assert min(counts.values()) > 600
+
+    def test_adding_node_moves_few_keys(self):
+        ring = HashRing(range(4))
+        before = {user: ring.node_for(user) for user in range(4000)}
+        ring.add(4)
+        after = {user: ring.node_for(user) for user in range(4000)}
+
+        moved = [user for user in before if before[user] != after[user]]
+        # Only keys taken over by the new node move
+        assert all(after[user] == 4 for user in moved)
+        assert len(moved) < 4000 * 0.35
+
+    def test_remove_restores_mapping(self):
+        ring = HashRing(range(3))
+        before = {user: ring.node_for(user) for user in range(500)}
+        ring.add(3)
+        ring.remove(3)
+        assert before == {user: ring.node_for(user) for user in range(500)}
+
+    def test_empty_ring(self):
+        with pytest.raises(LookupError):
+            HashRing().node_for(1)
+
+
+class TestWorkerSupervisor:
+    """Routing of updates to worker processes"""
+
+    @pytest.fixture
+    def supervisor(self):
+        supervisor = WorkerSupervisor(3, target=None)
+        supervisor._updates = [queue.Queue() for _ in range(3)]
+        supervisor._reports = queue.Queue()
+        return supervisor
+
+    def test_user_always_goes_to_same_worker(self, supervisor):
+        workers = {supervisor.route(_update(i, 42)) for i in range(10)}
+        assert len(workers) == 1
+
+        index = workers.pop()
+        assert supervisor._updates[index].qsize() == 10
+        assert supervisor._updates[index].get()["update_id"] == 0
+        assert supervisor.stats()[index]["routed"] == 10
+
+    def test_load_reports_are_collected(self, supervisor):
+        supervisor._reports.put({"worker": 1, "received": 5, "running": 2})
+        assert supervisor.stats()[1]["load"]["running"] == 2
+
+    def test_worker_metrics_are_labelled(self, supervisor):
+        family = {
+            "name": "avbot_handler_seconds_count",
+            "type": "counter",
+            "help": "",
+            "samples": [["avbot_handler_seconds_count", {"handler": "Text"}, 3]],
+        }
+        supervisor._reports.put({"worker": 2, "received": 1, "metrics": [family]})
+
+        assert "metrics" not in supervisor.stats()[2]["load"]
+        [reported] = supervisor.metrics()
+        assert reported["samples"] == [
+            ["avbot_handler_seconds_count", {"worker": "2", "handler": "Text"}, 3]
+        ]
+
+    def test_profiling_settings_reach_every_worker(self, supervisor):
+        supervisor.set_profiling({"enabled": True})
+
+        for updates in supervisor._updates:
+            assert updates.get_nowait() == {PROFILING: {"enabled": True}}
+
+    @pytest.mark.asyncio
+    async def test_serve_worker_applies_profiling(self):
+        application = MagicMock()
+        application.__aenter__ = AsyncMock(return_value=application)
+        application.__aexit__ = AsyncMock(return_value=False)
+        application.start = AsyncMock()
+        application.stop = AsyncMock()
+        application.update_queue = asyncio.Queue()
+        updates = queue.Queue()
+        updates.put({PROFILING: {"sample_rate": 0.5}})
+        updates.put(None)
+
+        with patch.object(profiler, "sample_rate", 0.01):
+            await asyncio.wait_for(
+                serve_worker(application, 0, updates, queue.Queue()), timeout=2
+            )
+            assert profiler.sample_rate == 0.5
+        assert application.update_queue.empty()
+
+    @pytest.mark.asyncio
+    async def test_serve_worker_feeds_application(self):
+        application = MagicMock()
+        application.__aenter__ = AsyncMock(return_value=application)
+        application.__aexit__ = AsyncMock(return_value=False)
+        application.start = AsyncMock()
+        application.stop = AsyncMock()
+        application.update_queue = asyncio.Queue()
+        application.bot = None
+        updates = queue.Queue()
+        updates.put(_update(7, 42).to_dict())
+        updates.put(None)
+
+        await asyncio.wait_for(
+            serve_worker(application, 0, updates, queue.Queue()), timeout=2
+        )
+
+        update = application.update_queue.get_nowait()
+        assert update.update_id == 7
+        application.stop.assert_awaited_once()
@@ -0,0 +1,140 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import json
+import logging
+import pytest
+from services.config_service import Config
+from services.tracing import (
+    BatchSpanProcessor,
+    JsonlExporter,
+    OtlpExporter,
+    Tracer,
+    current_trace_id,
+    install_log_context,
+)
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+class TestTracer:
+    """Spans, trace propagation and exporters"""
+
+    @pytest.fixture
+    def exporter(self):
+        return ListExporter()
+
+    @pytest.fixture
+    def tracer(self, exporter):
+        tracer = Tracer()
+        tracer.enabled = True
+        tracer.processor = BatchSpanProcessor(exporter)
+        return tracer
+
+    def test_nested_spans_share_trace(self, tracer, exporter):
+        with tracer.span("handle", handler="TextHandler") as root:
+            with tracer.span("storage.load") as child:
+                child.set(bytes=10)
+        tracer.flush()
+
+        load, handle = exporter.spans
+        assert load["trace_id"] == handle["trace_id"] == root.trace_id
+        assert load["parent_id"] == handle["span_id"]
+        assert handle["parent_id"] is None
+        assert load["attributes"] == {"bytes": 10}
+        assert handle["end"] >= load["end"] >= load["start"] >= handle["start"]
+
+    def test_separate_spans_start_new_traces(self, tracer, exporter):
+        with tracer.span("a"):
+            pass
+        with tracer.span("b"):
+            pass
+        tracer.flush()
+
+        assert exporter.spans[0]["trace_id"] != exporter.spans[1]["trace_id"]
+
+    @pytest.mark.asyncio
+    async def test_trace_follows_to_thread(self, tracer, exporter):
+        @tracer.traced("gpt.iteration")
+        def blocking():
+            return current_trace_id()
+
+        with tracer.span("handle") as root:
+            assert await asyncio.to_thread(blocking) == root.trace_id
+        tracer.flush()
+
+        assert exporter.spans[0]["parent_id"] == root.span_id
+
+    def test_error_is_recorded(self, tracer, exporter):
+        with pytest.raises(ValueError):
+            with tracer.span("tool"):
+                raise ValueError("boom")
+        tracer.flush()
+
+        assert exporter.spans[0]["error"] == "ValueError: boom"
+
+    def test_disabled_tracer_exports_nothing(self):
+        tracer = Tracer()
+        tracer.configure(Config({}))
+        with tracer.span("handle") as span:
+            span.set(x=1)
+            assert current_trace_id() is None
+        assert tracer.processor is None
+
+    def test_log_records_carry_trace_id(self, tracer, caplog):
+        install_log_context()
+        with caplog.at_level(logging.INFO):
+            with tracer.span("handle") as span:
+                logging.getLogger("test").info("inside")
+            logging.getLogger("test").info("outside")
+
+        inside, outside = caplog.records
+        assert inside.trace_id == span.trace_id
+        assert outside.trace_id == "-"
+
+
+class TestExporters:
+    """JSONL file and OTLP/HTTP JSON output"""
+
+    def test_jsonl_appends_lines(self, tmp_path):
+        path = tmp_path / "traces" / "spans.jsonl"
+        exporter = JsonlExporter(str(path))
+        exporter.export([{"name": "a"}])
+        exporter.export([{"name": "b"}, {"name": "c"}])
+
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["name"] for line in lines] == ["a", "b", "c"]
+
+    def test_otlp_payload(self):
+        span = {
+            "trace_id": "ab" * 16,
+            "span_id": "cd" * 8,
+            "parent_id": None,
+            "name": "telegram.send",
+            "start": 1000,
+            "end": 2000,
+            "attributes": {"endpoint": "sendMessage", "retries": 1},
+            "error": "RetryAfter: flood",
+        }
+
+        payload = OtlpExporter(service_name="avbot-test").payload([span])
+
+        resource = payload["resourceSpans"][0]
+        assert resource["resource"]["attributes"][0]["value"] == {
+            "stringValue": "avbot-test"
+        }
+        otlp = resource["scopeSpans"][0]["spans"][0]
+        assert otlp["traceId"] == "ab" * 16
+        assert "parentSpanId" not in otlp
+        assert otlp["startTimeUnixNano"] == "1000"
+        assert {"key": "retries", "value": {"intValue": "1"}} in otlp["attributes"]
+        assert otlp["status"] == {"code": 2, "message": "RetryAfter: flood"}
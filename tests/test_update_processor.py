@@ -0,0 +1,103 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import pytest
+from telegram import Chat, Message, Update, User
+from datetime import datetime, timezone
+from services.update_processor import PerUserUpdateProcessor
+
+
+def _update(update_id, user_id):
+    user = User(user_id, "Test", False)
+    message = Message(
+        update_id,
+        datetime.now(timezone.utc),
+        Chat(user_id, "private"),
+        from_user=user,
+        text=f"msg {update_id}",
+    )
+    return Update(update_id, message=message)
+
+
+class TestPerUserUpdateProcessor:
+    """Test suite for the per-user update processor"""
+
+    @pytest.fixture
+    def processor(self):
+        return PerUserUpdateProcessor(max_concurrent_updates=4)
+
+    @pytest.mark.asyncio
+    async def test_same_user_is_serialized_in_order(self, processor):
+        log = []
+
+        async def handle(name, delay):
+            log.append(f"start {name}")
+            await asyncio.sleep(delay)
+            log.append(f"end {name}")
+
+        await asyncio.gather(
+            processor.process_update(_update(1, 7), handle(1, 0.03)),
+            processor.process_update(_update(2, 7), handle(2, 0.0)),
+            processor.process_update(_update(3, 7), handle(3, 0.0)),
+        )
+
+        assert log == ["start 1", "end 1", "start 2", "end 2", "start 3", "end 3"]
+
+    @pytest.mark.asyncio
+    async def test_other_users_are_not_blocked(self, processor):
+        log = []
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            log.append("slow user")
+
+        async def fast():
+            log.append("other user")
+            release.set()
+
+        await asyncio.wait_for(
+            asyncio.gather(
+                processor.process_update(_update(1, 7), slow()),
+                processor.process_update(_update(2, 8), fast()),
+            ),
+            timeout=1,
+        )
+        assert log == ["other user", "slow user"]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self):
+        processor = PerUserUpdateProcessor(max_concurrent_updates=2)
+        running = peak = 0
+
+        async def handle():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await asyncio.gather(
+            *(processor.process_update(_update(i, i), handle()) for i in range(6))
+        )
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_wait_time_is_recorded_per_user(self, processor):
+        async def handle(delay):
+            await asyncio.sleep(delay)
+
+        await asyncio.gather(
+            processor.process_update(_update(1, 7), handle(0.05)),
+            processor.process_update(_update(2, 7), handle(0)),
+        )
+
+        stats = processor.stats()
+        assert stats["users"][7]["updates"] == 2
+        assert stats["users"][7]["max_wait"] >= 0.04
+        assert stats["running"] == 0 and stats["waiting"] == 0
+        # Locks of idle users are released
+        assert processor._locks == {}